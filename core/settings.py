@@ -129,9 +129,77 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Bandit: defer end_session scoring + reward updates to the RewardJob queue.
+# When True, run `python manage.py process_reward_queue --loop` alongside the
+# web workers (see landing/reward_queue.py).
+BANDIT_REWARD_QUEUE = False
+
+# Bandit: slate policy — "epsilon_greedy", "thompson" (Thompson sampling)
+# or "linucb" (upper confidence bound).
+BANDIT_POLICY = "epsilon_greedy"
+
+# Bandit: path of the memory-mapped model snapshot workers read instead of
+# the DB (e.g. "/dev/shm/bandit_model.snap").  None keeps DB reads.  Run
+# `python manage.py publish_model_snapshot --loop` once per host to keep it
+# current (see landing/model_snapshot.py).
+BANDIT_MODEL_SNAPSHOT = None
+
+# Bandit: seconds after which workers treat the snapshot file as stale
+# (its publisher has stopped) and read the model from the DB again.  The
+# publisher's --loop rewrites it at least every half of this.  None = never.
+BANDIT_SNAPSHOT_MAX_AGE = 60
+
+# Bandit: accumulate A/b updates in memory per process and merge them into
+# the DB every few seconds (one write per arm) instead of on every reward
+# (see landing/delta_learner.py).
+BANDIT_DELTA_LEARNER = False
+
+# Bandit: buffer BanditDecision rows in memory per process and write them
+# with bulk_create every few hundred ms instead of one INSERT per page-load
+# (see landing/decision_buffer.py).
+BANDIT_DECISION_BUFFER = False
+
+# Bandit: reuse a visitor's slate for this many seconds (reloads, extra tabs)
+# instead of deciding again; kept in the BANDIT_STICKY_CACHE cache.  0
+# disables it (see landing/sticky_slate.py).
+BANDIT_STICKY_SECONDS = 0
+
+# Bandit: CACHES alias for sticky slates.  It must be shared by all workers
+# (Redis, Memcached, database); no CACHES setting means a per-process
+# LocMemCache, and the landing.W001 check warns about it at startup.
+BANDIT_STICKY_CACHE = "default"
+
+# Bandit: memoise the ε-greedy exploit slate per quantized context and model
+# version (landing/bandit_utils.py, EXPLOIT_CACHE_*); counters at
+# GET /bandit/cache-stats/.
+BANDIT_EXPLOIT_CACHE = False
+
+# Bandit: how many params versions a cached exploit slate may trail the live
+# model by and still be served.  Each reward bumps the version once per
+# updated arm, so 0 drops every entry on every reward; higher values serve
+# slightly older slates for a better hit rate.
+BANDIT_EXPLOIT_CACHE_MAX_LAG = 30
+
+# Bandit: serve this worker's exploit-cache and sticky-slate counters at
+# GET /bandit/cache-stats/.  Off → the endpoint returns 404.
+BANDIT_CACHE_STATS = False
+
+# Bandit: record per-stage latencies of accept_cookies / decide_slate in
+# in-process histograms, served per worker at GET /bandit/timings/
+# (see landing/bandit_timing.py).  Off → no timers run.
+BANDIT_TIMING = False
+
 import sys
+import tempfile
 if 'test' in sys.argv:
+    # Files in the system temp dir, never in the repo
+    _TEST_DB_DIR = Path(tempfile.gettempdir())
     DATABASES['default'] = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'test_db.sqlite3',
+        'NAME': _TEST_DB_DIR / 'adaptive_landing_test_db.sqlite3',
+        # A file (not the default shared-cache in-memory DB) so concurrent
+        # connections wait on SQLite's busy timeout instead of failing with
+        # "database table is locked" — see ConcurrentUpdateStatsTests.
+        'OPTIONS': {'timeout': 30},
+        'TEST': {'NAME': _TEST_DB_DIR / 'adaptive_landing_test_db_tests.sqlite3'},
     }
@@ -3,6 +3,7 @@
 from django.contrib import admin
 
 from .models import (
+    ArmPruneLog,
     BanditArm,
     BanditArmStat,
     BanditDecision,
@@ -10,8 +11,10 @@ from .models import (
     LandingPage,
     LandingSection,
     LinearArmParam,
+    RewardJob,
     Session,
     Visitor,
+    VisitorFeatures,
 )
 
 
@@ -22,6 +25,23 @@ class VisitorAdmin(admin.ModelAdmin):
     readonly_fields = ("cookie_id", "created_at", "last_seen")
 
 
+@admin.register(VisitorFeatures)
+class VisitorFeaturesAdmin(admin.ModelAdmin):
+    list_display = (
+        "visitor",
+        "session_count",
+        "last_seen",
+        "last_ended_at",
+        "price_intent_score",
+        "service_intent_score",
+        "trust_intent_score",
+        "location_intent_score",
+        "contact_intent_score",
+    )
+    search_fields = ("visitor__cookie_id",)
+    readonly_fields = ("visitor",)
+
+
 @admin.register(Session)
 class SessionAdmin(admin.ModelAdmin):
     list_display = (
@@ -57,10 +77,11 @@ class EventAdmin(admin.ModelAdmin):
 
 @admin.register(BanditArm)
 class BanditArmAdmin(admin.ModelAdmin):
-    list_display = ("arm_id", "name", "is_active", "created_at")
-    list_filter = ("is_active",)
+    list_display = ("arm_id", "page", "name", "is_active", "dormant_since", "created_at")
+    list_filter = ("is_active", "page", ("dormant_since", admin.EmptyFieldListFilter))
     search_fields = ("arm_id", "name")
-    readonly_fields = ("created_at",)
+    # Changed only through prune_bandit_arms, so every change is in ArmPruneLog
+    readonly_fields = ("dormant_since", "created_at")
 
 
 @admin.register(BanditDecision)
@@ -100,6 +121,24 @@ class LandingSectionAdmin(admin.ModelAdmin):
 
 @admin.register(LinearArmParam)
 class LinearArmParamAdmin(admin.ModelAdmin):
-    list_display = ("arm", "n", "updated_at")
+    list_display = ("arm", "page", "n", "updated_at")
+    list_filter = ("page",)
     search_fields = ("arm__arm_id",)
-    readonly_fields = ("updated_at",)
+    # A_matrix / b_vector / A_inv are binary blobs and not editable here;
+    # rebuild them with update_stats or the management commands instead.
+    readonly_fields = ("page", "updates_since_inversion", "updated_at")
+
+
+@admin.register(RewardJob)
+class RewardJobAdmin(admin.ModelAdmin):
+    list_display = ("session", "created_at", "attempts")
+    search_fields = ("session__session_id",)
+    readonly_fields = ("created_at",)
+
+
+@admin.register(ArmPruneLog)
+class ArmPruneLogAdmin(admin.ModelAdmin):
+    list_display = ("arm", "action", "reason", "n", "created_at")
+    list_filter = ("action", "reason")
+    search_fields = ("arm__arm_id",)
+    readonly_fields = ("arm", "action", "reason", "n", "details", "created_at")
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class LandingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'landing'
+
+    def ready(self):
+        # Register signal handlers (catalog version bumps).
+        from django.core import checks
+
+        from . import signals  # noqa: F401
+        from .sticky_slate import check_sticky_cache
+
+        # Startup warning when sticky slates sit in a per-process cache.
+        checks.register(check_sticky_cache, checks.Tags.caches)
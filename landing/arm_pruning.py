@@ -0,0 +1,216 @@
+"""
+Successive-elimination pruning — put provably dominated arms to sleep.
+
+dominated_arms – which catalog arms are beaten everywhere, with the evidence
+prune_arms     – mark the dominated arms of one namespace dormant (logged)
+readmit_arms   – wake long-dormant arms again, a few per run (logged)
+wake_arms      – undo pruning for chosen arms right away (logged, "manual")
+
+Why
+---
+Every decision scores every arm in the catalog, including arms that have
+been clearly worse than others for thousands of pulls.  The
+``prune_bandit_arms`` command runs this module in the background: arms
+that are provably dominated get ``BanditArm.dormant_since`` set, which
+drops them from the catalog, so ``decide_slate`` scores and searches a
+smaller candidate set.  Nothing is deleted — parameters keep learning
+from rewards already in flight, every change is written to ArmPruneLog,
+and ``wake_arms`` (``prune_bandit_arms --wake``) reverses it.
+
+When is an arm dominated? (plain English)
+-----------------------------------------
+For each arm the linear model gives, for a visitor x, a confidence
+interval around its predicted reward θ·x of half-width
+PRUNE_BETA·sqrt(xᵀA⁻¹x).  An arm is dominated at x when K (SLATE_K)
+mutually compatible arms — arms that can share a slate — all have a
+*lower* bound above its *upper* bound: then a full slate of confidently
+better arms exists without it.  It is pruned when that holds at every
+one of the reference contexts (the namespace's most recent
+PRUNE_CONTEXT_SAMPLE logged decisions) and it has at least
+PRUNE_MIN_PULLS observations.
+
+With L and U the (contexts × arms) lower / upper bounds, the witness
+slate at x is the greedy conflict-free slate by L(x) (the same walk as
+``choose_slate``'s greedy solver) and L_K(x) its smallest lower bound;
+the arm's margin is max over x of U(x) − L_K(x), and the arm is
+dominated when the margin is negative.  Better arms that conflict with
+each other therefore count once, not K times.  Where no K compatible
+arms exist, nothing is dominated.  The witness arms are never dominated
+at their context, so every reference context keeps a full awake slate
+that beats every pruned arm.  (Greedy can miss a compatible set that
+exists; that only makes pruning more cautious.)
+
+Re-admission
+------------
+A dormant arm is woken again once it has slept PRUNE_READMIT_AFTER, at
+most PRUNE_READMIT_PER_RUN arms per run, longest-sleeping first.  After
+waking up it cannot be pruned again until it has
+PRUNE_READMIT_GRACE_PULLS new observations, so the model gets fresh
+evidence before it decides again.
+"""
+
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .bandit_utils import FEATURE_DIM, SLATE_K, ArmCatalog, _greedy_slate, current_model_version
+from .models import ArmPruneLog, BanditArm, BanditDecision
+
+logger = logging.getLogger(__name__)
+
+PRUNE_BETA = 1.5                           # confidence half-width, in units of sqrt(xᵀA⁻¹x)
+PRUNE_MIN_PULLS = 500                      # never prune an arm with fewer observations
+PRUNE_CONTEXT_SAMPLE = 2000                # reference contexts: the namespace's latest decisions
+PRUNE_MIN_CONTEXTS = 100                   # fewer logged contexts than this → prune nothing
+PRUNE_READMIT_AFTER = timedelta(days=1)    # a dormant arm may be woken after this long
+PRUNE_READMIT_PER_RUN = 1                  # ... but at most this many arms per run
+PRUNE_READMIT_GRACE_PULLS = 200            # fresh pulls a woken arm needs before it can be pruned again
+
+
+def reference_contexts(page_id=None, sample=PRUNE_CONTEXT_SAMPLE):
+    """Distinct feature vectors of the namespace's latest decisions → (m, FEATURE_DIM)."""
+    vectors = [
+        vector
+        for vector in (
+            BanditDecision.objects
+            .filter(page_id=page_id)
+            .order_by("-pk")
+            .values_list("context_vector", flat=True)[:sample]
+        )
+        if len(vector or []) == FEATURE_DIM
+    ]
+    if not vectors:
+        return np.zeros((0, FEATURE_DIM))
+    return np.unique(np.asarray(vectors, dtype=float), axis=0)
+
+
+def dominated_arms(catalog, X, k=SLATE_K, beta=PRUNE_BETA, min_pulls=PRUNE_MIN_PULLS):
+    """
+    Arms of *catalog* dominated at every context in *X*.
+
+    Returns ``{arm index: details}`` where details hold the worst-case
+    margin (max over X of upper bound − the K-th lower bound of the
+    best compatible slate, < 0) and the arm_ids whose lower bound beat
+    its upper bound at every context.  The control arm is never a
+    candidate and never counts as a better arm.
+    """
+    candidates = np.flatnonzero(~catalog.is_control)
+    if len(X) == 0 or len(candidates) <= k:
+        return {}
+    X = np.asarray(X, dtype=float)
+    theta = catalog.theta[candidates]
+    mean = X @ theta.T                                               # (m, n)
+    width = beta * np.sqrt(np.maximum(
+        np.einsum("md,nde,me->mn", X, catalog.A_inv[candidates], X), 0.0,
+    ))
+    lower, upper = mean - width, mean + width
+
+    # K-th lower bound of the greedy conflict-free slate at each context
+    kth_lower = np.full(len(X), np.inf)
+    full = np.full(len(catalog.arms), -np.inf)
+    position = {int(arm): col for col, arm in enumerate(candidates)}
+    for row in range(len(X)):
+        full[candidates] = lower[row]
+        witness = _greedy_slate(full, catalog.conflict_masks, catalog.slate_mask, k)
+        if len(witness) == k:
+            kth_lower[row] = min(lower[row, position[i]] for i in witness)
+    margin = (upper - kth_lower[:, None]).max(axis=0)
+
+    result = {}
+    for col in np.flatnonzero((margin < 0) & (catalog.n[candidates] >= min_pulls)):
+        beats = (lower > upper[:, [col]]).all(axis=0)
+        result[int(candidates[col])] = {
+            "margin": float(margin[col]),
+            "beaten_by": [catalog.arms[candidates[j]].arm_id for j in np.flatnonzero(beats)],
+            "contexts": int(len(X)),
+            "beta": beta,
+            "k": k,
+        }
+    return result
+
+
+def _last_readmitted_n(arms):
+    """Arm pk → n at the arm's latest re-admission (arms never re-admitted are absent)."""
+    latest = (
+        ArmPruneLog.objects
+        .filter(arm__in=arms, action=ArmPruneLog.ACTION_READMIT)
+        .values("arm")
+        .annotate(last=Max("pk"))
+    )
+    pks = [row["last"] for row in latest]
+    return dict(ArmPruneLog.objects.filter(pk__in=pks).values_list("arm_id", "n"))
+
+
+def prune_arms(page_id=None, dry_run=False, **options):
+    """
+    Mark the dominated arms of one namespace dormant; return ``[(arm, details), …]``.
+
+    *options* are passed to ``dominated_arms`` (k, beta, min_pulls).
+    Arms still inside their post-re-admission grace period are skipped.
+    Each pruned arm gets an ArmPruneLog row and one save, whose signal
+    bumps the namespace version so every worker drops it from its catalog.
+    """
+    catalog = ArmCatalog.load(current_model_version(page_id), page_id=page_id)
+    X = reference_contexts(page_id)
+    if len(X) < PRUNE_MIN_CONTEXTS:
+        logger.info("Arm pruning (page=%s): only %d reference contexts — nothing pruned.", page_id, len(X))
+        return []
+
+    found = dominated_arms(catalog, X, **options)
+    readmitted_n = _last_readmitted_n([catalog.arms[i] for i in found])
+    pruned = []
+    for i, details in sorted(found.items(), key=lambda item: item[1]["margin"]):
+        arm, n = catalog.arms[i], int(catalog.n[i])
+        woke_at = readmitted_n.get(arm.pk)
+        if woke_at is not None and n < woke_at + PRUNE_READMIT_GRACE_PULLS:
+            continue
+        pruned.append((arm, details))
+        if dry_run:
+            continue
+        with transaction.atomic():
+            arm.dormant_since = timezone.now()
+            arm.save(update_fields=["dormant_since"])
+            ArmPruneLog.objects.create(
+                arm=arm, action=ArmPruneLog.ACTION_PRUNE, reason="dominated", n=n, details=details,
+            )
+        logger.info(
+            "Arm pruned: %s (page=%s) margin=%.4f beaten_by=%s",
+            arm.arm_id, page_id, details["margin"], details["beaten_by"],
+        )
+    return pruned
+
+
+def _wake(arms, reason):
+    woken = []
+    for arm in arms:
+        param = getattr(arm, "linear_param", None)
+        with transaction.atomic():
+            arm.dormant_since = None
+            arm.save(update_fields=["dormant_since"])
+            ArmPruneLog.objects.create(
+                arm=arm, action=ArmPruneLog.ACTION_READMIT, reason=reason,
+                n=param.n if param is not None else 0,
+            )
+        logger.info("Arm re-admitted: %s (page=%s, %s)", arm.arm_id, arm.page_id, reason)
+        woken.append(arm)
+    return woken
+
+
+def readmit_arms(page_id=None, limit=PRUNE_READMIT_PER_RUN, after=PRUNE_READMIT_AFTER, dry_run=False):
+    """Wake up to *limit* arms that have been dormant for at least *after*; return them."""
+    due = list(
+        BanditArm.objects
+        .filter(page_id=page_id, is_active=True, dormant_since__lte=timezone.now() - after)
+        .select_related("linear_param")
+        .order_by("dormant_since")[:limit]
+    )
+    return due if dry_run else _wake(due, "scheduled")
+
+
+def wake_arms(arms):
+    """Reverse pruning for *arms* now (dormant ones only); return the arms woken."""
+    return _wake([arm for arm in arms if arm.dormant_since is not None], "manual")
@@ -1,11 +1,19 @@
 """
 Bandit utility functions — Combinational Contextual Multi-Armed Bandit.
 
+get_arm_catalog    – versioned in-process cache of active arms + model params, per page
+publish_model_snapshot – write the catalog to a memory-mapped file shared by workers
 build_context      – turn a visitor into a list of 8 numbers (the feature vector)
 choose_arm         – (legacy) single-arm ε-greedy selection
 choose_slate       – pick K non-conflicting arms per visit (slate bandit)
+decide_slate       – the same, returning a SlateDecision (ε-greedy, Thompson sampling or LinUCB)
 merge_page_configs – combine page_config dicts from a slate into one
+slate_page_config  – memoised merge_page_configs + pre-serialised JSON per slate
+exploit_cache_stats – hit / stale counters of the quantized exploit-slate cache
+_exact_slate       – best K-arm slate under the conflict graph (branch-and-bound)
 update_stats       – learn from the result of a session (adjust weights)
+update_stats_batch – the same for many sessions of one arm in a single write
+apply_stats_delta  – add pre-summed ΔA / Δb / Δn to an arm (delta learner flush)
 
 How it works (plain English)
 ----------------------------
@@ -31,14 +39,30 @@ Feature vector (d=8)
 --------------------
     [is_mobile, price_score, service_score, trust_score,
      location_score, contact_score, visit_number_norm, bias]
+
+The layout and the code computing each column are declared once in
+``landing/features.py`` (the feature pipeline).
 """
 
 import logging
 import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 
 import numpy as np
-
-from .models import BanditArm, LinearArmParam, Session
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .bandit_timing import stage_clock
+from .device import classify_user_agent
+from .features import FEATURES
+from .fields import EncodedJSON
+from .model_snapshot import SnapshotReader, write_snapshot
+from .models import BanditArm, BanditModelVersion, LinearArmParam
+from .visitor_features import INTENT_FIELDS, load_visitor_features
 
 logger = logging.getLogger(__name__)
 
@@ -49,53 +73,124 @@ logger = logging.getLogger(__name__)
 EPSILON = 0.10              # 10% of the time, pick a random arm (explore)
 MIN_PULLS_PER_ARM = 2       # try every arm at least 2 times before trusting predictions
 LAMBDA_REG = 1.0             # safety factor for A_matrix starting values (keeps early predictions conservative)
+REINVERT_EVERY = 200         # recompute A_inv from A_matrix after this many incremental updates
+CATALOG_RECHECK_SECONDS = 0.0  # >0 → trust the cached arm catalog for this long without a version query
+THOMPSON_SIGMA = 0.25        # Thompson sampling: weights drawn from N(θ, σ²·A⁻¹)
+LINUCB_ALPHA = 0.5           # LinUCB: score = θ·x + α·sqrt(xᵀA⁻¹x)
 
-# Feature vector layout
-FEATURE_NAMES = [
-    "is_mobile",             # 0 or 1
-    "price_score",           # 0..1 from last session
-    "service_score",         # 0..1
-    "trust_score",           # 0..1
-    "location_score",        # 0..1
-    "contact_score",         # 0..1
-    "visit_number_norm",     # min(visit_count, 10) / 10
-    "bias",                  # always 1.0
-]
+# Feature vector layout — declared once in landing/features.py
+FEATURE_NAMES = list(FEATURES.names)
 FEATURE_DIM = len(FEATURE_NAMES)   # 8
 
 
 # ---------------------------------------------------------------------------
-# Numpy helpers — converting to/from JSON-safe lists for database storage
+# Numpy helpers — starting values and cached inverses for LinearArmParam
 # ---------------------------------------------------------------------------
+#
+# LinearArmParam stores its arrays as binary float64 blobs
+# (landing.fields.Float64ArrayField): assign numpy arrays or plain lists,
+# read back numpy arrays.
 
 def make_initial_A():
-    """Return the starting A_matrix as a JSON-safe nested list.
+    """Return the starting A_matrix as a nested list.
 
     np.eye(d) creates an 8×8 identity matrix (1s on diagonal, 0s elsewhere).
     Multiplied by LAMBDA_REG (1.0) as a safety net for early predictions.
-    .tolist() converts the numpy array to plain Python lists for JSONField.
+    .tolist() keeps the helper easy to use in JSON snapshots and tests.
     """
     return (np.eye(FEATURE_DIM) * LAMBDA_REG).tolist()
 
 
 def make_initial_b():
-    """Return the starting b_vector as a JSON-safe list.
+    """Return the starting b_vector as a list.
 
     np.zeros(d) creates a list of 8 zeros — "no rewards seen yet."
-    .tolist() converts to plain Python list for JSONField.
     """
     return np.zeros(FEATURE_DIM).tolist()
 
 
+def make_initial_A_inv():
+    """Return the inverse of make_initial_A() as a nested list."""
+    return (np.eye(FEATURE_DIM) / LAMBDA_REG).tolist()
+
+
+def make_initial_A_chol():
+    """Return the lower Cholesky factor of make_initial_A() as a nested list."""
+    return (np.eye(FEATURE_DIM) * np.sqrt(LAMBDA_REG)).tolist()
+
+
+def _param_cholesky(param):
+    """Return the lower Cholesky factor L of A (A = L Lᵀ) — cached, or computed if missing."""
+    if param.A_chol is not None:
+        return np.asarray(param.A_chol, dtype=float)
+    return np.linalg.cholesky(np.asarray(param.A_matrix, dtype=float))
+
+
+def _cholesky_update(L, x):
+    """
+    Return the Cholesky factor of L Lᵀ + x xᵀ given L (rank-1 update).
+
+    The textbook O(d²) update: walk down the diagonal, rotating x into
+    each column of L.  Keeps the factor in step with A without an O(d³)
+    re-factorisation.
+    """
+    L = np.array(L, dtype=float)
+    x = np.array(x, dtype=float)
+    for k in range(len(x)):
+        r = np.hypot(L[k, k], x[k])
+        c = r / L[k, k]
+        s = x[k] / L[k, k]
+        L[k, k] = r
+        L[k + 1:, k] = (L[k + 1:, k] + s * x[k + 1:]) / c
+        x[k + 1:] = c * x[k + 1:] - s * L[k + 1:, k]
+    return L
+
+
+def _param_inverse(param):
+    """Return A⁻¹ for a LinearArmParam — the cached copy, or a fresh inversion if missing."""
+    if param.A_inv is not None:
+        return np.asarray(param.A_inv, dtype=float)
+    return np.linalg.inv(np.asarray(param.A_matrix, dtype=float))
+
+
+def _sherman_morrison(A_inv, x):
+    """
+    Return (A + x xᵀ)⁻¹ given A⁻¹, without inverting anything.
+
+        (A + x xᵀ)⁻¹ = A⁻¹ − (A⁻¹x)(A⁻¹x)ᵀ / (1 + xᵀA⁻¹x)
+
+    A is symmetric, so A⁻¹x serves as both the column and row factor.
+    Costs O(d²) instead of the O(d³) of a full inversion.
+    """
+    Ax = A_inv @ x
+    return A_inv - np.outer(Ax, Ax) / (1.0 + x @ Ax)
+
+
+def _woodbury(A_inv, X):
+    """
+    Return (A + XᵀX)⁻¹ given A⁻¹, for a batch X of m rows (m < d).
+
+        (A + XᵀX)⁻¹ = A⁻¹ − U (I + X U)⁻¹ Uᵀ,   U = A⁻¹Xᵀ
+
+    Only an m×m system is solved.  With m = 1 this is Sherman–Morrison.
+    """
+    U = A_inv @ X.T
+    S = np.eye(len(X)) + X @ U
+    return A_inv - U @ np.linalg.solve(S, U.T)
+
+
 def _predict(A_list, b_list, x_list):
     """
     Predict reward for a visitor (context vector x).
 
-    1. np.array() converts the stored JSON lists back into numpy arrays.
+    1. np.array() converts the inputs (lists or arrays) into numpy arrays.
     2. np.linalg.solve(A, b) computes weights = A⁻¹ × b
        ("what worked" ÷ "what I've seen").
     3. weights @ x multiplies each feature by its weight and adds up
        → a single predicted reward number.
+
+    The decision path no longer calls this: it uses the catalog's cached
+    weights (A_inv @ b), so scoring is just the dot product in step 3.
     """
     A = np.array(A_list)
     b = np.array(b_list)
@@ -104,14 +199,463 @@ def _predict(A_list, b_list, x_list):
     return float(weights @ x)
 
 
+# ---------------------------------------------------------------------------
+# 0) In-process arm catalog (versioned cache)
+# ---------------------------------------------------------------------------
+#
+# Every decision needs all active arms, their page_configs and their
+# A_matrix / b_vector.  Loading those from the DB on every request costs
+# N+1 queries, so each worker keeps an ArmCatalog in memory and only
+# reloads it when its BanditModelVersion counter changes.  Checking the
+# counter is one primary-key read (zero with CATALOG_RECHECK_SECONDS > 0).
+#
+# Arms live in namespaces: the shared arms (``page`` empty) and one per
+# landing page that has arms of its own.  Each namespace has its own
+# catalog, version row and model, so a decision only scores its page's
+# arms and a reward on one page never reloads another page's catalog.
+# ``page_id=None`` everywhere below means the shared namespace.
+
+MODEL_VERSION_PK = 1
+
+
+def model_version_pk(page_id=None):
+    """
+    BanditModelVersion primary key for a namespace.
+
+    The shared arms keep row MODEL_VERSION_PK; page *n* uses
+    MODEL_VERSION_PK + n.  Every row is written with an explicit key, so
+    the check stays a primary-key read.
+    """
+    return MODEL_VERSION_PK if page_id is None else MODEL_VERSION_PK + page_id
+
+
+def bump_model_version(arms=False, page_id=None):
+    """
+    Invalidate every worker's cached catalog for one namespace.
+
+    ``params_version`` is always bumped; ``arms=True`` also bumps
+    ``arms_version`` (arm list / page_configs changed, so the catalog is
+    rebuilt from scratch instead of just reloading parameters).
+
+    Called automatically from signals (see ``landing/signals.py``); call it
+    yourself after bulk ``QuerySet.update()`` / ``bulk_create()`` writes.
+    """
+    pk = model_version_pk(page_id)
+    fields = {"params_version": F("params_version") + 1}
+    if arms:
+        fields["arms_version"] = F("arms_version") + 1
+    updated = BanditModelVersion.objects.filter(pk=pk).update(**fields)
+    if not updated:
+        BanditModelVersion.objects.get_or_create(pk=pk)
+
+
+def current_model_version(page_id=None):
+    """Return ``(arms_version, params_version)`` of a namespace — one primary-key read."""
+    pk = model_version_pk(page_id)
+    version = (
+        BanditModelVersion.objects
+        .filter(pk=pk)
+        .values_list("arms_version", "params_version")
+        .first()
+    )
+    if version is None:
+        row, _ = BanditModelVersion.objects.get_or_create(pk=pk)
+        version = (row.arms_version, row.params_version)
+    return version
+
+
+class ArmCatalog:
+    """
+    Read-only snapshot of the active arms and their linear-model parameters.
+
+    Built once per model version and shared by every request in the
+    worker, so nothing here may be mutated after construction.
+
+    Attributes
+    ----------
+    version : tuple[int, int]
+        ``(arms_version, params_version)`` the snapshot was built from.
+    page_id : int | None
+        Namespace of the arms (landing page id, ``None`` = shared arms).
+    arms : list[BanditArm]
+        Active, non-dormant arms ordered by ``arm_id``; list position is
+        the arm index.
+    index : dict[int, int]
+        BanditArm pk → arm index.
+    configs : list[dict]
+        Parsed ``page_config`` per arm (never ``None``).
+    is_control : np.ndarray[bool]
+        True for the ``no_change`` control arm (never part of a slate).
+    conflict_masks : list[int]
+        Conflict graph as bitsets: bit j of ``conflict_masks[i]`` is set
+        when arms i and j cannot share a slate (including i == j).
+    slate_mask : int
+        Bitset of every arm allowed in a slate (all but the control arm).
+    A, A_inv : np.ndarray, shape (n_arms, d, d)
+        Stacked A_matrix / A⁻¹ per arm.
+    b : np.ndarray, shape (n_arms, d)
+        Stacked b_vector per arm.
+    theta : np.ndarray, shape (n_arms, d)
+        Every arm's weights (A⁻¹ b) in one contiguous float64 array, so
+        scoring all arms is a single matrix–vector product.
+    chol_inv_T : np.ndarray, shape (n_arms, d, d)
+        L⁻ᵀ per arm, where L is the cached Cholesky factor of A.  Since
+        L⁻ᵀ (L⁻ᵀ)ᵀ = A⁻¹, ``theta + σ · L⁻ᵀ z`` with z ~ N(0, I) is a
+        draw from N(θ, σ²A⁻¹) — see ``sample_scores``.
+    n : np.ndarray
+        Per-arm observation counts.
+    """
+
+    def __init__(self, version, arms, params, page_id=None):
+        self.version = version
+        self.page_id = page_id
+        self._set_arms(arms)
+        self._set_params(params)
+
+    def _set_arms(self, arms):
+        self.arms = arms
+        self.index = {arm.pk: i for i, arm in enumerate(arms)}
+        self.by_arm_id = {arm.arm_id: arm for arm in arms}
+        self.configs = [arm.page_config or {} for arm in arms]
+        self.is_control = np.array([arm.arm_id == "no_change" for arm in arms], dtype=bool)
+        self.conflict_masks = _build_conflict_masks(self.configs)
+        self.slate_mask = sum(1 << i for i, control in enumerate(self.is_control) if not control)
+
+    def _set_params(self, params):
+        d = FEATURE_DIM
+        self.params = params
+        self.A = _stack([p.A_matrix for p in params], (d, d))
+        self.b = _stack([p.b_vector for p in params], (d,))
+        self.A_inv = _stack([_param_inverse(p) for p in params], (d, d))
+        self.theta = np.ascontiguousarray(np.einsum("nij,nj->ni", self.A_inv, self.b))
+        L = _stack([_param_cholesky(p) for p in params], (d, d))
+        self.chol_inv_T = np.ascontiguousarray(np.linalg.inv(L).transpose(0, 2, 1)) if len(L) else L
+        self.n = np.array([p.n for p in params], dtype=np.int64)
+
+    @property
+    def warm(self):
+        """Boolean mask of arms past warmup (n ≥ MIN_PULLS_PER_ARM)."""
+        return self.n >= MIN_PULLS_PER_ARM
+
+    def blocked_by(self, indices):
+        """Bitset of arms that conflict with any arm in *indices*."""
+        blocked = 0
+        for i in indices:
+            blocked |= self.conflict_masks[i]
+        return blocked
+
+    def score(self, x):
+        """Predicted reward of every arm for one context → shape (n_arms,)."""
+        return self.theta @ np.asarray(x, dtype=float)
+
+    def confidence_widths(self, x):
+        """
+        sqrt(xᵀA⁻¹x) for every arm → shape (n_arms,).
+
+        One einsum over the stacked (n_arms, d, d) A⁻¹ — no per-arm loop.
+        This is how uncertain each arm's prediction for x still is.
+        """
+        x = np.asarray(x, dtype=float)
+        return np.sqrt(np.maximum(np.einsum("i,nij,j->n", x, self.A_inv, x), 0.0))
+
+    def ucb_scores(self, x, alpha=LINUCB_ALPHA):
+        """LinUCB upper confidence bound θ·x + α·sqrt(xᵀA⁻¹x) for every arm."""
+        return self.score(x) + alpha * self.confidence_widths(x)
+
+    def sample_scores(self, x, rng, sigma=THOMPSON_SIGMA):
+        """
+        One Thompson-sampling draw: x · θ̃ for every arm, θ̃ ~ N(θ, σ²A⁻¹).
+
+        All arms are sampled together — one (n_arms, d) normal draw and one
+        einsum against the cached L⁻ᵀ factors; nothing is factorised here.
+        """
+        z = rng.standard_normal(self.theta.shape)
+        theta_tilde = self.theta + sigma * np.einsum("nij,nj->ni", self.chol_inv_T, z)
+        return theta_tilde @ np.asarray(x, dtype=float)
+
+    def score_batch(self, X):
+        """Predicted rewards for many contexts at once → shape (n_contexts, n_arms)."""
+        X = np.asarray(X, dtype=float).reshape(-1, self.theta.shape[1])
+        return X @ self.theta.T
+
+    @classmethod
+    def load(cls, version, page_id=None):
+        """
+        Build a namespace's catalog from the DB (one query, plus one if params are missing).
+
+        Dormant arms (pruned as dominated, see ``landing/arm_pruning.py``)
+        are left out until they are re-admitted.
+        """
+        arms = list(
+            BanditArm.objects
+            .filter(page_id=page_id, is_active=True, dormant_since__isnull=True)
+            .select_related("linear_param")
+            .order_by("arm_id")
+        )
+        params = _params_for_arms(arms)
+        return cls(version, arms, params, page_id=page_id)
+
+    def with_params(self, version):
+        """Return a copy that shares the arm metadata but reloads parameters (one query)."""
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.version = version
+        by_arm = {
+            p.arm_id: p
+            for p in LinearArmParam.objects.filter(arm_id__in=list(self.index))
+        }
+        missing = [arm for arm in self.arms if arm.pk not in by_arm]
+        if missing:
+            by_arm.update({p.arm_id: p for p in _create_missing_params(missing)})
+        clone._set_params([by_arm[arm.pk] for arm in self.arms])
+        return clone
+
+    @classmethod
+    def from_snapshot(cls, snapshot, previous=None):
+        """
+        Build a catalog from a mapped model snapshot — no DB queries.
+
+        The parameter arrays are the snapshot's read-only views, so every
+        worker mapping the same file shares one copy in the page cache.
+        Arm metadata (and the conflict graph) is reused from *previous*
+        when the arms version has not changed.
+        """
+        catalog = object.__new__(cls)
+        catalog.version = snapshot.version
+        catalog.page_id = None
+        if previous is not None and previous.version[0] == snapshot.version[0]:
+            for name in ("arms", "index", "by_arm_id", "configs", "is_control",
+                         "conflict_masks", "slate_mask"):
+                setattr(catalog, name, getattr(previous, name))
+        else:
+            catalog._set_arms([
+                BanditArm.from_db(
+                    "default",
+                    SNAPSHOT_ARM_FIELDS,
+                    [meta.get(name) for name in SNAPSHOT_ARM_FIELDS],
+                )
+                for meta in snapshot.arms
+            ])
+        catalog.params = None
+        for name in SNAPSHOT_ARRAYS:
+            setattr(catalog, name, snapshot.arrays[name])
+        return catalog
+
+    def snapshot_arms(self):
+        """Arm metadata as JSON-serialisable dicts (for ``publish_model_snapshot``)."""
+        return [
+            {name: getattr(arm, name) for name in SNAPSHOT_ARM_FIELDS}
+            for arm in self.arms
+        ]
+
+
+def _stack(values, shape):
+    """Stack per-arm lists / arrays into one contiguous float64 array."""
+    if not values:
+        return np.empty((0,) + shape)
+    return np.ascontiguousarray(np.stack([np.asarray(v, dtype=float) for v in values]))
+
+
+def _params_for_arms(arms):
+    """Return the LinearArmParam for each arm, creating any that are missing."""
+    params = {}
+    missing = []
+    for arm in arms:
+        try:
+            params[arm.pk] = arm.linear_param
+        except LinearArmParam.DoesNotExist:
+            missing.append(arm)
+    if missing:
+        params.update({p.arm_id: p for p in _create_missing_params(missing)})
+    return [params[arm.pk] for arm in arms]
+
+
+def _create_missing_params(arms):
+    """Auto-initialise LinearArmParam rows in bulk (safe if another worker races us)."""
+    LinearArmParam.objects.bulk_create(
+        [
+            LinearArmParam(
+                arm=arm,
+                page_id=arm.page_id,
+                A_matrix=make_initial_A(),
+                b_vector=make_initial_b(),
+                A_inv=make_initial_A_inv(),
+                A_chol=make_initial_A_chol(),
+            )
+            for arm in arms
+        ],
+        ignore_conflicts=True,
+    )
+    return list(LinearArmParam.objects.filter(arm__in=arms))
+
+
+# ---------------------------------------------------------------------------
+# 0b) Shared model snapshot (memory-mapped, one writer, many readers)
+# ---------------------------------------------------------------------------
+#
+# With settings.BANDIT_MODEL_SNAPSHOT set to a file path, the
+# ``publish_model_snapshot`` command writes the stacked arrays and arm
+# metadata there after every model change, and get_arm_catalog() maps
+# that file instead of querying the DB.  All workers on the host share
+# the same pages; swapping to a new version costs one os.stat per check
+# plus an mmap when the file was replaced.  See landing/model_snapshot.py.
+# The snapshot holds the shared arms; page namespaces are read from the DB.
+# A snapshot older than BANDIT_SNAPSHOT_MAX_AGE seconds is ignored (the
+# publisher has stopped), so workers fall back to the DB instead of
+# serving a frozen model; the publisher rewrites the file at least every
+# half of that age even when the model has not changed.
+
+SNAPSHOT_ARM_FIELDS = ["id", "page_id", "arm_id", "name", "page_config", "is_active", "affected_sections"]
+SNAPSHOT_ARRAYS = ["A", "b", "A_inv", "theta", "chol_inv_T", "n"]
+
+_snapshot_reader = None
+_stale_snapshot = None    # identity of the last snapshot reported stale (warn once per file)
+
+
+def model_snapshot_path():
+    """Configured snapshot file path, or ``None`` when workers read from the DB."""
+    return getattr(settings, "BANDIT_MODEL_SNAPSHOT", None)
+
+
+def snapshot_max_age():
+    """Seconds after which a snapshot file counts as stale (``None`` = never)."""
+    return getattr(settings, "BANDIT_SNAPSHOT_MAX_AGE", 60)
+
+
+def publish_model_snapshot(path=None):
+    """
+    Write the current model to the snapshot file and return its version.
+
+    Run by a single writer (the ``publish_model_snapshot`` command) — never
+    from request handling.  The file is replaced atomically, so readers
+    always map either the old or the new version.
+    """
+    path = path or model_snapshot_path()
+    if not path:
+        raise ValueError("No snapshot path given and settings.BANDIT_MODEL_SNAPSHOT is not set.")
+    version = current_model_version()
+    catalog = ArmCatalog.load(version)
+    write_snapshot(
+        path,
+        version,
+        catalog.snapshot_arms(),
+        {name: getattr(catalog, name) for name in SNAPSHOT_ARRAYS},
+    )
+    logger.info("Model snapshot published: version=%s arms=%d path=%s", version, len(catalog.arms), path)
+    return version
+
+
+def _current_snapshot():
+    """The mapped snapshot for this worker, or ``None`` (not configured / not published yet / stale)."""
+    global _snapshot_reader, _stale_snapshot
+    path = model_snapshot_path()
+    if not path:
+        return None
+    reader = _snapshot_reader
+    if reader is None or reader.path != path:
+        reader = _snapshot_reader = SnapshotReader(path)
+    snapshot = reader.current()
+    max_age = snapshot_max_age()
+    if snapshot is not None and max_age and snapshot.age() > max_age:
+        if _stale_snapshot != snapshot.identity:
+            _stale_snapshot = snapshot.identity
+            logger.warning(
+                "Model snapshot %s is %.0f s old (max %s s) — reading the model from the DB.",
+                path, snapshot.age(), max_age,
+            )
+        return None
+    return snapshot
+
+
+_catalogs = {}            # page id (None = shared arms) → ArmCatalog
+_catalog_checked_at = {}  # page id → time.monotonic() of the last version check
+_catalog_lock = threading.Lock()
+
+
+def get_arm_catalog(page_id=None):
+    """
+    Return the worker's ArmCatalog for a page, reloading it only if its version changed.
+
+    Steady state costs one query (the version check) or zero when
+    CATALOG_RECHECK_SECONDS allows skipping the check.  A params-only
+    change reloads parameters with one query; an arms change rebuilds the
+    whole catalog.  Only the page's own arms are loaded, so the cost does
+    not depend on how many arms other pages have.
+
+    A page with no active arms of its own uses the shared catalog
+    (``page_id=None``), which keeps single-page setups unchanged.
+
+    When a model snapshot is configured and published, the shared catalog
+    comes from the mapped file instead and the DB is never queried.
+    """
+    catalog = _namespace_catalog(page_id)
+    if page_id is not None and not catalog.arms:
+        return _namespace_catalog(None)
+    return catalog
+
+
+def _namespace_catalog(page_id):
+    catalog = _catalogs.get(page_id)
+    now = time.monotonic()
+    if catalog is not None and now - _catalog_checked_at.get(page_id, 0.0) < CATALOG_RECHECK_SECONDS:
+        return catalog
+
+    snapshot = _current_snapshot() if page_id is None else None
+    if snapshot is not None:
+        if catalog is None or catalog.version != snapshot.version:
+            with _catalog_lock:
+                catalog = _catalogs.get(None)
+                if catalog is None or catalog.version != snapshot.version:
+                    catalog = ArmCatalog.from_snapshot(snapshot, previous=catalog)
+                    _catalogs[None] = catalog
+                    logger.debug(
+                        "Arm catalog mapped from snapshot: version=%s arms=%d",
+                        snapshot.version, len(catalog.arms),
+                    )
+        _catalog_checked_at[None] = now
+        return catalog
+
+    version = current_model_version(page_id)
+    if catalog is not None and catalog.version == version:
+        _catalog_checked_at[page_id] = now
+        return catalog
+
+    with _catalog_lock:
+        catalog = _catalogs.get(page_id)
+        if catalog is None or catalog.version != version:
+            if catalog is not None and catalog.version[0] == version[0]:
+                catalog = catalog.with_params(version)
+            else:
+                catalog = ArmCatalog.load(version, page_id=page_id)
+            _catalogs[page_id] = catalog
+            logger.debug(
+                "Arm catalog loaded: page=%s version=%s arms=%d",
+                page_id, version, len(catalog.arms),
+            )
+        _catalog_checked_at[page_id] = now
+    return catalog
+
+
+def reset_arm_catalogs():
+    """Forget every cached catalog (tests, or after swapping databases)."""
+    with _catalog_lock:
+        _catalogs.clear()
+        _catalog_checked_at.clear()
+
+
 # ---------------------------------------------------------------------------
 # 1) build_context
 # ---------------------------------------------------------------------------
 
-def build_context(visitor, request):
+def build_context(visitor, request, features=None):
     """
     Extract context features from the visitor and request.
 
+    Intent scores and the visit count come from the visitor's
+    VisitorFeatures row — pass it as *features* (accept_cookies already
+    has it from ``record_visit``) to build the vector without a query;
+    otherwise it is loaded with one primary-key read.
+
     Returns
     -------
     context_dict : dict
@@ -119,57 +663,24 @@ def build_context(visitor, request):
     feature_vector : list[float]
         Numeric vector of length FEATURE_DIM used by the linear model.
     """
-    # --- device type -------------------------------------------------------
-    ua = request.META.get("HTTP_USER_AGENT", "").lower()
-    mobile_keywords = (
-        "mobile", "android", "iphone", "ipod", "ipad",
-        "opera mini", "iemobile",
-    )
-    is_mobile = 1.0 if any(kw in ua for kw in mobile_keywords) else 0.0
+    # --- device type (phones and tablets count as mobile) -----------------
+    device = classify_user_agent(request.META.get("HTTP_USER_AGENT", ""))
 
     # --- intent scores from the most recent ended session ------------------
-    last_session = (
-        Session.objects
-        .filter(visitor=visitor, ended_at__isnull=False)
-        .order_by("-ended_at")
-        .first()
-    )
+    if features is None:
+        features = load_visitor_features(visitor)
 
-    if last_session:
-        price    = last_session.price_intent_score or 0.0
-        service  = last_session.service_intent_score or 0.0
-        trust    = last_session.trust_intent_score or 0.0
-        location = last_session.location_intent_score or 0.0
-        contact  = last_session.contact_intent_score or 0.0
-    else:
-        price = service = trust = location = contact = 0.0
-
-    # --- visit count (normalised to 0–1) -----------------------------------
-    visit_count = visitor.sessions.count()
-    visit_norm = min(visit_count, 10) / 10.0
-
-    # --- assemble feature vector -------------------------------------------
-    feature_vector = [
-        is_mobile,
-        price,
-        service,
-        trust,
-        location,
-        contact,
-        visit_norm,
-        1.0,     # bias term — lets the model learn a constant offset
-    ]
-
-    context_dict = {
-        "is_mobile": bool(is_mobile),
-        "price_score": price,
-        "service_score": service,
-        "trust_score": trust,
-        "location_score": location,
-        "contact_score": contact,
-        "visit_count": visit_count,
-        "visit_number_norm": visit_norm,
-    }
+    # --- feature vector from the declared pipeline -------------------------
+    inputs = {name: getattr(features, name) for name in INTENT_FIELDS}
+    inputs["device"] = device.category
+    inputs["visit_count"] = features.session_count
+    feature_vector = FEATURES.transform_one(inputs)
+
+    # Raw inputs plus every feature column, so replays can re-featurize it
+    context_dict = dict(zip(FEATURE_NAMES, feature_vector))
+    context_dict["is_mobile"] = bool(context_dict["is_mobile"])
+    context_dict["device"] = device.category
+    context_dict["visit_count"] = features.session_count
 
     return context_dict, feature_vector
 
@@ -197,29 +708,17 @@ def choose_arm(feature_vector, epsilon=EPSILON):
     ``predicted_score`` is the model's predicted reward for the chosen arm,
     or ``None`` during warmup / exploration.
     """
-    arms = list(BanditArm.objects.filter(is_active=True))
+    catalog = get_arm_catalog()
+    arms = catalog.arms
     if not arms:
         raise ValueError("No active BanditArm rows — run seed_bandit_arms first.")
 
-    # Ensure every arm has a LinearArmParam row (auto-initialise if missing)
-    params = {}
-    under_pulled = []
-    for arm in arms:
-        param, _created = LinearArmParam.objects.get_or_create(
-            arm=arm,
-            defaults={
-                "A_matrix": make_initial_A(),
-                "b_vector": make_initial_b(),
-            },
-        )
-        params[arm.pk] = param
-        if param.n < MIN_PULLS_PER_ARM:
-            under_pulled.append(arm)
+    under_pulled = [arm for arm, warm in zip(arms, catalog.warm) if not warm]
 
     # --- warmup: force-explore under-pulled arms ---------------------------
     if under_pulled:
         chosen = random.choice(under_pulled)
-        logger.info("Bandit warmup: arm=%s (n=%d)", chosen.arm_id, params[chosen.pk].n)
+        logger.info("Bandit warmup: arm=%s (n=%d)", chosen.arm_id, catalog.n[catalog.index[chosen.pk]])
         return chosen, True, None
 
     # --- ε-greedy ----------------------------------------------------------
@@ -229,14 +728,10 @@ def choose_arm(feature_vector, epsilon=EPSILON):
         return chosen, True, None
 
     # Exploit — pick arm with highest predicted reward
-    best_arm = None
-    best_score = -float("inf")
-    for arm in arms:
-        param = params[arm.pk]
-        score = _predict(param.A_matrix, param.b_vector, feature_vector)
-        if score > best_score:
-            best_score = score
-            best_arm = arm
+    scores = catalog.score(feature_vector)
+    best = int(np.argmax(scores))
+    best_arm = arms[best]
+    best_score = float(scores[best])
 
     logger.info("Bandit exploit: arm=%s predicted=%.4f", best_arm.arm_id, best_score)
     return best_arm, False, best_score
@@ -263,19 +758,174 @@ def update_stats(arm, feature_vector, reward):
 
     Next time we need weights:  weights = A_matrix⁻¹ × b_vector
     i.e. "what worked" divided by "what I've seen" = best prediction.
+
+    A_inv (the cached A_matrix⁻¹) is patched with a Sherman–Morrison
+    update so predictions never need a matrix inversion; every
+    REINVERT_EVERY updates it is recomputed from A_matrix to stop
+    floating-point drift from accumulating.
+
+    Concurrency
+    -----------
+    Popular arms appear in most slates, so parallel ``end_session``
+    requests routinely update the same row.  The read-modify-write runs
+    in one transaction that *starts* with ``UPDATE … SET n = n + 1``: the
+    write takes the row lock (Postgres) or the database write lock
+    (SQLite) before the row is read, so a second worker waits and then
+    reads the first worker's committed A/b instead of overwriting it.
+    The lock is held only for the read, an O(d²) update and the write;
+    the namespace version is bumped after commit (see signals.py), so
+    updates of different arms do not queue on the version row.
     """
-    param, _ = LinearArmParam.objects.get_or_create(
+    with transaction.atomic():
+        # Lock first, then read — n already includes this update
+        locked = LinearArmParam.objects.filter(arm=arm).update(n=F("n") + 1)
+        if not locked:
+            _create_param(arm)
+            LinearArmParam.objects.filter(arm=arm).update(n=F("n") + 1)
+        param = LinearArmParam.objects.get(arm=arm)
+        _apply_update(param, feature_vector, reward)
+
+    logger.info(
+        "Bandit update: arm=%s reward=%.1f n=%d",
+        arm.arm_id, reward, param.n,
+    )
+
+
+def update_stats_batch(arm, X, rewards):
+    """
+    Learn from many sessions for one arm at once — one numpy call, one write.
+
+    Equivalent to calling update_stats once per row, but the whole batch
+    is folded in together:
+
+        A_matrix += XᵀX        (sum of every row's x xᵀ)
+        b_vector += Xᵀr        (sum of every row's reward × x)
+
+    X is an (m, d) array-like of feature vectors and ``rewards`` holds the
+    m matching rewards.  A_inv follows with a Woodbury update while
+    m < d (cheaper than inverting), and is recomputed from A_matrix for
+    larger batches or when the REINVERT_EVERY budget runs out.
+
+    Locking is the same as update_stats (``UPDATE n = n + m`` first), so
+    it is safe alongside concurrent single updates.  Used by the reward
+    queue worker, the simulator and offline rebuilds.
+    """
+    X = np.asarray(X, dtype=float).reshape(-1, FEATURE_DIM)
+    r = np.asarray(rewards, dtype=float).reshape(-1)
+    if len(X) != len(r):
+        raise ValueError(f"update_stats_batch: {len(X)} feature rows but {len(r)} rewards.")
+    if not len(X):
+        return
+
+    m = len(X)
+    with transaction.atomic():
+        locked = LinearArmParam.objects.filter(arm=arm).update(n=F("n") + m)
+        if not locked:
+            _create_param(arm)
+            LinearArmParam.objects.filter(arm=arm).update(n=F("n") + m)
+        param = LinearArmParam.objects.get(arm=arm)
+        _apply_batch(param, X, r)
+
+    logger.info(
+        "Bandit batch update: arm=%s m=%d n=%d",
+        arm.arm_id, m, param.n,
+    )
+
+
+def apply_stats_delta(arm, delta_A, delta_b, delta_n):
+    """
+    Add already-summed sufficient statistics to one arm in a single write.
+
+    A_matrix and b_vector are plain sums over observations, so any number
+    of updates can be merged before they reach the database:
+
+        A_matrix += ΔA      (ΔA = Σ x xᵀ)
+        b_vector += Δb      (Δb = Σ reward × x)
+        n        += Δn
+
+    Used by the delta learner (landing/delta_learner.py) to flush what a
+    process accumulated in memory, and with Δn = 0 (Δb only) by the
+    reward path to raise the reward of an already-counted observation.
+    ΔA is generally full rank, so A_inv and the Cholesky factor are
+    recomputed rather than patched.  Locking is the same as update_stats.
+    """
+    delta_A = np.asarray(delta_A, dtype=float).reshape(FEATURE_DIM, FEATURE_DIM)
+    delta_b = np.asarray(delta_b, dtype=float).reshape(FEATURE_DIM)
+    if delta_n < 0 or (delta_n == 0 and not delta_b.any()):
+        return
+
+    with transaction.atomic():
+        locked = LinearArmParam.objects.filter(arm=arm).update(n=F("n") + delta_n)
+        if not locked:
+            _create_param(arm)
+            LinearArmParam.objects.filter(arm=arm).update(n=F("n") + delta_n)
+        param = LinearArmParam.objects.get(arm=arm)
+        A = np.asarray(param.A_matrix, dtype=float) + delta_A
+        param.A_matrix = A
+        param.b_vector = np.asarray(param.b_vector, dtype=float) + delta_b
+        param.A_inv = np.linalg.inv(A)
+        param.A_chol = np.linalg.cholesky(A)
+        param.updates_since_inversion = 0
+        param.save()
+
+    logger.info(
+        "Bandit delta update: arm=%s dn=%d n=%d",
+        arm.arm_id, delta_n, param.n,
+    )
+
+
+def _apply_batch(param, X, r):
+    """Fold an (m, d) batch into a locked ``param`` row and save it."""
+    m = len(X)
+    A = np.asarray(param.A_matrix, dtype=float) + X.T @ X
+    b = np.asarray(param.b_vector, dtype=float) + X.T @ r
+
+    if (
+        param.A_inv is None
+        or param.A_chol is None
+        or m >= FEATURE_DIM
+        or param.updates_since_inversion + m >= REINVERT_EVERY
+    ):
+        A_inv = np.linalg.inv(A)
+        A_chol = np.linalg.cholesky(A)
+        param.updates_since_inversion = 0
+    else:
+        if m == 1:
+            A_inv = _sherman_morrison(np.asarray(param.A_inv, dtype=float), X[0])
+        else:
+            A_inv = _woodbury(np.asarray(param.A_inv, dtype=float), X)
+        A_chol = param.A_chol
+        for x in X:
+            A_chol = _cholesky_update(A_chol, x)
+        param.updates_since_inversion += m
+
+    param.A_matrix = A
+    param.b_vector = b
+    param.A_inv = A_inv
+    param.A_chol = A_chol
+    param.save()
+
+
+def _create_param(arm):
+    """Create the arm's LinearArmParam row (a no-op if a concurrent request won)."""
+    LinearArmParam.objects.get_or_create(
         arm=arm,
         defaults={
+            "page_id": arm.page_id,
             "A_matrix": make_initial_A(),
             "b_vector": make_initial_b(),
+            "A_inv": make_initial_A_inv(),
+            "A_chol": make_initial_A_chol(),
         },
     )
 
-    # Convert stored lists into numpy arrays for easy math
-    x = np.array(feature_vector)
-    A = np.array(param.A_matrix)
-    b = np.array(param.b_vector)
+
+def _apply_update(param, feature_vector, reward):
+    """Fold one (x, reward) observation into a locked ``param`` row and save it."""
+    # Stored blobs decode to read-only numpy arrays; copy for the math
+    x = np.array(feature_vector, dtype=float)
+    A = np.array(param.A_matrix, dtype=float)
+    b = np.array(param.b_vector, dtype=float)
 
     # "What I've seen" — np.outer(x, x) gives the 8×8 feature combination grid
     A = A + np.outer(x, x)
@@ -283,67 +933,87 @@ def update_stats(arm, feature_vector, reward):
     # "What worked" — features × reward (only changes if reward > 0)
     b = b + reward * x
 
-    # Convert back to plain lists for JSONField storage
-    param.A_matrix = A.tolist()
-    param.b_vector = b.tolist()
-    param.n += 1
+    # Keep A⁻¹ and its Cholesky factor in step with A: rank-1 patches,
+    # or a full re-inversion / re-factorisation now and then
+    if (
+        param.A_inv is None
+        or param.A_chol is None
+        or param.updates_since_inversion + 1 >= REINVERT_EVERY
+    ):
+        A_inv = np.linalg.inv(A)
+        A_chol = np.linalg.cholesky(A)
+        param.updates_since_inversion = 0
+    else:
+        A_inv = _sherman_morrison(np.asarray(param.A_inv, dtype=float), x)
+        A_chol = _cholesky_update(param.A_chol, x)
+        param.updates_since_inversion += 1
+
+    # Arrays are written back as binary float64 blobs
+    param.A_matrix = A
+    param.b_vector = b
+    param.A_inv = A_inv
+    param.A_chol = A_chol
     param.save()
 
-    logger.info(
-        "Bandit update: arm=%s reward=%.1f n=%d",
-        arm.arm_id, reward, param.n,
-    )
-
 
 # ---------------------------------------------------------------------------
 # 4) Conflict detection for slate selection
 # ---------------------------------------------------------------------------
 
-def _has_conflict(arm_a, arm_b):
+def _conflict_profile(cfg):
     """
-    Check whether two arms conflict and cannot coexist in the same slate.
+    Pre-digest one page_config for conflict checks.
 
-    Conflict rules
-    --------------
-    1. Same arm (duplicate).
-    2. Both set the same key in page_config.variants.
-    3. Both have a non-null ``promote`` (only one layout reorder per slate).
-    4. One hides a section that the other highlights / compacts / promotes.
+    Returns ``(variants, promote, hide, active)`` where *active* is every
+    section the arm compacts, restyles or promotes.
     """
-    if arm_a.pk == arm_b.pk:
-        return True
+    variants = set((cfg.get("variants") or {}).keys())
+    promote = cfg.get("promote")
+    hide = set(cfg.get("hide") or [])
+    active = set(cfg.get("compact") or []) | variants
+    if promote:
+        active.add(promote)
+    return variants, promote, hide, active
+
 
-    cfg_a = arm_a.page_config or {}
-    cfg_b = arm_b.page_config or {}
+def _profiles_conflict(profile_a, profile_b):
+    """Apply conflict rules 2–4 to two profiles from _conflict_profile()."""
+    vars_a, promote_a, hide_a, active_a = profile_a
+    vars_b, promote_b, hide_b, active_b = profile_b
 
     # Rule 2: overlapping variants keys
-    vars_a = set(cfg_a.get("variants", {}).keys())
-    vars_b = set(cfg_b.get("variants", {}).keys())
     if vars_a & vars_b:
         return True
 
     # Rule 3: only one promote per slate
-    promote_a = cfg_a.get("promote")
-    promote_b = cfg_b.get("promote")
     if promote_a and promote_b:
         return True
 
     # Rule 4: hide conflicts with compact / variant / promote on the same section
-    hide_a = set(cfg_a.get("hide", []))
-    hide_b = set(cfg_b.get("hide", []))
+    if hide_a & active_b or hide_b & active_a:
+        return True
 
-    active_a = set(cfg_a.get("compact", [])) | vars_a
-    if promote_a:
-        active_a.add(promote_a)
+    return False
 
-    active_b = set(cfg_b.get("compact", [])) | vars_b
-    if promote_b:
-        active_b.add(promote_b)
 
-    if hide_a & active_b or hide_b & active_a:
+def _has_conflict(arm_a, arm_b):
+    """
+    Check whether two arms conflict and cannot coexist in the same slate.
+
+    Conflict rules
+    --------------
+    1. Same arm (duplicate).
+    2. Both set the same key in page_config.variants.
+    3. Both have a non-null ``promote`` (only one layout reorder per slate).
+    4. One hides a section that the other highlights / compacts / promotes.
+    """
+    if arm_a.pk == arm_b.pk:
         return True
 
-    return False
+    return _profiles_conflict(
+        _conflict_profile(arm_a.page_config or {}),
+        _conflict_profile(arm_b.page_config or {}),
+    )
 
 
 def _conflicts_with_slate(arm, slate):
@@ -351,6 +1021,34 @@ def _conflicts_with_slate(arm, slate):
     return any(_has_conflict(arm, chosen) for chosen in slate)
 
 
+def _build_conflict_masks(configs):
+    """
+    Compile the pairwise conflict relation into one integer bitset per arm.
+
+    Bit j of ``masks[i]`` is set when arm i and arm j cannot share a slate.
+    Every arm conflicts with itself (rule 1), so OR-ing the masks of the
+    arms already chosen gives the set of arms that are no longer allowed.
+    """
+    profiles = [_conflict_profile(cfg) for cfg in configs]
+    masks = [1 << i for i in range(len(profiles))]
+    for i in range(len(profiles)):
+        for j in range(i + 1, len(profiles)):
+            if _profiles_conflict(profiles[i], profiles[j]):
+                masks[i] |= 1 << j
+                masks[j] |= 1 << i
+    return masks
+
+
+def _bit_indices(mask):
+    """Return the positions of the set bits in *mask*, lowest first."""
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
 # ---------------------------------------------------------------------------
 # 5) Merge page_configs for a slate of arms
 # ---------------------------------------------------------------------------
@@ -386,100 +1084,504 @@ def merge_page_configs(arms):
     return merged
 
 
+MERGED_CONFIG_CACHE_SIZE = 512   # distinct (arms version, slate) entries kept per worker
+
+
+class _LRUCache:
+    """Small thread-safe least-recently-used mapping."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+_merged_config_cache = _LRUCache(MERGED_CONFIG_CACHE_SIZE)
+
+
+def slate_page_config(arms):
+    """
+    Merged page_config for a slate, memoised per (arms_version, slate).
+
+    Valid slates are few, so merging and JSON-encoding the same slate on
+    every decision is wasted work.  The result is an ``EncodedJSON``: a
+    dict that also carries its serialised text, which the
+    ``accept_cookies`` response and ``BanditDecision.merged_page_config``
+    write verbatim (``PreEncodedJSONEncoder``).  It is shared between requests — do not mutate it.
+
+    The key is the sorted tuple of arm_ids plus the namespace and
+    arms_version of the catalog the arms belong to, and the configs are
+    taken from that same catalog, so an edited arm can never be served
+    from an older entry.  Arms the catalog does not know (e.g. just
+    deactivated) fall back to an uncached merge.
+
+    Arms returned by ``choose_slate`` are the current catalog's own
+    objects, so the version check is skipped for them.
+    """
+    page_id = arms[0].page_id if arms else None
+    catalog = _catalogs.get(page_id)
+    if catalog is None or any(catalog.by_arm_id.get(arm.arm_id) is not arm for arm in arms):
+        catalog = _namespace_catalog(page_id)
+    arm_ids = tuple(sorted(arm.arm_id for arm in arms))
+    key = (page_id, catalog.version[0], arm_ids)
+
+    cached = _merged_config_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        slate = [catalog.by_arm_id[arm_id] for arm_id in arm_ids]
+    except KeyError:
+        return EncodedJSON(merge_page_configs(arms))
+
+    merged = EncodedJSON(merge_page_configs(slate))
+    _merged_config_cache.put(key, merged)
+    return merged
+
+
 # ---------------------------------------------------------------------------
-# 6) choose_slate — combinational contextual multi-armed bandit
+# 6) Slate construction — greedy and exact (branch-and-bound)
 # ---------------------------------------------------------------------------
+#
+# Both work on arm indices into the catalog and the compiled conflict
+# bitsets, so they are plain functions of (scores, masks) and easy to test
+# without a database.
+
+SLATE_SOLVER = "exact"          # "exact" (branch-and-bound) or "greedy"
+SLATE_SOLVER_BUDGET_MS = 1.0    # hard time limit for the exact search
+WARMUP_SCORE = 1e6              # finite stand-in for +inf warmup scores in the exact search
+
+
+def _greedy_slate(scores, conflict_masks, slate_mask, k):
+    """
+    Walk arms from best to worst score and keep each one that fits.
+
+    ``blocked`` is the OR of the chosen arms' conflict bitsets, so each
+    candidate check is a single bit test (non-slate arms start blocked).
+    Ties keep catalog (arm_id) order.
+    """
+    order = np.argsort(-scores, kind="stable")
+    chosen = []
+    blocked = ~slate_mask
+    for i in order:
+        if len(chosen) >= k:
+            break
+        i = int(i)
+        if not (blocked >> i) & 1:
+            chosen.append(i)
+            blocked |= conflict_masks[i]
+    return chosen
+
+
+class _SolverBudgetExceeded(Exception):
+    pass
+
+
+def _exact_slate(scores, conflict_masks, slate_mask, k, budget_ms=SLATE_SOLVER_BUDGET_MS):
+    """
+    Maximum-weight set of ≤ K mutually compatible arms (branch-and-bound).
+
+    Greedy can be fooled: one high-scoring arm may block a better pair of
+    compatible arms. This search finds the true best slate, preferring
+    slates with more arms first and a higher total score second (so it
+    fills K slots whenever greedy would).
+
+    Search
+    ------
+    Candidates are sorted by score, best first, and explored depth-first.
+    Because of the ordering, the best possible completion of a partial
+    slate is its total plus the next (K − size) scores in the list, so a
+    branch is cut as soon as that bound cannot beat the incumbent. The
+    greedy slate seeds the incumbent, which makes pruning effective from
+    the first node.
+
+    If the search runs past ``budget_ms`` it stops and returns the best
+    slate found so far — never worse than greedy. The budget covers the
+    whole call (greedy seed and sort included), and the clock is read
+    every few candidates scanned, so the overshoot stays a few microseconds
+    even on dense conflict graphs where most candidates are skipped.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    greedy = _greedy_slate(scores, conflict_masks, slate_mask, k)
+    finite = np.where(np.isposinf(scores), WARMUP_SCORE, scores)
+
+    order = [int(i) for i in np.argsort(-finite, kind="stable") if (slate_mask >> int(i)) & 1]
+    values = finite[order].tolist()
+    n = len(order)
+    k = min(k, n)
+    prefix = [0.0]
+    for v in values:
+        prefix.append(prefix[-1] + v)
+
+    best = {
+        "slate": greedy,
+        "size": len(greedy),
+        "total": float(sum(finite[i] for i in greedy)),
+    }
+    steps = 0
+
+    def better(size, total):
+        return size > best["size"] or (size == best["size"] and total > best["total"] + 1e-12)
+
+    def search(pos, picked, total, blocked):
+        nonlocal steps
+        size = len(picked)
+        if better(size, total):
+            best.update(slate=list(picked), size=size, total=total)
+        if size == k:
+            return
+        need = k - size
+        for p in range(pos, n):
+            # Every scanned candidate counts, not just every node: blocked
+            # candidates are most of the work on dense conflict graphs.
+            steps += 1
+            if steps & 0x1F == 0 and time.perf_counter() > deadline:
+                raise _SolverBudgetExceeded
+            # Not enough arms left to reach the incumbent's size.
+            if size + (n - p) < best["size"]:
+                break
+            # Even the best-scoring completion cannot beat a full incumbent.
+            if best["size"] == k and total + prefix[min(n, p + need)] - prefix[p] <= best["total"] + 1e-12:
+                break
+            i = order[p]
+            if (blocked >> i) & 1:
+                continue
+            picked.append(i)
+            search(p + 1, picked, total + values[p], blocked | conflict_masks[i])
+            picked.pop()
+
+    try:
+        search(0, [], 0.0, 0)
+    except _SolverBudgetExceeded:
+        logger.debug("Exact slate search hit the %.2f ms budget after %d steps.", budget_ms, steps)
+
+    # Present the slate best-first, like greedy does (ties by index, as
+    # the stable argsort orders them).
+    return sorted(best["slate"], key=lambda i: (-finite[i], i))
+
+
+# ---------------------------------------------------------------------------
+# 7) choose_slate / decide_slate — combinational contextual multi-armed bandit
+# ---------------------------------------------------------------------------
+#
+# Two slate policies share the same scoring, warmup and conflict-aware
+# slate search; they differ only in how they explore:
+#
+#   epsilon_greedy – exploit the mean scores, and with probability ε swap
+#                    one slot for a random valid arm.
+#   thompson       – score each arm with weights sampled from its posterior
+#                    N(θ, σ²A⁻¹) and exploit those; uncertain arms get
+#                    picked more often, well-known losers almost never.
+#   linucb         – score each arm optimistically, θ·x + α·sqrt(xᵀA⁻¹x):
+#                    deterministic, and exploration shrinks as A grows.
+#
+# The deployment default comes from ``settings.BANDIT_POLICY``.
 
 SLATE_K = 3   # number of arms per slate
 
+POLICY_EPSILON_GREEDY = "epsilon_greedy"
+POLICY_THOMPSON = "thompson"
+POLICY_LINUCB = "linucb"
+SLATE_POLICIES = (POLICY_EPSILON_GREEDY, POLICY_THOMPSON, POLICY_LINUCB)
+
+
+def default_policy():
+    """The slate policy configured for this deployment (``settings.BANDIT_POLICY``)."""
+    return getattr(settings, "BANDIT_POLICY", POLICY_EPSILON_GREEDY)
+
+
+@dataclass
+class SlateDecision:
+    """Outcome of one slate decision (see decide_slate)."""
+
+    arms: list                     # chosen BanditArm objects, best first
+    explored: bool                 # True if the slate differs from the pure-exploit slate
+    predicted_scores: dict = field(default_factory=dict)   # arm_id → mean predicted reward
+    policy: str = POLICY_EPSILON_GREEDY
+    epsilon: float = 0.0           # ε used (0.0 for policies that don't use it)
+    propensity: float | None = None   # P(this slate) under the policy; None if not computable
+    page_id: int | None = None     # namespace the arms came from (None = shared arms)
+
+
+def _epsilon_greedy_propensity(catalog, exploit_idx, chosen_idx, epsilon):
+    """
+    Probability that ε-greedy returns *chosen_idx* (as a set) given its exploit slate.
+
+    Mirrors the exploration step in decide_slate: keep the exploit slate
+    with probability 1 − ε, otherwise pick one of its K slots uniformly
+    and replace it with a uniform draw from the arms that fit next to the
+    other K − 1 (which includes the arm being replaced).
+    """
+    if not exploit_idx:
+        return 1.0
+    chosen = set(chosen_idx)
+    k = len(exploit_idx)
+    same = chosen == set(exploit_idx)
+    p = (1.0 - epsilon) if same else 0.0
+    for slot in range(k):
+        rest = exploit_idx[:slot] + exploit_idx[slot + 1:]
+        candidates = catalog.slate_mask & ~catalog.blocked_by(rest)
+        n_candidates = candidates.bit_count()
+        if not n_candidates:
+            # Nothing fits — decide_slate keeps the exploit slate
+            p += epsilon / k if same else 0.0
+            continue
+        extra = chosen.difference(rest)
+        if len(chosen) == k and len(extra) == 1 and (candidates >> extra.pop()) & 1:
+            p += epsilon / k / n_candidates
+    return p
+
+
+def _best_slate(catalog, scores, k):
+    """Run the configured slate search (SLATE_SOLVER) over per-arm scores."""
+    if SLATE_SOLVER == "exact":
+        return _exact_slate(scores, catalog.conflict_masks, catalog.slate_mask, k)
+    return _greedy_slate(scores, catalog.conflict_masks, catalog.slate_mask, k)
+
+
+# ---------------------------------------------------------------------------
+# Quantized exploit cache (BANDIT_EXPLOIT_CACHE)
+# ---------------------------------------------------------------------------
+#
+# Returning visitors fall into few regions of feature space (device, a
+# handful of dominant intent mixes, visit_number_norm in 0.1 steps), so the
+# ε-greedy exploit slate is mostly recomputed for contexts it has just seen.
+# The cache maps a context rounded to EXPLOIT_CACHE_GRID, plus the page, arms
+# version and K, to the exploit slate (arm indices) and the params version
+# it was computed under.  An entry is served while it trails the live
+# params_version by at most BANDIT_EXPLOIT_CACHE_MAX_LAG versions; older
+# entries count as stale and are recomputed.  Every reward bumps the version
+# once per updated arm, so a lag of 0 throws the whole cache away on each
+# reward; the default lets a slate trail the model by ~10 rewards (K = 3),
+# which barely moves θ once every arm is past warmup.  Exploration swaps happen after the
+# lookup and are never cached; during warmup (some slate arm under-pulled)
+# the cache is bypassed.  The control arm never enters a slate, so its
+# pull count does not matter here.
+
+EXPLOIT_CACHE_SIZE = 4096        # quantized contexts remembered per worker
+EXPLOIT_CACHE_MAX_LAG = 30       # default BANDIT_EXPLOIT_CACHE_MAX_LAG (params versions an entry may trail by)
+EXPLOIT_CACHE_GRID = {name: 0.1 for name in FEATURE_NAMES}   # rounding step per feature (tune here)
+
+
+def exploit_cache_enabled():
+    """True when ε-greedy exploit slates are memoised per quantized context."""
+    return getattr(settings, "BANDIT_EXPLOIT_CACHE", False)
+
+
+def exploit_cache_max_lag():
+    """Params versions a cached exploit slate may trail the live model by and still be served."""
+    return getattr(settings, "BANDIT_EXPLOIT_CACHE_MAX_LAG", EXPLOIT_CACHE_MAX_LAG)
+
+
+def cache_stats_enabled():
+    """True when ``GET /bandit/cache-stats/`` may serve this worker's cache counters."""
+    return bool(getattr(settings, "BANDIT_CACHE_STATS", False))
+
+
+_exploit_cache = _LRUCache(EXPLOIT_CACHE_SIZE)
+_exploit_grid = [EXPLOIT_CACHE_GRID[name] for name in FEATURE_NAMES]
+_exploit_stats = {"hits": 0, "misses": 0, "stale": 0, "bypassed": 0, "lag_total": 0}
+_exploit_stats_lock = threading.Lock()
+
+
+def _count_exploit(outcome, lag=0):
+    with _exploit_stats_lock:
+        _exploit_stats[outcome] += 1
+        _exploit_stats["lag_total"] += lag
+
+
+def _cached_exploit_slate(catalog, feature_vector, exploit_scores, k):
+    """The exploit slate for this context — from the cache when a fresh-enough entry exists."""
+    if not catalog.warm[~catalog.is_control].all():
+        _count_exploit("bypassed")
+        return _best_slate(catalog, exploit_scores, k)
+
+    arms_version, params_version = catalog.version
+    cell = tuple(round(v / step) for v, step in zip(feature_vector, _exploit_grid))
+    key = (catalog.page_id, arms_version, k, cell)
+    entry = _exploit_cache.get(key)
+    if entry is not None:
+        lag = params_version - entry[0]
+        if 0 <= lag <= exploit_cache_max_lag():
+            _count_exploit("hits", lag)
+            return list(entry[1])
+        _count_exploit("stale")
+    else:
+        _count_exploit("misses")
 
-def choose_slate(feature_vector, k=SLATE_K, epsilon=EPSILON):
+    slate = _best_slate(catalog, exploit_scores, k)
+    _exploit_cache.put(key, (params_version, tuple(slate)))
+    return slate
+
+
+def exploit_cache_stats():
+    """Counters of the quantized exploit cache in this process, for tuning the grid."""
+    with _exploit_stats_lock:
+        stats = dict(_exploit_stats)
+    lookups = stats["hits"] + stats["misses"] + stats["stale"]
+    lag_total = stats.pop("lag_total")
+    stats["size"] = len(_exploit_cache)
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["stale_rate"] = stats["stale"] / lookups if lookups else 0.0
+    stats["mean_hit_lag"] = lag_total / stats["hits"] if stats["hits"] else 0.0
+    return stats
+
+
+def reset_exploit_cache():
+    """Drop every cached slate and zero the counters."""
+    _exploit_cache.clear()
+    with _exploit_stats_lock:
+        for name in _exploit_stats:
+            _exploit_stats[name] = 0
+
+
+def decide_slate(feature_vector, k=SLATE_K, epsilon=EPSILON, policy=None, page_id=None):
     """
-    Choose a slate of K non-conflicting arms using ε-greedy exploration.
+    Choose a slate of K non-conflicting arms with the given policy.
+
+    Only the arms of *page_id*'s namespace are scored (see
+    get_arm_catalog; ``None`` = the shared arms).
 
     Algorithm
     ---------
-    1. Score every active arm via the linear model (w · x).
+    1. Score every active arm via the linear model (w · x) — for Thompson
+       sampling with one posterior draw of w per arm, for LinUCB plus the
+       confidence bonus α·sqrt(xᵀA⁻¹x).
        Under-pulled arms (n < MIN_PULLS_PER_ARM) get +inf for warmup.
-    2. Greedily pick top-K non-conflicting arms (``no_change`` excluded).
-    3. With probability ε, replace ONE random slot with a random valid arm.
+    2. Pick the best top-K non-conflicting arms (``no_change`` excluded):
+       exact branch-and-bound search by default (SLATE_SOLVER), greedy
+       otherwise or when the search runs out of its time budget.
+       With ``BANDIT_EXPLOIT_CACHE`` the ε-greedy exploit slate comes from
+       the quantized exploit cache when it holds one for this context.
+    3. ε-greedy only: with probability ε, replace ONE random slot with a
+       random valid arm.
     4. If fewer than K valid arms exist, return a shorter slate.
 
-    Returns
-    -------
-    chosen : list[BanditArm]
-    explored : bool
-    predicted_scores : dict[str, float]   arm_id → predicted reward
+    The decision also carries the probability the policy had of picking
+    this slate (``propensity``) for off-policy evaluation: exact for
+    ε-greedy, 1.0 for LinUCB, ``None`` for Thompson sampling.
+
+    Returns a SlateDecision.
     """
-    arms = list(BanditArm.objects.filter(is_active=True))
+    policy = policy or default_policy()
+    if policy not in SLATE_POLICIES:
+        raise ValueError(f"Unknown bandit policy {policy!r}; expected one of {SLATE_POLICIES}.")
+
+    clock = stage_clock()
+    catalog = get_arm_catalog(page_id)
+    arms = catalog.arms
     if not arms:
         raise ValueError("No active BanditArm rows — run seed_bandit_arms first.")
-
-    # Ensure every arm has linear-model parameters
-    params = {}
-    for arm in arms:
-        param, _ = LinearArmParam.objects.get_or_create(
-            arm=arm,
-            defaults={
-                "A_matrix": make_initial_A(),
-                "b_vector": make_initial_b(),
-            },
-        )
-        params[arm.pk] = param
-
-    # Score arms — under-pulled get +inf (forced warmup)
-    arm_scores = []
-    for arm in arms:
-        if arm.arm_id == "no_change":
-            continue  # exclude control from slate
-        p = params[arm.pk]
-        score = (
-            float("inf")
-            if p.n < MIN_PULLS_PER_ARM
-            else _predict(p.A_matrix, p.b_vector, feature_vector)
-        )
-        arm_scores.append((arm, score))
-
-    # Sort descending by predicted score
-    arm_scores.sort(key=lambda pair: pair[1], reverse=True)
-
-    # --- greedy selection of top-K non-conflicting arms --------------------
-    chosen = []
-    for arm, _score in arm_scores:
-        if len(chosen) >= k:
-            break
-        if not _conflicts_with_slate(arm, chosen):
-            chosen.append(arm)
-
-    # --- ε-greedy exploration: swap one slot with a random valid arm -------
-    explored = False
-    if chosen and random.random() < epsilon:
-        explored = True
-        slot = random.randint(0, len(chosen) - 1)
-        rest = chosen[:slot] + chosen[slot + 1:]
-        candidates = [
-            a for a in arms
-            if a.arm_id != "no_change"
-            and a not in rest
-            and not _conflicts_with_slate(a, rest)
-        ]
-        if candidates:
-            replacement = random.choice(candidates)
-            chosen = rest[:slot] + [replacement] + rest[slot:]
+    clock.lap("catalog")
+
+    # Score every arm in one matmul — under-pulled get +inf (forced warmup)
+    warm = catalog.warm
+    mean_scores = catalog.score(feature_vector)
+    exploit_scores = np.where(warm, mean_scores, np.inf)
+
+    if policy == POLICY_THOMPSON:
+        # One vectorised posterior draw for all arms, then exploit the draw
+        rng = np.random.default_rng(random.getrandbits(64))
+        sampled = np.where(warm, catalog.sample_scores(feature_vector, rng), np.inf)
+        clock.lap("score")
+        chosen_idx = _best_slate(catalog, sampled, k)
+        explored = sorted(chosen_idx) != sorted(_best_slate(catalog, exploit_scores, k))
+        epsilon = 0.0
+        propensity = None   # no closed form for the probability of a sampled slate
+    elif policy == POLICY_LINUCB:
+        # Optimism under uncertainty: mean score plus a per-arm confidence bonus
+        bonus = LINUCB_ALPHA * catalog.confidence_widths(feature_vector)
+        optimistic = np.where(warm, mean_scores + bonus, np.inf)
+        clock.lap("score")
+        chosen_idx = _best_slate(catalog, optimistic, k)
+        explored = sorted(chosen_idx) != sorted(_best_slate(catalog, exploit_scores, k))
+        epsilon = 0.0
+        propensity = 1.0    # deterministic
+    else:
+        clock.lap("score")
+        # --- best top-K non-conflicting arms -------------------------------
+        if exploit_cache_enabled():
+            exploit_idx = _cached_exploit_slate(catalog, feature_vector, exploit_scores, k)
+        else:
+            exploit_idx = _best_slate(catalog, exploit_scores, k)
+        chosen_idx = exploit_idx
+
+        # --- ε-greedy exploration: swap one slot with a random valid arm ---
+        explored = False
+        if chosen_idx and random.random() < epsilon:
+            explored = True
+            slot = random.randint(0, len(chosen_idx) - 1)
+            rest = chosen_idx[:slot] + chosen_idx[slot + 1:]
+            candidates = _bit_indices(catalog.slate_mask & ~catalog.blocked_by(rest))
+            if candidates:
+                replacement = random.choice(candidates)
+                chosen_idx = rest[:slot] + [replacement] + rest[slot:]
+        propensity = _epsilon_greedy_propensity(catalog, exploit_idx, chosen_idx, epsilon)
+    clock.lap("slate")
+
+    chosen = [arms[i] for i in chosen_idx]
 
     # --- predicted scores for logging / debugging --------------------------
     predicted_scores = {}
-    for arm in chosen:
-        p = params[arm.pk]
-        if p.n >= MIN_PULLS_PER_ARM:
-            predicted_scores[arm.arm_id] = _predict(
-                p.A_matrix, p.b_vector, feature_vector,
-            )
+    for i, arm in zip(chosen_idx, chosen):
+        if warm[i]:
+            predicted_scores[arm.arm_id] = float(mean_scores[i])
 
     logger.info(
-        "Bandit slate: arms=%s explore=%s",
+        "Bandit slate: policy=%s arms=%s explore=%s",
+        policy,
         [a.arm_id for a in chosen],
         explored,
     )
 
-    return chosen, explored, predicted_scores
+    return SlateDecision(
+        arms=chosen,
+        explored=explored,
+        predicted_scores=predicted_scores,
+        policy=policy,
+        epsilon=epsilon,
+        propensity=propensity,
+        page_id=catalog.page_id,
+    )
+
+
+def choose_slate(feature_vector, k=SLATE_K, epsilon=EPSILON, policy=None, page_id=None):
+    """
+    Choose a slate of K non-conflicting arms (tuple form of decide_slate).
+
+    Returns
+    -------
+    chosen : list[BanditArm]
+    explored : bool
+    predicted_scores : dict[str, float]   arm_id → predicted reward
+    """
+    decision = decide_slate(feature_vector, k=k, epsilon=epsilon, policy=policy, page_id=page_id)
+    return decision.arms, decision.explored, decision.predicted_scores
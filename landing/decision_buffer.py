@@ -0,0 +1,228 @@
+"""
+Decision buffer — log BanditDecision rows without a DB round trip per page-load.
+
+DecisionBuffer   – per-process ring of unsaved decisions, written with one bulk_create
+decision_buffer  – the process-wide buffer (background flush + flush at exit)
+log_decision     – record one decision: buffered when enabled, else a plain INSERT
+flush_decision   – make sure a session's decision is in the DB (flush on demand)
+
+Why
+---
+``accept_cookies`` used to INSERT its BanditDecision (four JSON columns)
+before it could answer, so every personalised page-load paid a DB round
+trip just for logging.  With ``settings.BANDIT_DECISION_BUFFER = True``
+the unsaved row is appended to an in-memory buffer instead, and a
+background thread writes everything pending with ``bulk_create`` every
+DECISION_FLUSH_SECONDS — or as soon as DECISION_FLUSH_ROWS are waiting.
+A full buffer (DECISION_BUFFER_CAPACITY rows) is flushed by the request
+that fills it; if the DB stays down, the oldest rows are dropped, so
+memory stays bounded.
+
+Reading it back
+---------------
+The reward path looks the decision up by session.  ``_plan_reward``
+first calls ``flush_decision(session)``: if this process still holds
+that session's decision, the buffer is flushed right away, so the lookup
+finds it.  A flush already in progress is waited for (its rows are
+neither pending nor committed while it runs).  A decision buffered by *another* worker reaches the DB within
+one flush interval — far shorter than any real visit — and queued
+rewards (``BANDIT_REWARD_QUEUE``) are processed later still.
+
+Durability
+----------
+Pending rows are flushed at normal process exit (``atexit``).  A failed
+flush puts its unwritten rows back (up to the capacity) for the next
+attempt.  A process killed outright
+loses at most one flush interval of decision logs (those sessions are
+simply not rewarded).
+"""
+
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .models import BanditDecision
+
+logger = logging.getLogger(__name__)
+
+DECISION_FLUSH_SECONDS = 0.25       # write pending decisions at least this often
+DECISION_FLUSH_ROWS = 200           # ... or as soon as this many are pending
+DECISION_BUFFER_CAPACITY = 10_000   # a full buffer is flushed by the request that fills it
+
+
+def decision_buffer_enabled():
+    """True when decisions should be buffered in memory instead of inserted immediately."""
+    return getattr(settings, "BANDIT_DECISION_BUFFER", False)
+
+
+class DecisionBuffer:
+    """
+    Thread-safe buffer of unsaved BanditDecision instances keyed by session id.
+
+    ``add`` wakes the flusher once ``flush_rows`` are pending and flushes
+    synchronously when ``capacity`` is reached; ``start`` runs a daemon
+    thread that flushes every ``flush_seconds``.
+    """
+
+    def __init__(
+        self,
+        flush_seconds=DECISION_FLUSH_SECONDS,
+        flush_rows=DECISION_FLUSH_ROWS,
+        capacity=DECISION_BUFFER_CAPACITY,
+    ):
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        self.capacity = capacity
+        self._pending = OrderedDict()     # session id → unsaved BanditDecision
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, decision):
+        """Buffer an unsaved decision; wakes or runs a flush when enough are pending."""
+        with self._lock:
+            self._pending[decision.session_id] = decision
+            count = len(self._pending)
+        if count >= self.capacity or (count >= self.flush_rows and self._thread is None):
+            self.flush()
+        elif count >= self.flush_rows:
+            self._wake.set()
+
+    def pending(self):
+        """Number of decisions not yet written."""
+        return len(self._pending)
+
+    def holds(self, session_id):
+        """True if the decision for *session_id* is still waiting in this buffer."""
+        return session_id in self._pending
+
+    def flush(self):
+        """
+        Write every pending decision with one bulk_create; return the number written.
+
+        Rows are swapped out under the lock, so decisions arriving during
+        the flush go into the next one.  If the batch violates a constraint
+        (e.g. its session was deleted meanwhile) the rows are inserted one
+        by one and the offending ones dropped; any other failure puts the
+        rows not yet written back (ahead of newer ones) for a retry.
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def flush_session(self, session_id):
+        """
+        Make sure *session_id*'s decision has been written, if this buffer had it.
+
+        Waits for an in-flight flush first: while one runs, its rows are
+        neither pending nor committed, and a lookup would miss them.  If
+        that flush failed, the rows are pending again and are flushed now.
+        """
+        with self._flush_lock:
+            if session_id in self._pending:
+                self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+        if not pending:
+            return 0
+        total = len(pending)
+        try:
+            try:
+                with transaction.atomic():
+                    BanditDecision.objects.bulk_create(list(pending.values()), batch_size=500)
+            except IntegrityError:
+                return self._insert_one_by_one(pending)
+        except Exception:
+            logger.exception("Decision buffer flush failed; %d row(s) kept for retry.", len(pending))
+            self._restore(pending)
+            return 0
+        return total
+
+    def _insert_one_by_one(self, pending):
+        """Insert *pending* row by row, dropping constraint violators; written rows leave *pending*."""
+        written = 0
+        while pending:
+            session_id, decision = next(iter(pending.items()))
+            try:
+                with transaction.atomic():
+                    decision.save(force_insert=True)
+                written += 1
+            except IntegrityError:
+                logger.warning("Dropping buffered decision for session %s (constraint violation).", session_id)
+            del pending[session_id]
+        return written
+
+    def _restore(self, pending):
+        """Put unwritten rows back ahead of the ones added meanwhile."""
+        with self._lock:
+            pending.update(self._pending)
+            # Still bounded while the DB is down: the oldest rows go first
+            while len(pending) > self.capacity:
+                pending.popitem(last=False)
+            self._pending = pending
+
+    def start(self):
+        """Start the background flush thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None or self.flush_seconds <= 0:
+                return
+            self._thread = threading.Thread(target=self._run, name="bandit-decision-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                # This thread owns its own DB connection; don't hold it between flushes
+                connection.close()
+
+    def stop(self):
+        """Stop the background thread and flush what is left."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_seconds + 1)
+        self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def decision_buffer():
+    """The process-wide DecisionBuffer, created (and its flusher started) on first use."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                buffer = DecisionBuffer()
+                buffer.start()
+                atexit.register(buffer.stop)
+                _buffer = buffer
+    return _buffer
+
+
+def log_decision(**fields):
+    """Record a BanditDecision — buffered when the decision buffer is enabled."""
+    decision = BanditDecision(**fields)
+    if decision_buffer_enabled():
+        decision_buffer().add(decision)
+    else:
+        decision.save(force_insert=True)
+    return decision
+
+
+def flush_decision(session):
+    """Make sure this process's buffer has written *session*'s decision (if it had it)."""
+    if _buffer is not None:
+        _buffer.flush_session(session.pk)
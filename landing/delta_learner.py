@@ -0,0 +1,187 @@
+"""
+Delta learner — accumulate bandit updates in memory and merge them periodically.
+
+DeltaAccumulator  – per-process ΔA / Δb / Δn per arm, flushed in one write per arm
+delta_learner     – the process-wide accumulator (background flush + flush at exit)
+learn             – record one observation: delta learner or update_stats
+
+Why
+---
+A_matrix and b_vector are sums over observations, so the order and
+grouping of updates does not matter:
+
+    A = λI + Σ x xᵀ        b = Σ reward × x
+
+Instead of a locked read-modify-write on the shared LinearArmParam row
+for every reward, each process (or app node) adds ΔA = x xᵀ and
+Δb = reward × x to an in-memory delta and merges it into the row every
+DELTA_FLUSH_SECONDS or every DELTA_FLUSH_OBSERVATIONS observations —
+whichever comes first — with one transaction per arm
+(``apply_stats_delta``).  Row locks are taken once per arm per flush
+instead of once per reward, so several nodes can learn without
+contending on popular arms.
+
+Enabled with ``settings.BANDIT_DELTA_LEARNER = True``.
+
+Durability
+----------
+Pending deltas are flushed when the process exits normally (``atexit``,
+which also runs on a graceful gunicorn worker shutdown).  A flush that
+fails puts its deltas back so the next flush retries them.  A process
+killed outright (SIGKILL, OOM) loses at most one flush interval of
+learning; decisions are still recorded and rewarded.
+"""
+
+import atexit
+import logging
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .bandit_utils import FEATURE_DIM, apply_stats_delta, update_stats
+
+logger = logging.getLogger(__name__)
+
+DELTA_FLUSH_SECONDS = 5.0        # merge pending deltas at least this often
+DELTA_FLUSH_OBSERVATIONS = 100   # ... or as soon as this many observations are pending
+
+
+def delta_learner_enabled():
+    """True when rewards should be accumulated in memory instead of written immediately."""
+    return getattr(settings, "BANDIT_DELTA_LEARNER", False)
+
+
+class _ArmDelta:
+    __slots__ = ("arm", "A", "b", "n")
+
+    def __init__(self, arm):
+        self.arm = arm
+        self.A = np.zeros((FEATURE_DIM, FEATURE_DIM))
+        self.b = np.zeros(FEATURE_DIM)
+        self.n = 0
+
+    def merge(self, other):
+        self.A += other.A
+        self.b += other.b
+        self.n += other.n
+
+
+class DeltaAccumulator:
+    """
+    Thread-safe per-arm ΔA / Δb / Δn, merged into the DB by ``flush()``.
+
+    ``add`` flushes by itself once ``flush_observations`` are pending;
+    ``start`` runs a daemon thread that flushes every ``flush_seconds``.
+    """
+
+    def __init__(self, flush_seconds=DELTA_FLUSH_SECONDS, flush_observations=DELTA_FLUSH_OBSERVATIONS):
+        self.flush_seconds = flush_seconds
+        self.flush_observations = flush_observations
+        self._pending = {}          # arm pk → _ArmDelta
+        self._count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, arm, feature_vector, reward):
+        """Record one observation for *arm*; flushes if enough are pending."""
+        x = np.asarray(feature_vector, dtype=float).reshape(FEATURE_DIM)
+        with self._lock:
+            delta = self._pending.get(arm.pk)
+            if delta is None:
+                delta = self._pending[arm.pk] = _ArmDelta(arm)
+            delta.A += np.outer(x, x)
+            delta.b += reward * x
+            delta.n += 1
+            self._count += 1
+            full = self._count >= self.flush_observations
+        if full:
+            self.flush()
+
+    def pending(self):
+        """Number of observations not yet merged into the DB."""
+        return self._count
+
+    def flush(self):
+        """
+        Merge every pending delta into its arm's row; return the number of arms written.
+
+        Deltas are swapped out under the lock, so observations arriving
+        during the flush go into the next one.  If an arm's write fails,
+        its delta (and any not yet attempted) is put back for a retry.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._count = 0
+            written = 0
+            deltas = list(pending.values())
+            try:
+                for delta in deltas:
+                    apply_stats_delta(delta.arm, delta.A, delta.b, delta.n)
+                    written += 1
+            except Exception:
+                logger.exception("Delta learner flush failed; %d arm(s) kept for retry.", len(deltas) - written)
+                self._restore(deltas[written:])
+            return written
+
+    def _restore(self, deltas):
+        with self._lock:
+            for delta in deltas:
+                current = self._pending.get(delta.arm.pk)
+                if current is None:
+                    self._pending[delta.arm.pk] = delta
+                else:
+                    current.merge(delta)
+                self._count += delta.n
+
+    def start(self):
+        """Start the background flush thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None or self.flush_seconds <= 0:
+                return
+            self._thread = threading.Thread(target=self._run, name="bandit-delta-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            finally:
+                # This thread owns its own DB connection; don't hold it between flushes
+                connection.close()
+
+    def stop(self):
+        """Stop the background thread and flush what is left."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_seconds + 1)
+        self.flush()
+
+
+_accumulator = None
+_accumulator_lock = threading.Lock()
+
+
+def delta_learner():
+    """The process-wide DeltaAccumulator, created (and its flusher started) on first use."""
+    global _accumulator
+    if _accumulator is None:
+        with _accumulator_lock:
+            if _accumulator is None:
+                accumulator = DeltaAccumulator()
+                accumulator.start()
+                atexit.register(accumulator.stop)
+                _accumulator = accumulator
+    return _accumulator
+
+
+def learn(arm, feature_vector, reward):
+    """Apply one observation — buffered by the delta learner when it is enabled."""
+    if delta_learner_enabled():
+        delta_learner().add(arm, feature_vector, reward)
+    else:
+        update_stats(arm, feature_vector, reward)
@@ -0,0 +1,91 @@
+"""
+User-agent → device classification, shared by the live site and the simulator.
+
+classify_user_agent – cached UA string → DeviceInfo (category, is_bot, is_mobile)
+is_bot_user_agent   – shortcut used to keep crawlers out of the bandit
+
+Categories
+----------
+    bot      crawlers, link previewers, headless browsers, HTTP libraries
+    tablet   iPad, Kindle / Silk, Android without "Mobile"
+    mobile   phones (iPhone, Android Mobile, Opera Mini, …)
+    desktop  everything else
+
+One compiled regex (an alternation with a named group per category)
+scans the lowercased UA once; the highest category found in the order
+above wins.  Results are memoised per raw UA string in a bounded LRU
+cache — real traffic has few distinct UAs, so a warm worker almost never
+runs the regex.
+
+Bots get the control page: no BanditDecision is created and no reward
+is applied, so crawler traffic never writes to the model.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+DEVICE_DESKTOP = "desktop"
+DEVICE_MOBILE = "mobile"
+DEVICE_TABLET = "tablet"
+DEVICE_BOT = "bot"
+DEVICE_CATEGORIES = (DEVICE_DESKTOP, DEVICE_MOBILE, DEVICE_TABLET, DEVICE_BOT)
+MOBILE_CATEGORIES = (DEVICE_MOBILE, DEVICE_TABLET)   # is_mobile = 1 in the feature vector
+
+UA_CACHE_SIZE = 4096     # distinct user-agent strings remembered per worker
+UA_MAX_LENGTH = 512      # longer UAs are truncated before classification / caching
+
+# Matched against the lowercased UA (much faster than re.IGNORECASE)
+_UA_PATTERN = re.compile(
+    r"(?P<bot>bot\b|bot/|crawl|spider|slurp|mediapartners|facebookexternalhit|"
+    r"embedly|preview|headless|lighthouse|python-requests|python-urllib|curl/|wget/|"
+    r"go-http-client|okhttp|java/|httpclient|scrapy)"
+    r"|(?P<tablet>ipad|tablet|kindle|silk/|playbook|android(?!.*mobile))"
+    r"|(?P<mobile>mobile|iphone|ipod|android|opera mini|iemobile|blackberry|windows phone)",
+    re.DOTALL,
+)
+
+
+@dataclass(frozen=True)
+class DeviceInfo:
+    """Classification of one user-agent string."""
+
+    category: str
+
+    @property
+    def is_bot(self):
+        return self.category == DEVICE_BOT
+
+    @property
+    def is_mobile(self):
+        """Phones and tablets — the bandit's ``is_mobile`` feature."""
+        return device_is_mobile(self.category)
+
+
+def device_is_mobile(category):
+    """True for device categories that count as mobile in the feature vector."""
+    return category in MOBILE_CATEGORIES
+
+
+_DEVICE_INFO = {category: DeviceInfo(category) for category in DEVICE_CATEGORIES}
+
+
+@lru_cache(maxsize=UA_CACHE_SIZE)
+def _classify(ua):
+    if not ua:
+        return _DEVICE_INFO[DEVICE_DESKTOP]
+    found = {match.lastgroup for match in _UA_PATTERN.finditer(ua.lower())}
+    for category in (DEVICE_BOT, DEVICE_TABLET, DEVICE_MOBILE):
+        if category in found:
+            return _DEVICE_INFO[category]
+    return _DEVICE_INFO[DEVICE_DESKTOP]
+
+
+def classify_user_agent(ua):
+    """Classify a raw ``User-Agent`` header value (cached per string)."""
+    return _classify((ua or "")[:UA_MAX_LENGTH])
+
+
+def is_bot_user_agent(ua):
+    """True when the user agent belongs to a crawler or automated client."""
+    return classify_user_agent(ua).is_bot
@@ -0,0 +1,210 @@
+"""
+Declarative feature pipeline — the bandit's feature vector, defined once.
+
+FeatureSpec        – one feature: name, the columns it depends on, a vectorised batch function
+FeaturePipeline    – ordered registry of specs; transform (N rows → float32 matrix) / transform_one
+FEATURES           – the pipeline the bandit uses (FEATURE_NAMES / FEATURE_DIM come from it)
+register_feature   – decorator adding a feature to FEATURES
+featurize_contexts – logged ``context_json`` dicts → feature matrix (replays, retraining)
+
+How it works (plain English)
+----------------------------
+Every feature is a small function that takes whole numpy columns and
+returns one column — the same code featurizes one visitor on the live
+site and a million logged decisions offline, as column operations
+rather than a Python loop per row.
+
+A feature's dependencies are either raw input columns (``user_agent``,
+the five ``*_intent_score`` fields, ``visit_count``) or features
+registered before it.  Features registered with
+``output=False`` (e.g. ``device``, derived from ``user_agent``) are
+computed only when something needs them and are not part of the vector;
+the others become its columns, in registration order.
+
+A column passed in under a feature's own name is used as that feature's
+value and its function is skipped — the live site passes the ``device``
+it has already classified, and the simulator its own visit scale.
+
+Adding a feature means adding one ``@register_feature`` function here;
+``FEATURE_DIM`` follows, and ``rebuild_bandit_params --refeaturize``
+retrains every arm at the new dimension from the logged contexts.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+import numpy as np
+
+from .device import DEVICE_DESKTOP, DEVICE_MOBILE, MOBILE_CATEGORIES, classify_user_agent
+from .visitor_features import INTENT_FIELDS
+
+VISIT_COUNT_CAP = 10        # visit_number_norm = min(visit_count, cap) / cap
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """One feature: ``batch(*columns)`` maps its input columns to its own column."""
+
+    name: str
+    inputs: Tuple[str, ...]
+    batch: Callable
+    output: bool = True
+
+
+class FeaturePipeline:
+    """
+    An ordered set of FeatureSpecs.
+
+    Dependencies must be registered before the features that use them,
+    so registration order is a valid evaluation order and cycles cannot
+    occur.  Any input that is not a registered feature is a raw column
+    the caller has to supply.
+    """
+
+    def __init__(self):
+        self._specs = {}
+        self.raw_inputs = []
+        self.names = []
+
+    def register(self, name, inputs=(), output=True):
+        """Decorator: register ``fn(*input_columns) -> column`` as feature *name*."""
+        def decorator(fn):
+            self.add(FeatureSpec(name, tuple(inputs), fn, output))
+            return fn
+        return decorator
+
+    def add(self, spec):
+        if spec.name in self._specs:
+            raise ValueError(f"Feature {spec.name!r} is already registered")
+        if spec.name in self.raw_inputs:
+            raise ValueError(f"{spec.name!r} is already used as a raw input; register it before its dependants")
+        for name in spec.inputs:
+            if name not in self._specs and name not in self.raw_inputs:
+                self.raw_inputs.append(name)
+        self._specs[spec.name] = spec
+        if spec.output:
+            self.names.append(spec.name)
+
+    @property
+    def dim(self):
+        return len(self.names)
+
+    def _value(self, name, values):
+        """Column *name*: supplied by the caller, already computed, or computed now."""
+        column = values.get(name)
+        if column is None:
+            spec = self._specs.get(name)
+            if spec is None:
+                raise ValueError(f"Missing input column {name!r}")
+            column = spec.batch(*(self._value(dep, values) for dep in spec.inputs))
+            values[name] = column
+        return column
+
+    def transform(self, columns, dtype=np.float32):
+        """
+        Featurize N rows at once → (N, dim) matrix of *dtype*.
+
+        *columns* maps input (or feature) names to length-N sequences or
+        scalars; scalars are broadcast.  Only the features the output
+        needs are computed.
+        """
+        values = {}
+        n = None
+        for name, column in columns.items():
+            # Columns are handed to the extractors as given (each converts
+            # its own inputs), so long string columns never become wide
+            # fixed-width numpy arrays.
+            if not np.isscalar(column):
+                if n is not None and len(column) != n:
+                    raise ValueError(f"Column {name!r} has {len(column)} rows, expected {n}")
+                n = len(column)
+            values[name] = column
+        matrix = np.empty((1 if n is None else n, self.dim), dtype=dtype)
+        for j, name in enumerate(self.names):
+            matrix[:, j] = self._value(name, values)
+        return matrix
+
+    def transform_one(self, inputs):
+        """Featurize one row of scalars → list of float64 (the stored ``context_vector``)."""
+        return self.transform(inputs, dtype=np.float64)[0].tolist()
+
+
+FEATURES = FeaturePipeline()
+register_feature = FEATURES.register
+
+
+# ---------------------------------------------------------------------------
+# The bandit's features (vector columns in this order)
+# ---------------------------------------------------------------------------
+
+@register_feature("device", inputs=["user_agent"], output=False)
+def _device(user_agent):
+    # The classifier is cached per UA string, so this is a dict hit per row
+    if isinstance(user_agent, str):
+        user_agent = [user_agent]
+    return np.array([classify_user_agent(ua).category for ua in user_agent])
+
+
+@register_feature("is_mobile", inputs=["device"])
+def _is_mobile(device):
+    device = np.asarray(device, dtype=str)
+    return np.logical_or.reduce([device == category for category in MOBILE_CATEGORIES]).astype(float)
+
+
+def _intent(column):
+    return np.asarray(column, dtype=float)
+
+
+for _name, _field in zip(
+    ["price_score", "service_score", "trust_score", "location_score", "contact_score"],
+    INTENT_FIELDS,
+):
+    FEATURES.add(FeatureSpec(_name, (_field,), _intent))
+
+
+@register_feature("visit_number_norm", inputs=["visit_count"])
+def _visit_number_norm(visit_count):
+    return np.minimum(np.asarray(visit_count, dtype=float), VISIT_COUNT_CAP) / VISIT_COUNT_CAP
+
+
+@register_feature("bias")
+def _bias():
+    # Lets the model learn a constant offset
+    return 1.0
+
+
+# ---------------------------------------------------------------------------
+# Offline featurization of logged decisions
+# ---------------------------------------------------------------------------
+
+# Raw input column ← key of BanditDecision.context_json (see build_context)
+CONTEXT_INPUT_KEYS = {
+    "price_intent_score": "price_score",
+    "service_intent_score": "service_score",
+    "trust_intent_score": "trust_score",
+    "location_intent_score": "location_score",
+    "contact_intent_score": "contact_score",
+    "visit_count": "visit_count",
+}
+
+
+def featurize_contexts(contexts, dtype=np.float32):
+    """
+    Rebuild feature vectors from logged ``context_json`` dicts → (N, FEATURE_DIM).
+
+    Contexts logged before the device category was recorded fall back
+    to their ``is_mobile`` flag.  Missing values count as 0.
+    """
+    columns = {column: [] for column in CONTEXT_INPUT_KEYS}
+    devices = []
+    for context in contexts:
+        for column, key in CONTEXT_INPUT_KEYS.items():
+            columns[column].append(context.get(key) or 0.0)
+        device = context.get("device")
+        if device is None:
+            device = DEVICE_MOBILE if context.get("is_mobile") else DEVICE_DESKTOP
+        devices.append(device)
+    if not devices:
+        return np.zeros((0, FEATURES.dim), dtype=dtype)
+    columns["device"] = devices
+    return FEATURES.transform(columns, dtype=dtype)
@@ -0,0 +1,150 @@
+"""
+Custom model fields for the landing app.
+
+Float64ArrayField      – numpy array stored as a compact little-endian float64 blob
+EncodedJSON            – dict that carries its own pre-serialised JSON text
+PreEncodedJSONEncoder  – JSONField encoder that reuses EncodedJSON text as-is
+"""
+
+import base64
+import json
+import struct
+import uuid
+
+import numpy as np
+from django.db import models
+
+# Blob layout
+# -----------
+#   uint32  ndim                       (little-endian)
+#   uint32  shape[0] … shape[ndim-1]
+#   zero padding up to the next multiple of 8 bytes
+#   float64 data, C order, little-endian
+#
+# The padding keeps the float data 8-byte aligned so np.frombuffer can
+# view it in place without copying.
+_DTYPE = np.dtype("<f8")
+_UINT32 = struct.Struct("<I")
+
+
+def _header_size(ndim):
+    raw = _UINT32.size * (1 + ndim)
+    return (raw + 7) // 8 * 8
+
+
+def encode_array(value):
+    """Encode an array-like of floats as header + little-endian float64 bytes."""
+    arr = np.ascontiguousarray(value, dtype=_DTYPE)
+    header = struct.pack(f"<{1 + arr.ndim}I", arr.ndim, *arr.shape)
+    header += b"\0" * (_header_size(arr.ndim) - len(header))
+    return header + arr.tobytes()
+
+
+def decode_array(buf):
+    """
+    Decode bytes produced by :func:`encode_array` into a numpy array.
+
+    The result is a read-only view over ``buf`` (no copy); use
+    ``np.array(...)`` if you need to modify it in place.
+    """
+    buf = memoryview(buf)
+    (ndim,) = _UINT32.unpack_from(buf, 0)
+    shape = struct.unpack_from(f"<{ndim}I", buf, _UINT32.size)
+    offset = _header_size(ndim)
+    count = int(np.prod(shape, dtype=np.int64))
+    if len(buf) - offset != count * _DTYPE.itemsize:
+        raise ValueError(
+            f"Corrupt float64 array blob: header says shape {shape}, "
+            f"got {len(buf) - offset} data bytes."
+        )
+    return np.frombuffer(buf, dtype=_DTYPE, count=count, offset=offset).reshape(shape)
+
+
+class Float64ArrayField(models.BinaryField):
+    """
+    Stores a numpy float array as a binary blob (``bytea`` on Postgres).
+
+    Compared with a JSONField of nested Python floats there is no text
+    parsing on read and no float formatting on write: reads decode with
+    ``np.frombuffer``, writes are a single ``tobytes()``.  Assign any
+    array-like (numpy array or nested lists); reads return a read-only
+    numpy array.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return decode_array(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, np.ndarray):
+            return value
+        if isinstance(value, str):
+            # dumpdata / loaddata round-trip (see value_to_string)
+            return decode_array(base64.b64decode(value))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decode_array(value)
+        return np.asarray(value, dtype=_DTYPE)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        return encode_array(value)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        if value is None:
+            return None
+        return base64.b64encode(self.get_prep_value(value)).decode("ascii")
+
+
+class EncodedJSON(dict):
+    """
+    A dict plus its JSON serialisation, computed once.
+
+    Used for values that are built once and written many times (merged
+    slate configs): ``PreEncodedJSONEncoder`` and the views emit ``.json``
+    directly instead of encoding the dict again.  Instances are shared
+    between requests, so treat them as read-only.
+    """
+
+    __slots__ = ("json",)
+
+    def __init__(self, value):
+        super().__init__(value)
+        self.json = json.dumps(value)
+
+
+# Stand-in string for a nested EncodedJSON while the rest is encoded; the
+# random part keeps it from ever matching real data.
+_PLACEHOLDER = f"\x00encoded-json-{uuid.uuid4().hex}:"
+
+
+class PreEncodedJSONEncoder(json.JSONEncoder):
+    """
+    JSON encoder that writes ``EncodedJSON`` values' cached text verbatim.
+
+    Works at the top level and nested inside dicts / lists (e.g. a
+    response payload holding a merged slate config): nested values are
+    swapped for placeholder strings, the rest is encoded as usual, and
+    each placeholder is then replaced by its cached text.
+    """
+
+    def encode(self, o):
+        if isinstance(o, EncodedJSON):
+            return o.json
+        cached = []
+        text = super().encode(self._swap(o, cached))
+        for i, value in enumerate(cached):
+            text = text.replace(super().encode(f"{_PLACEHOLDER}{i}"), value.json, 1)
+        return text
+
+    def _swap(self, o, cached):
+        if isinstance(o, EncodedJSON):
+            cached.append(o)
+            return f"{_PLACEHOLDER}{len(cached) - 1}"
+        if isinstance(o, dict):
+            return {key: self._swap(value, cached) for key, value in o.items()}
+        if isinstance(o, (list, tuple)):
+            return [self._swap(value, cached) for value in o]
+        return o
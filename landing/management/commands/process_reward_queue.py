@@ -0,0 +1,85 @@
+"""
+Management command: process_reward_queue
+
+Drains the RewardJob table filled by end_session when
+settings.BANDIT_REWARD_QUEUE is enabled: scores each ended session,
+works out its bandit reward and applies all updates for the same arm in
+one parameter write (see landing/reward_queue.py).
+
+Usage:
+    python manage.py process_reward_queue              # drain until empty, then exit
+    python manage.py process_reward_queue --loop       # keep polling (run under a supervisor)
+    python manage.py process_reward_queue --status     # print queue depth and exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from landing.reward_queue import (
+    REWARD_QUEUE_BATCH_SIZE,
+    drain_reward_queue,
+    reward_queue_depth,
+)
+
+
+class Command(BaseCommand):
+    help = "Process queued session rewards in batches (one parameter write per arm per batch)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REWARD_QUEUE_BATCH_SIZE,
+            help="Jobs claimed per batch.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and poll for new jobs instead of exiting when the queue is empty.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty (with --loop).",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Only print the current queue depth.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size <= 0:
+            raise CommandError("--batch-size must be > 0")
+
+        if options["status"]:
+            self.stdout.write(f"queue_depth={reward_queue_depth()}")
+            return
+
+        total_done = total_failed = 0
+        try:
+            while True:
+                done, failed = drain_reward_queue(batch_size=batch_size)
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    self.stdout.write(
+                        f"  batch: processed={done} failed={failed} "
+                        f"queue_depth={reward_queue_depth()}"
+                    )
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted.")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reward queue drained: processed={total_done} failed={total_failed} "
+                f"queue_depth={reward_queue_depth()}"
+            )
+        )
@@ -0,0 +1,125 @@
+"""
+Management command: prune_bandit_arms
+
+Successive-elimination pruning (see landing/arm_pruning.py): marks arms
+that are provably dominated as dormant, so decisions stop scoring them,
+and re-admits long-dormant arms at a low rate.  Every change is written
+to ArmPruneLog.
+
+Usage:
+    python manage.py prune_bandit_arms                     # shared arms, once
+    python manage.py prune_bandit_arms --page 3            # landing page 3's own arms
+    python manage.py prune_bandit_arms --all-pages --loop  # every namespace, hourly
+    python manage.py prune_bandit_arms --dry-run           # report only, change nothing
+    python manage.py prune_bandit_arms --wake hero_compact # undo pruning for an arm
+    python manage.py prune_bandit_arms --wake-all          # undo all pruning in the namespace
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from landing.arm_pruning import prune_arms, readmit_arms, wake_arms
+from landing.models import BanditArm
+
+
+class Command(BaseCommand):
+    help = "Mark provably dominated bandit arms dormant and re-admit dormant ones at a low rate."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page",
+            type=int,
+            default=None,
+            help="Landing page id whose own arms to prune (default: the shared arms).",
+        )
+        parser.add_argument(
+            "--all-pages",
+            action="store_true",
+            help="Prune the shared arms and every page that has arms of its own.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be pruned / re-admitted without changing anything.",
+        )
+        parser.add_argument(
+            "--no-readmit",
+            action="store_true",
+            help="Skip the scheduled re-admission of long-dormant arms.",
+        )
+        parser.add_argument(
+            "--wake",
+            nargs="+",
+            metavar="ARM_ID",
+            default=None,
+            help="Re-admit these dormant arms now (in the --page namespace) and exit.",
+        )
+        parser.add_argument(
+            "--wake-all",
+            action="store_true",
+            help="Re-admit every dormant arm in the --page namespace and exit.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, one pass every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=3600.0,
+            help="Seconds between passes (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        if options["interval"] <= 0:
+            raise CommandError("--interval must be > 0")
+        if options["wake"] is not None or options["wake_all"]:
+            self._wake(options)
+            return
+
+        try:
+            while True:
+                for page_id in self._namespaces(options):
+                    self._run_once(page_id, options)
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted.")
+
+    def _namespaces(self, options):
+        if not options["all_pages"]:
+            return [options["page"]]
+        pages = (
+            BanditArm.objects
+            .filter(page__isnull=False)
+            .values_list("page_id", flat=True)
+            .distinct()
+            .order_by("page_id")
+        )
+        return [None, *pages]
+
+    def _run_once(self, page_id, options):
+        label = f"page {page_id}" if page_id is not None else "shared arms"
+        dry_run = options["dry_run"]
+        for arm, details in prune_arms(page_id, dry_run=dry_run):
+            self.stdout.write(
+                f"  {'would prune' if dry_run else 'pruned'} {arm.arm_id:<28} "
+                f"margin={details['margin']:+.4f} beaten_by={','.join(details['beaten_by']) or '-'}"
+            )
+        if not options["no_readmit"]:
+            for arm in readmit_arms(page_id, dry_run=dry_run):
+                self.stdout.write(f"  {'would re-admit' if dry_run else 're-admitted'} {arm.arm_id}")
+        dormant = BanditArm.objects.filter(page_id=page_id, dormant_since__isnull=False).count()
+        self.stdout.write(f"{label}: {dormant} dormant arm(s)")
+
+    def _wake(self, options):
+        arms = BanditArm.objects.filter(page_id=options["page"], dormant_since__isnull=False)
+        if not options["wake_all"]:
+            arms = arms.filter(arm_id__in=options["wake"])
+        woken = wake_arms(list(arms))
+        for arm in woken:
+            self.stdout.write(f"  re-admitted {arm.arm_id}")
+        self.stdout.write(self.style.SUCCESS(f"Re-admitted {len(woken)} arm(s)."))
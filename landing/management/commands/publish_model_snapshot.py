@@ -0,0 +1,81 @@
+"""
+Management command: publish_model_snapshot
+
+Writes the current bandit model (stacked θ / A⁻¹ / Cholesky arrays plus arm
+metadata) to the memory-mapped snapshot file that web workers read when
+settings.BANDIT_MODEL_SNAPSHOT is set (see landing/model_snapshot.py).
+
+Run exactly one publisher per host.
+
+Usage:
+    python manage.py publish_model_snapshot                 # publish once, then exit
+    python manage.py publish_model_snapshot --loop          # republish whenever the model version changes
+                                                            # (and at least every BANDIT_SNAPSHOT_MAX_AGE / 2 s)
+    python manage.py publish_model_snapshot --path /dev/shm/bandit.snap
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from landing.bandit_utils import (
+    current_model_version,
+    model_snapshot_path,
+    publish_model_snapshot,
+    snapshot_max_age,
+)
+
+
+class Command(BaseCommand):
+    help = "Publish the bandit model as a memory-mapped snapshot shared by web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=None,
+            help="Snapshot file (default: settings.BANDIT_MODEL_SNAPSHOT).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and republish whenever the model version changes "
+                 "(and often enough that workers never see it as stale).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds between model version checks (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"] or model_snapshot_path()
+        if not path:
+            raise CommandError("Pass --path or set settings.BANDIT_MODEL_SNAPSHOT.")
+        if options["interval"] <= 0:
+            raise CommandError("--interval must be > 0")
+
+        version = publish_model_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(f"Published snapshot version={version} → {path}"))
+        if not options["loop"]:
+            return
+
+        # Rewrite an unchanged model too, well before workers would call it stale
+        max_age = snapshot_max_age()
+        refresh = max_age / 2 if max_age else float("inf")
+        try:
+            while True:
+                time.sleep(options["interval"])
+                if current_model_version() == version and self._file_age(path) < refresh:
+                    continue
+                version = publish_model_snapshot(path)
+                self.stdout.write(f"  published version={version}")
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted.")
+
+    def _file_age(self, path):
+        try:
+            return time.time() - os.stat(path).st_mtime
+        except FileNotFoundError:
+            return float("inf")   # removed: publish again
@@ -0,0 +1,205 @@
+"""
+Management command: rebuild_bandit_params
+
+Rebuilds every arm's LinearArmParam from the logged BanditDecision history
+(context_vector, updated_arm_ids, reward) — after corruption, a reset, or
+a FEATURE_DIM change.
+
+Rewarded decisions are streamed in chunks (a server-side cursor on
+Postgres), so memory stays bounded by the chunk size plus one d×d matrix
+per arm.  For each chunk the rows are grouped per arm and folded in with
+numpy:
+
+    A = λI + Σ XᵀX        b = Σ Xᵀr        n = number of rows
+
+All arms are then written in one transaction.  Arms with no history go
+back to their starting values.  Decisions whose context_vector does not
+have FEATURE_DIM entries are skipped and counted.
+
+With --refeaturize the stored context_vector is ignored: each chunk's
+logged context_json is run through the current feature pipeline
+(landing/features.py) in one batch, so the model can be retrained after
+a feature is added or changed.
+
+One namespace is rebuilt per run: the shared arms by default, or with
+--page a landing page's own arms from that page's decisions.
+
+Usage:
+    python manage.py rebuild_bandit_params
+    python manage.py rebuild_bandit_params --chunk-size 20000
+    python manage.py rebuild_bandit_params --dry-run      # report only, write nothing
+    python manage.py rebuild_bandit_params --refeaturize  # after changing the features
+    python manage.py rebuild_bandit_params --page 3       # landing page 3's own arms
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from landing.bandit_utils import (
+    FEATURE_DIM,
+    bump_model_version,
+    make_initial_A,
+    make_initial_A_chol,
+    make_initial_A_inv,
+    make_initial_b,
+)
+from landing.features import featurize_contexts
+from landing.models import BanditArm, BanditDecision, LinearArmParam
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+class Command(BaseCommand):
+    help = "Rebuild LinearArmParam for every arm by replaying rewarded BanditDecision history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Decisions fetched and folded in per chunk.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Replay the history and report per-arm counts without writing.",
+        )
+        parser.add_argument(
+            "--refeaturize",
+            action="store_true",
+            help="Rebuild feature vectors from the logged context_json instead of using context_vector.",
+        )
+        parser.add_argument(
+            "--page",
+            type=int,
+            default=None,
+            help="Landing page id whose own arms to rebuild (default: the shared arms).",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size <= 0:
+            raise CommandError("--chunk-size must be > 0")
+
+        page_id = options["page"]
+        arm_pk = dict(BanditArm.objects.filter(page_id=page_id).values_list("arm_id", "pk"))
+        index = {arm_id: i for i, arm_id in enumerate(arm_pk)}
+        d = FEATURE_DIM
+        XtX = np.zeros((len(index), d, d))
+        Xtr = np.zeros((len(index), d))
+        counts = np.zeros(len(index), dtype=np.int64)
+        stats = {"decisions": 0, "skipped_dim": 0, "unknown_arms": 0}
+
+        refeaturize = options["refeaturize"]
+        started = time.perf_counter()
+        rows = (
+            BanditDecision.objects
+            .filter(page_id=page_id, reward__isnull=False)
+            .order_by("pk")
+            .values_list("context_json" if refeaturize else "context_vector", "updated_arm_ids", "reward")
+            .iterator(chunk_size=chunk_size)
+        )
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                self._fold(chunk, index, XtX, Xtr, counts, stats, refeaturize)
+                chunk = []
+        if chunk:
+            self._fold(chunk, index, XtX, Xtr, counts, stats, refeaturize)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Replayed {stats['decisions']} decisions in {elapsed:.2f}s "
+            f"(skipped: {stats['skipped_dim']} wrong length, "
+            f"{stats['unknown_arms']} updates for deleted arms)"
+        )
+        for arm_id, i in index.items():
+            self.stdout.write(f"  {arm_id:<30} n={counts[i]}")
+
+        if options["dry_run"]:
+            self.stdout.write("Dry run — nothing written.")
+            return
+
+        self._write(arm_pk, index, XtX, Xtr, counts, page_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt parameters for {len(index)} arms."))
+
+    def _fold(self, chunk, index, XtX, Xtr, counts, stats, refeaturize=False):
+        """
+        Fold one chunk of (context, updated_arm_ids, reward) rows into the sums.
+
+        *context* is the stored context_vector, or the context_json dict
+        when *refeaturize* is set.
+        """
+        vectors, rewards, groups = [], [], {}
+        for context, updated_arm_ids, reward in chunk:
+            if not updated_arm_ids:
+                continue
+            if not refeaturize and len(context or []) != FEATURE_DIM:
+                stats["skipped_dim"] += 1
+                continue
+            row = len(vectors)
+            vectors.append(context)
+            rewards.append(reward)
+            stats["decisions"] += 1
+            for arm_id in updated_arm_ids:
+                i = index.get(arm_id)
+                if i is None:
+                    stats["unknown_arms"] += 1
+                    continue
+                groups.setdefault(i, []).append(row)
+        if not vectors:
+            return
+
+        if refeaturize:
+            X = featurize_contexts([context or {} for context in vectors], dtype=float)
+        else:
+            X = np.asarray(vectors, dtype=float)
+        r = np.asarray(rewards, dtype=float)
+        for i, rows in groups.items():
+            Xa = X[rows]
+            XtX[i] += Xa.T @ Xa
+            Xtr[i] += Xa.T @ r[rows]
+            counts[i] += len(rows)
+
+    def _write(self, arm_pk, index, XtX, Xtr, counts, page_id=None):
+        """Write every arm's rebuilt parameters in one transaction."""
+        with transaction.atomic():
+            LinearArmParam.objects.bulk_create(
+                [
+                    LinearArmParam(
+                        arm_id=pk,
+                        page_id=page_id,
+                        A_matrix=make_initial_A(),
+                        b_vector=make_initial_b(),
+                        A_inv=make_initial_A_inv(),
+                        A_chol=make_initial_A_chol(),
+                    )
+                    for pk in arm_pk.values()
+                ],
+                ignore_conflicts=True,
+            )
+            params = {
+                p.arm_id: p
+                for p in LinearArmParam.objects.select_for_update().filter(arm_id__in=list(arm_pk.values()))
+            }
+            A0 = np.asarray(make_initial_A(), dtype=float)
+            for arm_id, i in index.items():
+                param = params[arm_pk[arm_id]]
+                A = A0 + XtX[i]
+                param.A_matrix = A
+                param.b_vector = Xtr[i].copy()
+                param.A_inv = np.linalg.inv(A)
+                param.A_chol = np.linalg.cholesky(A)
+                param.n = int(counts[i])
+                param.updates_since_inversion = 0
+            LinearArmParam.objects.bulk_update(
+                list(params.values()),
+                ["A_matrix", "b_vector", "A_inv", "A_chol", "n", "updates_since_inversion"],
+                batch_size=500,
+            )
+            # bulk_update sends no signals — invalidate cached catalogs ourselves
+            bump_model_version(page_id=page_id)
@@ -8,12 +8,18 @@ Also initialises LinearArmParam rows for each arm (linear bandit).
 Usage:
     python manage.py seed_bandit_arms          # insert only new arms
     python manage.py seed_bandit_arms --reset   # delete all arms first
+    python manage.py seed_bandit_arms --page 3  # give landing page 3 its own arms
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from landing.models import BanditArm, LinearArmParam
-from landing.bandit_utils import make_initial_A, make_initial_b
+from landing.models import BanditArm, LandingPage, LinearArmParam
+from landing.bandit_utils import (
+    make_initial_A,
+    make_initial_A_chol,
+    make_initial_A_inv,
+    make_initial_b,
+)
 
 
 def _derive_affected_sections(page_config):
@@ -309,18 +315,30 @@ class Command(BaseCommand):
         parser.add_argument(
             "--reset",
             action="store_true",
-            help="Delete ALL existing CtxBanditArm rows before seeding.",
+            help="Delete ALL existing CtxBanditArm rows (of the chosen page) before seeding.",
+        )
+        parser.add_argument(
+            "--page",
+            type=int,
+            default=None,
+            help="Landing page id to seed its own arm namespace (default: the shared arms).",
         )
 
     def handle(self, *args, **options):
+        page_id = options["page"]
+        if page_id is not None and not LandingPage.objects.filter(pk=page_id).exists():
+            raise CommandError(f"LandingPage {page_id} does not exist.")
+        arms = BanditArm.objects.filter(page_id=page_id)
+
         if options["reset"]:
-            deleted, _ = BanditArm.objects.all().delete()
+            deleted, _ = arms.delete()
             self.stdout.write(self.style.WARNING(f"Deleted {deleted} existing BanditArm rows."))
 
         created_count = 0
         for arm_data in STARTER_ARMS:
             affected = _derive_affected_sections(arm_data["page_config"])
             _obj, created = BanditArm.objects.get_or_create(
+                page_id=page_id,
                 arm_id=arm_data["arm_id"],
                 defaults={
                     "name": arm_data["name"],
@@ -340,12 +358,15 @@ class Command(BaseCommand):
 
         # Ensure every arm has a LinearArmParam row (linear bandit parameters)
         param_count = 0
-        for arm in BanditArm.objects.all():
+        for arm in arms:
             _param, p_created = LinearArmParam.objects.get_or_create(
                 arm=arm,
                 defaults={
+                    "page_id": arm.page_id,
                     "A_matrix": make_initial_A(),
                     "b_vector": make_initial_b(),
+                    "A_inv": make_initial_A_inv(),
+                    "A_chol": make_initial_A_chol(),
                 },
             )
             if p_created:
@@ -20,7 +20,8 @@ from django.core.management.base import BaseCommand, CommandError
 from landing import bandit_utils
 from landing.bandit_utils import EPSILON as DEFAULT_EPSILON
 from landing.bandit_utils import MIN_PULLS_PER_ARM as DEFAULT_WARMUP_PULLS
-from landing.bandit_utils import choose_slate, update_stats
+from landing.bandit_utils import SLATE_POLICIES, default_policy
+from landing.bandit_utils import choose_slate, get_arm_catalog, update_stats_batch
 from landing.models import BanditArm
 from landing.simulator import (
     SimRound,
@@ -34,6 +35,7 @@ from landing.simulator import (
     simulate_reward,
     summarize,
     choose_persona,
+    top_arms_by_persona,
 )
 
 
@@ -44,6 +46,12 @@ class Command(BaseCommand):
         parser.add_argument("--rounds", type=int, default=20000, help="Number of simulation rounds.")
         parser.add_argument("--k", type=int, default=3, help="Slate size (number of arms per round).")
         parser.add_argument("--epsilon", type=float, default=DEFAULT_EPSILON, help="Epsilon passed to choose_slate.")
+        parser.add_argument(
+            "--policy",
+            choices=SLATE_POLICIES,
+            default=None,
+            help="Bandit slate policy (default: settings.BANDIT_POLICY).",
+        )
         parser.add_argument(
             "--warmup-pulls",
             type=int,
@@ -61,6 +69,15 @@ class Command(BaseCommand):
             action="store_true",
             help="Do not update DB model params (evaluate only).",
         )
+        parser.add_argument(
+            "--update-batch",
+            type=int,
+            default=1,
+            help=(
+                "Rounds of feedback to collect before writing model updates "
+                "(one update_stats_batch write per arm per batch; 1 = learn every round)."
+            ),
+        )
         parser.add_argument(
             "--output-dir",
             type=str,
@@ -84,6 +101,8 @@ class Command(BaseCommand):
         reset_params_flag = options["reset_params"]
         dry_run = options["dry_run"]
         ma_window = max(1, int(options["ma_window"]))
+        update_batch = int(options["update_batch"])
+        policy = options["policy"] or default_policy()
 
         if rounds <= 0:
             raise CommandError("--rounds must be > 0")
@@ -91,6 +110,8 @@ class Command(BaseCommand):
             raise CommandError("--k must be > 0")
         if warmup_pulls <= 0:
             raise CommandError("--warmup-pulls must be > 0")
+        if update_batch <= 0:
+            raise CommandError("--update-batch must be > 0")
         if not (0.0 <= epsilon <= 1.0):
             raise CommandError("--epsilon must be in [0, 1]")
 
@@ -109,7 +130,7 @@ class Command(BaseCommand):
         output_dir.mkdir(parents=True, exist_ok=True)
 
         # --- 4) Load real arms from DB and verify simulation prerequisites ---
-        all_active_arms = list(BanditArm.objects.filter(is_active=True).order_by("arm_id"))
+        all_active_arms = list(BanditArm.objects.filter(page__isnull=True, is_active=True).order_by("arm_id"))
         if not all_active_arms:
             raise CommandError("No active BanditArm rows found. Seed arms first.")
 
@@ -123,8 +144,8 @@ class Command(BaseCommand):
             reset_bandit_params()
 
         self.stdout.write(
-            f"Starting simulation: rounds={rounds}, k={k}, epsilon={epsilon:.3f}, "
-            f"warmup_pulls={warmup_pulls}, seed={seed}, "
+            f"Starting simulation: rounds={rounds}, k={k}, policy={policy}, epsilon={epsilon:.3f}, "
+            f"warmup_pulls={warmup_pulls}, seed={seed}, update_batch={update_batch}, "
             f"reset_params={reset_params_flag}, dry_run={dry_run}"
         )
 
@@ -132,6 +153,13 @@ class Command(BaseCommand):
         bandit_rewards = []
         random_rewards = []
         no_change_rewards = []
+        # Pending bandit feedback: arm pk → (arm, [feature_vector, ...], [reward, ...])
+        pending_updates = {}
+
+        def flush_updates():
+            for arm, xs, rs in pending_updates.values():
+                update_stats_batch(arm, xs, rs)
+            pending_updates.clear()
 
         # --- 5) Main simulation loop ----------------------------------------
         # Each round uses one synthetic visitor context and evaluates 3 policies:
@@ -144,17 +172,24 @@ class Command(BaseCommand):
             context, feature_vector = build_synthetic_context(persona, rng)
 
             # (A) Bandit policy: real selection function + real DB update path.
-            chosen_bandit_arms, _explored, _scores = choose_slate(feature_vector, k=k, epsilon=epsilon)
+            chosen_bandit_arms, _explored, _scores = choose_slate(
+                feature_vector, k=k, epsilon=epsilon, policy=policy
+            )
             if not chosen_bandit_arms:
                 # Safety fallback if no valid slate is produced.
                 chosen_bandit_arms = random_non_conflicting_slate(all_active_arms, k=k, rng=rng)
 
             bandit_reward, bandit_p = simulate_reward(persona, chosen_bandit_arms, context, rng)
             if not dry_run:
-                # Learning step: update the same model params used in production.
+                # Learning step: update the same model params used in production,
+                # one batched write per arm every --update-batch rounds.
                 for arm in chosen_bandit_arms:
                     if arm.arm_id != "no_change":
-                        update_stats(arm, feature_vector, bandit_reward)
+                        _, xs, rs = pending_updates.setdefault(arm.pk, (arm, [], []))
+                        xs.append(feature_vector)
+                        rs.append(bandit_reward)
+                if round_idx % update_batch == 0 or round_idx == rounds:
+                    flush_updates()
 
             rows.append(
                 SimRound(
@@ -284,19 +319,30 @@ class Command(BaseCommand):
                 if key.startswith("device:"):
                     self.stdout.write(f"    {key}: {policy_stats[key]:.4f}")
 
+        # --- 11) What the final model learned, scored in one batch per persona
+        # Separate RNG so this report never shifts the simulation's random stream.
+        learned_top_arms = top_arms_by_persona(get_arm_catalog(), random.Random(seed + 1))
+        self.stdout.write("\nFinal model top arms (mean predicted reward):")
+        for persona, top in learned_top_arms.items():
+            ranked = ", ".join(f"{arm_id}={score:.3f}" for arm_id, score in top)
+            self.stdout.write(f"  {persona:<17} {ranked}")
+
         summary_path = output_dir / f"simulate_bandit_summary_seed{seed}_r{rounds}.json"
         summary_payload = {
             "config": {
                 "rounds": rounds,
                 "k": k,
+                "policy": policy,
                 "epsilon": epsilon,
                 "warmup_pulls": warmup_pulls,
                 "seed": seed,
+                "update_batch": update_batch,
                 "reset_params": bool(reset_params_flag),
                 "dry_run": bool(dry_run),
                 "ma_window": ma_window,
             },
             "summary": summary,
+            "learned_top_arms": learned_top_arms,
         }
         summary_path.write_text(json.dumps(summary_payload, indent=2), encoding="utf-8")
         self.stdout.write(f"Summary JSON saved: {summary_path}")
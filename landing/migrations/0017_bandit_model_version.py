@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:13
+
+import landing.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0016_lineararmparam_delete_linucbparam'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BanditModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arms_version', models.BigIntegerField(default=landing.models.random_version_start, help_text='Changes whenever the arm catalog (arms / page_configs) changes.')),
+                ('params_version', models.BigIntegerField(default=landing.models.random_version_start, help_text='Changes whenever any arm or linear-model parameter changes.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Bandit Model Version',
+            },
+        ),
+    ]
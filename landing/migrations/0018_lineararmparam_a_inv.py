@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:40
+
+import numpy as np
+from django.db import migrations, models
+
+
+def fill_inverse(apps, schema_editor):
+    """Compute A_inv for existing rows so the first decision needs no inversion."""
+    LinearArmParam = apps.get_model("landing", "LinearArmParam")
+    for param in LinearArmParam.objects.all().iterator():
+        param.A_inv = np.linalg.inv(np.asarray(param.A_matrix, dtype=float)).tolist()
+        param.updates_since_inversion = 0
+        param.save(update_fields=["A_inv", "updates_since_inversion"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0017_bandit_model_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lineararmparam',
+            name='A_inv',
+            field=models.JSONField(blank=True, help_text='Cached inverse of A_matrix, kept up to date by update_stats (null → recomputed on load).', null=True),
+        ),
+        migrations.AddField(
+            model_name='lineararmparam',
+            name='updates_since_inversion',
+            field=models.IntegerField(default=0, help_text='Incremental inverse updates since A_inv was last recomputed from scratch.'),
+        ),
+        migrations.RunPython(fill_inverse, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+import landing.fields
+from landing.fields import encode_array
+
+ARRAY_FIELDS = ("A_matrix", "b_vector", "A_inv")
+
+
+def json_to_binary(apps, schema_editor):
+    """Encode each JSON list column into its float64 blob column."""
+    LinearArmParam = apps.get_model("landing", "LinearArmParam")
+    for param in LinearArmParam.objects.all().iterator():
+        for name in ARRAY_FIELDS:
+            value = getattr(param, name)
+            setattr(param, f"{name}_bin", None if value is None else encode_array(value))
+        param.save(update_fields=[f"{name}_bin" for name in ARRAY_FIELDS])
+
+
+def binary_to_json(apps, schema_editor):
+    """Reverse: decode blobs back into JSON lists."""
+    LinearArmParam = apps.get_model("landing", "LinearArmParam")
+    for param in LinearArmParam.objects.all().iterator():
+        for name in ARRAY_FIELDS:
+            value = getattr(param, f"{name}_bin")  # already decoded by the field
+            setattr(param, name, None if value is None else value.tolist())
+        param.save(update_fields=list(ARRAY_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0018_lineararmparam_a_inv'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lineararmparam',
+            name='A_matrix_bin',
+            field=landing.fields.Float64ArrayField(null=True),
+        ),
+        migrations.AddField(
+            model_name='lineararmparam',
+            name='b_vector_bin',
+            field=landing.fields.Float64ArrayField(null=True),
+        ),
+        migrations.AddField(
+            model_name='lineararmparam',
+            name='A_inv_bin',
+            field=landing.fields.Float64ArrayField(null=True),
+        ),
+        # Nullable while both representations exist, so the migration can
+        # also be reversed (the JSON columns are re-added empty, then filled).
+        migrations.AlterField(
+            model_name='lineararmparam',
+            name='A_matrix',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='lineararmparam',
+            name='b_vector',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='lineararmparam',
+            name='A_matrix',
+        ),
+        migrations.RemoveField(
+            model_name='lineararmparam',
+            name='b_vector',
+        ),
+        migrations.RemoveField(
+            model_name='lineararmparam',
+            name='A_inv',
+        ),
+        migrations.RenameField(
+            model_name='lineararmparam',
+            old_name='A_matrix_bin',
+            new_name='A_matrix',
+        ),
+        migrations.RenameField(
+            model_name='lineararmparam',
+            old_name='b_vector_bin',
+            new_name='b_vector',
+        ),
+        migrations.RenameField(
+            model_name='lineararmparam',
+            old_name='A_inv_bin',
+            new_name='A_inv',
+        ),
+        migrations.AlterField(
+            model_name='lineararmparam',
+            name='A_matrix',
+            field=landing.fields.Float64ArrayField(help_text='8×8 grid tracking what visitors this arm has been shown to (feature combinations).'),
+        ),
+        migrations.AlterField(
+            model_name='lineararmparam',
+            name='b_vector',
+            field=landing.fields.Float64ArrayField(help_text='8-number list tracking which visitor features led to CTA clicks for this arm.'),
+        ),
+        migrations.AlterField(
+            model_name='lineararmparam',
+            name='A_inv',
+            field=landing.fields.Float64ArrayField(blank=True, help_text='Cached inverse of A_matrix, kept up to date by update_stats (null → recomputed on load).', null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:40
+
+import landing.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0019_lineararmparam_binary_arrays'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='banditdecision',
+            name='merged_page_config',
+            field=models.JSONField(blank=True, default=dict, encoder=landing.fields.PreEncodedJSONEncoder, help_text='Merged page_config applied to the frontend for this slate.'),
+        ),
+    ]
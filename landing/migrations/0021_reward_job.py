@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0020_bandit_decision_pre_encoded_config'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RewardJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.IntegerField(default=0, help_text='Failed processing attempts so far.')),
+                ('last_error', models.TextField(blank=True, default='', help_text='Error from the most recent failed attempt.')),
+                ('session', models.OneToOneField(help_text='The ended session to score and reward (one job per session).', on_delete=django.db.models.deletion.CASCADE, related_name='reward_job', to='landing.session')),
+            ],
+            options={
+                'verbose_name': 'Reward Job',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:05
+
+import numpy as np
+from django.db import migrations, models
+
+import landing.fields
+
+
+def fill_cholesky(apps, schema_editor):
+    """Factorise A for existing rows so Thompson sampling needs no factorisation at load."""
+    LinearArmParam = apps.get_model("landing", "LinearArmParam")
+    for param in LinearArmParam.objects.all().iterator():
+        param.A_chol = np.linalg.cholesky(np.asarray(param.A_matrix, dtype=float))
+        param.save(update_fields=["A_chol"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0021_reward_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banditdecision',
+            name='policy',
+            field=models.CharField(default='epsilon_greedy', help_text='Slate policy that made this decision (epsilon_greedy / thompson).', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='lineararmparam',
+            name='A_chol',
+            field=landing.fields.Float64ArrayField(blank=True, help_text='Cached lower Cholesky factor of A_matrix (A = L·Lᵀ), used for Thompson sampling (null → recomputed on load).', null=True),
+        ),
+        migrations.RunPython(fill_cholesky, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0022_thompson_sampling'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='banditdecision',
+            name='policy',
+            field=models.CharField(default='epsilon_greedy', help_text='Slate policy that made this decision (epsilon_greedy / thompson / linucb).', max_length=32),
+        ),
+    ]
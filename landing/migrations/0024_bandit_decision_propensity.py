@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0023_bandit_decision_policy_linucb'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banditdecision',
+            name='propensity',
+            field=models.FloatField(blank=True, help_text='Probability the logging policy had of choosing this slate (NULL when unknown, e.g. Thompson sampling). Used for off-policy evaluation.', null=True),
+        ),
+    ]
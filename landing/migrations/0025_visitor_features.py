@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0024_bandit_decision_propensity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitorFeatures',
+            fields=[
+                ('visitor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='features', serialize=False, to='landing.visitor')),
+                ('session_count', models.IntegerField(default=0, help_text='Sessions (page-loads) this visitor has started.')),
+                ('last_seen', models.DateTimeField(blank=True, help_text="Start of the visitor's most recent session.", null=True)),
+                ('last_ended_at', models.DateTimeField(blank=True, help_text='End of the session the intent scores below come from.', null=True)),
+                ('price_intent_score', models.FloatField(default=0.0)),
+                ('service_intent_score', models.FloatField(default=0.0)),
+                ('trust_intent_score', models.FloatField(default=0.0)),
+                ('location_intent_score', models.FloatField(default=0.0)),
+                ('contact_intent_score', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name': 'Visitor Features',
+                'verbose_name_plural': 'Visitor Features',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:59
+
+import landing.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0025_visitor_features'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lineararmparam',
+            name='A_matrix',
+            field=landing.fields.Float64ArrayField(help_text='d×d grid (d = number of features) tracking what visitors this arm has been shown to (feature combinations).'),
+        ),
+        migrations.AlterField(
+            model_name='lineararmparam',
+            name='b_vector',
+            field=landing.fields.Float64ArrayField(help_text='d-number list (one per feature) tracking which visitor features led to CTA clicks for this arm.'),
+        ),
+    ]
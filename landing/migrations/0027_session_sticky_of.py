@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0026_linear_arm_param_feature_dim_help'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='sticky_of',
+            field=models.ForeignKey(blank=True, help_text='Earlier session whose bandit slate this page-load reused (sticky slate cache); its BanditDecision holds the decision.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sticky_reloads', to='landing.session'),
+        ),
+    ]
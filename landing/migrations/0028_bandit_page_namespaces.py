@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0027_session_sticky_of'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banditarm',
+            name='page',
+            field=models.ForeignKey(blank=True, help_text='Landing page whose bandit this arm belongs to (empty = shared arms).', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bandit_arms', to='landing.landingpage'),
+        ),
+        migrations.AddField(
+            model_name='banditdecision',
+            name='page',
+            field=models.ForeignKey(blank=True, help_text="Page namespace the slate's arms came from (empty = shared arms). Rewards go to this namespace's arms.", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bandit_decisions', to='landing.landingpage'),
+        ),
+        migrations.AddField(
+            model_name='lineararmparam',
+            name='page',
+            field=models.ForeignKey(blank=True, help_text='Copy of arm.page (kept in sync by the BanditArm signal).', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='landing.landingpage'),
+        ),
+        migrations.AlterField(
+            model_name='banditarm',
+            name='arm_id',
+            field=models.CharField(help_text='Machine-readable key, unique per page, e.g. "pricing_highlight_plan_2".', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='banditarm',
+            index=models.Index(fields=['page', 'is_active', 'arm_id'], name='bandit_arm_page_active_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='banditarm',
+            constraint=models.UniqueConstraint(fields=('page', 'arm_id'), name='unique_page_arm_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='banditarm',
+            constraint=models.UniqueConstraint(condition=models.Q(('page__isnull', True)), fields=('arm_id',), name='unique_shared_arm_id'),
+        ),
+    ]
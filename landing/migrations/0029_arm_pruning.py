@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0028_bandit_page_namespaces'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banditarm',
+            name='dormant_since',
+            field=models.DateTimeField(blank=True, help_text='Set by prune_bandit_arms when the arm is provably dominated; dormant arms are not scored until re-admitted (see ArmPruneLog).', null=True),
+        ),
+        migrations.CreateModel(
+            name='ArmPruneLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('prune', 'Pruned (dormant)'), ('readmit', 'Re-admitted')], max_length=16)),
+                ('reason', models.CharField(help_text='Why: "dominated", "scheduled" (low-rate re-admission) or "manual".', max_length=32)),
+                ('n', models.IntegerField(help_text="The arm's LinearArmParam.n at the time (re-pruning waits for fresh pulls).")),
+                ('details', models.JSONField(blank=True, default=dict, help_text='Evidence: beta, contexts evaluated, worst margin, arms that dominated it.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('arm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prune_logs', to='landing.banditarm')),
+            ],
+            options={
+                'verbose_name': 'Arm Prune Log',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['arm', '-created_at'], name='landing_arm_arm_id_f6a4ed_idx')],
+            },
+        ),
+    ]
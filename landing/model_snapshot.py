@@ -0,0 +1,173 @@
+"""
+Memory-mapped bandit model snapshot shared by every worker on a host.
+
+write_snapshot  – atomically publish a snapshot file (temp file + os.replace)
+read_snapshot   – map a snapshot file read-only and return its arrays
+SnapshotReader  – per-process handle that re-maps only when the file is replaced
+
+Why
+---
+Every web worker needs the stacked model arrays to score arms.  Loading
+them from the database costs a query per worker per model version; with
+a snapshot published by a single writer (``publish_model_snapshot``),
+workers map the same file read-only instead.  The OS page cache holds
+one copy for all processes on the host, ``np.frombuffer`` views need no
+copying, and decisions never touch the database.
+
+File layout
+-----------
+    8 bytes   magic  b"BANDSNP1"
+    uint64    header length in bytes (little-endian)
+    header    UTF-8 JSON, padded with spaces to a multiple of 8 bytes:
+              {"version": [arms_version, params_version],
+               "arms": [{...arm metadata...}, ...],
+               "arrays": {name: {"dtype", "shape", "offset"}, ...}}
+    data      each array C-contiguous, little-endian, 8-byte aligned;
+              offsets are relative to the start of this section
+
+A new snapshot is written to a temporary file in the same directory and
+moved over the old one with ``os.replace`` — readers see either the old
+file or the new one, never a partial write.  Processes that still map
+the old file keep a valid view until they re-map.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"BANDSNP1"
+_LENGTH = struct.Struct("<Q")
+_ALIGN = 8
+
+
+def _pad(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class Snapshot:
+    """A mapped snapshot: ``version``, ``arms`` metadata and read-only ``arrays``."""
+
+    def __init__(self, version, arms, arrays, identity=None):
+        self.version = version
+        self.arms = arms
+        self.arrays = arrays
+        self.identity = identity
+
+    def age(self):
+        """Seconds since the snapshot file was written (0 when not read from a file)."""
+        if self.identity is None:
+            return 0.0
+        return max(time.time() - self.identity[2] / 1e9, 0.0)
+
+
+def write_snapshot(path, version, arms, arrays):
+    """
+    Publish a snapshot at ``path`` atomically.
+
+    ``arms`` is a list of JSON-serialisable dicts (one per arm, in array
+    order); ``arrays`` maps names to numpy arrays whose first axis is the
+    arm index.  Float arrays are stored as float64, integer arrays as int64.
+    """
+    blobs = {}
+    for name, value in arrays.items():
+        arr = np.asarray(value)
+        dtype = np.dtype("<i8") if np.issubdtype(arr.dtype, np.integer) else np.dtype("<f8")
+        blobs[name] = np.ascontiguousarray(arr, dtype=dtype)
+
+    layout, cursor = {}, 0
+    for name, arr in blobs.items():
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": cursor}
+        cursor = _pad(cursor + arr.nbytes)
+
+    header = {"version": list(version), "arms": arms, "arrays": layout}
+    raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # Pad so the data section (and every array in it) starts 8-byte aligned
+    raw = raw.ljust(_pad(len(MAGIC) + _LENGTH.size + len(raw)) - len(MAGIC) - _LENGTH.size, b" ")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(MAGIC)
+            fh.write(_LENGTH.pack(len(raw)))
+            fh.write(raw)
+            data_start = fh.tell()
+            for name, arr in blobs.items():
+                fh.seek(data_start + layout[name]["offset"])
+                fh.write(arr.tobytes())
+            fh.truncate(data_start + cursor)
+            fh.flush()
+            os.fsync(fh.fileno())
+            # mkstemp creates 0600; workers may run as another user
+            os.fchmod(fh.fileno(), 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot(path):
+    """Map ``path`` read-only and return a Snapshot whose arrays view the mapping."""
+    with open(path, "rb") as fh:
+        st = os.fstat(fh.fileno())
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a bandit model snapshot.")
+    (header_len,) = _LENGTH.unpack_from(buf, len(MAGIC))
+    start = len(MAGIC) + _LENGTH.size
+    header = json.loads(bytes(buf[start:start + header_len]))
+    data_start = start + header_len
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            buf, dtype=dtype, count=count, offset=data_start + spec["offset"]
+        ).reshape(shape)
+
+    return Snapshot(
+        version=tuple(header["version"]),
+        arms=header["arms"],
+        arrays=arrays,
+        identity=(st.st_dev, st.st_ino, st.st_mtime_ns),
+    )
+
+
+class SnapshotReader:
+    """
+    Keeps the current snapshot for one path mapped in this process.
+
+    ``current()`` costs one ``os.stat`` when nothing changed; when the
+    writer has replaced the file it maps the new one.  Returns ``None``
+    while no snapshot has been published.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.identity == identity:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.identity != identity:
+                self._snapshot = read_snapshot(self.path)
+            return self._snapshot
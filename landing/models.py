@@ -7,11 +7,17 @@ Event    – every tracked interaction inside a session.
 
 Other models (BanditArm, LandingPage, LandingSection, AIRecommendation)
 support the page builder and future contextual-bandit features.
+BanditModelVersion holds the version counters behind the in-process arm caches.
+RewardJob is the queue of ended sessions waiting for reward processing.
+ArmPruneLog records every arm put to sleep or re-admitted by arm pruning.
 """
 
 from django.db import models
+import random
 import uuid
 
+from .fields import Float64ArrayField, PreEncodedJSONEncoder
+
 
 # ---------------------------------------------------------------------------
 # Visitor
@@ -108,6 +114,15 @@ class Session(models.Model):
         default=1,
         help_text="Which visit this is for the visitor (1 = first, 2 = second, …).",
     )
+    sticky_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="sticky_reloads",
+        help_text="Earlier session whose bandit slate this page-load reused (sticky slate cache); "
+                  "its BanditDecision holds the decision.",
+    )
 
     # --- engagement aggregates (computed at session end) --------------------
     max_scroll_pct = models.IntegerField(
@@ -174,6 +189,56 @@ class Session(models.Model):
         return f"Session {self.session_id} (visitor {self.visitor.cookie_id})"
 
 
+# ---------------------------------------------------------------------------
+# Visitor feature snapshot
+# ---------------------------------------------------------------------------
+
+class VisitorFeatures(models.Model):
+    """
+    Denormalised per-visitor inputs for the bandit's feature vector.
+
+    ``accept_cookies`` bumps ``session_count`` / ``last_seen`` on every
+    page-load and scoring an ended session copies its intent scores here,
+    so ``build_context`` needs one primary-key read (or none when the view
+    passes the row in) instead of querying the visitor's sessions.  Rows
+    missing for older visitors are backfilled from their sessions on first
+    use (see ``landing/visitor_features.py``).
+    """
+
+    visitor = models.OneToOneField(
+        Visitor,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="features",
+    )
+    session_count = models.IntegerField(
+        default=0,
+        help_text="Sessions (page-loads) this visitor has started.",
+    )
+    last_seen = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Start of the visitor's most recent session.",
+    )
+    last_ended_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="End of the session the intent scores below come from.",
+    )
+    price_intent_score = models.FloatField(default=0.0)
+    service_intent_score = models.FloatField(default=0.0)
+    trust_intent_score = models.FloatField(default=0.0)
+    location_intent_score = models.FloatField(default=0.0)
+    contact_intent_score = models.FloatField(default=0.0)
+
+    class Meta:
+        verbose_name = "Visitor Features"
+        verbose_name_plural = "Visitor Features"
+
+    def __str__(self):
+        return f"Features visitor={self.visitor_id} sessions={self.session_count}"
+
+
 # ---------------------------------------------------------------------------
 # Event  (was "Interaction" — renamed for clarity)
 # ---------------------------------------------------------------------------
@@ -290,12 +355,24 @@ class BanditArm(models.Model):
             "promote": "pricing",
             "variants": {"pricing": "highlight-plan-2"}
         }
+
+    Arms belong to a page namespace: ``page`` set → that landing page's
+    own catalog and model; empty → the shared arms, used by the simulator
+    and by any page that has no arms of its own.  ``arm_id`` is unique
+    within a namespace, so two pages may both have a "hero_compact".
     """
 
+    page = models.ForeignKey(
+        LandingPage,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="bandit_arms",
+        help_text="Landing page whose bandit this arm belongs to (empty = shared arms).",
+    )
     arm_id = models.CharField(
         max_length=100,
-        unique=True,
-        help_text='Machine-readable key, e.g. "pricing_highlight_plan_2".',
+        help_text='Machine-readable key, unique per page, e.g. "pricing_highlight_plan_2".',
     )
     name = models.CharField(
         max_length=255,
@@ -312,6 +389,11 @@ class BanditArm(models.Model):
         default=True,
         help_text="Inactive arms are excluded from selection.",
     )
+    dormant_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set by prune_bandit_arms when the arm is provably dominated; dormant arms are not scored until re-admitted (see ArmPruneLog).",
+    )
     affected_sections = models.JSONField(
         default=list,
         blank=True,
@@ -321,9 +403,26 @@ class BanditArm(models.Model):
 
     class Meta:
         ordering = ["arm_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["page", "arm_id"],
+                name="unique_page_arm_id",
+            ),
+            # NULLs are distinct in the constraint above, so the shared
+            # namespace needs its own
+            models.UniqueConstraint(
+                fields=["arm_id"],
+                condition=models.Q(page__isnull=True),
+                name="unique_shared_arm_id",
+            ),
+        ]
+        indexes = [
+            # The catalog load: one page's active arms in arm_id order
+            models.Index(fields=["page", "is_active", "arm_id"], name="bandit_arm_page_active_idx"),
+        ]
 
     def __str__(self):
-        return self.arm_id
+        return f"{self.arm_id} (page {self.page_id})" if self.page_id else self.arm_id
 
 
 class BanditDecision(models.Model):
@@ -344,6 +443,14 @@ class BanditDecision(models.Model):
         on_delete=models.CASCADE,
         related_name="bandit_decisions",
     )
+    page = models.ForeignKey(
+        LandingPage,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="bandit_decisions",
+        help_text="Page namespace the slate's arms came from (empty = shared arms). Rewards go to this namespace's arms.",
+    )
     context_bucket = models.CharField(
         max_length=100,
         blank=True,
@@ -375,6 +482,16 @@ class BanditDecision(models.Model):
     epsilon = models.FloatField(
         help_text="Epsilon value at decision time.",
     )
+    policy = models.CharField(
+        max_length=32,
+        default="epsilon_greedy",
+        help_text="Slate policy that made this decision (epsilon_greedy / thompson / linucb).",
+    )
+    propensity = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Probability the logging policy had of choosing this slate (NULL when unknown, e.g. Thompson sampling). Used for off-policy evaluation.",
+    )
     reward = models.FloatField(
         null=True,
         blank=True,
@@ -393,6 +510,7 @@ class BanditDecision(models.Model):
     merged_page_config = models.JSONField(
         default=dict,
         blank=True,
+        encoder=PreEncodedJSONEncoder,
         help_text='Merged page_config applied to the frontend for this slate.',
     )
     updated_arm_ids = models.JSONField(
@@ -465,9 +583,10 @@ class LinearArmParam(models.Model):
     fields that together remember everything needed to compute weights:
 
     A_matrix ("what I've seen")
-        An 8×8 grid (features × features). Each time a visitor is shown
-        this arm, their feature vector is multiplied by itself to produce
-        an 8×8 grid of feature-pair combinations, and added to A_matrix.
+        A d×d grid (features × features, d = FEATURE_DIM, 8 today — the
+        feature layout lives in landing/features.py). Each time a visitor
+        is shown this arm, their feature vector is multiplied by itself to
+        produce a d×d grid of feature-pair combinations, and added to A_matrix.
         The diagonal tracks how much of each feature has been seen;
         the off-diagonal cells track which features appeared together
         (correlations), preventing the model from double-counting.
@@ -475,7 +594,7 @@ class LinearArmParam(models.Model):
         that prevents division-by-zero and fades away as real data arrives.
 
     b_vector ("what worked")
-        A list of 8 numbers. Each time a visitor clicks the CTA after
+        A list of d numbers. Each time a visitor clicks the CTA after
         seeing this arm (reward=1), their feature vector gets added to
         b_vector. Non-clicks (reward=0) contribute nothing. Over time
         b_vector accumulates a picture of "the kind of visitor this arm
@@ -483,6 +602,24 @@ class LinearArmParam(models.Model):
 
     To get the arm's weights:  weights = A_matrix⁻¹ × b_vector
     Think of it as: "what worked" ÷ "what I've seen" = best prediction.
+
+    All three arrays are stored as binary float64 blobs (see
+    :class:`landing.fields.Float64ArrayField`) and read back as numpy arrays.
+
+    A_inv (cached A_matrix⁻¹)
+        Inverting A on every request is the expensive part, so the inverse
+        is stored too. Each update only adds one x·xᵀ to A, which lets
+        update_stats patch A_inv with the Sherman–Morrison formula instead
+        of inverting again; every REINVERT_EVERY updates it is recomputed
+        from A_matrix to wash out rounding drift.
+
+    A_chol (cached Cholesky factor L, A = L·Lᵀ)
+        Used by the Thompson-sampling policy to draw weights from
+        N(θ, σ²A⁻¹). Patched by the same rank-1 updates and recomputed
+        on the same REINVERT_EVERY schedule as A_inv.
+
+    ``page`` is a copy of ``arm.page``, so a parameter write knows which
+    page's model version to bump without loading its arm.
     """
 
     arm = models.OneToOneField(
@@ -490,11 +627,33 @@ class LinearArmParam(models.Model):
         on_delete=models.CASCADE,
         related_name="linear_param",
     )
-    A_matrix = models.JSONField(
-        help_text="8×8 grid tracking what visitors this arm has been shown to (feature combinations).",
+    page = models.ForeignKey(
+        LandingPage,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Copy of arm.page (kept in sync by the BanditArm signal).",
+    )
+    A_matrix = Float64ArrayField(
+        help_text="d×d grid (d = number of features) tracking what visitors this arm has been shown to (feature combinations).",
     )
-    b_vector = models.JSONField(
-        help_text="8-number list tracking which visitor features led to CTA clicks for this arm.",
+    b_vector = Float64ArrayField(
+        help_text="d-number list (one per feature) tracking which visitor features led to CTA clicks for this arm.",
+    )
+    A_inv = Float64ArrayField(
+        null=True,
+        blank=True,
+        help_text="Cached inverse of A_matrix, kept up to date by update_stats (null → recomputed on load).",
+    )
+    A_chol = Float64ArrayField(
+        null=True,
+        blank=True,
+        help_text="Cached lower Cholesky factor of A_matrix (A = L·Lᵀ), used for Thompson sampling (null → recomputed on load).",
+    )
+    updates_since_inversion = models.IntegerField(
+        default=0,
+        help_text="Incremental inverse updates since A_inv was last recomputed from scratch.",
     )
     n = models.IntegerField(
         default=0,
@@ -508,3 +667,140 @@ class LinearArmParam(models.Model):
 
     def __str__(self):
         return f"Linear arm={self.arm.arm_id} n={self.n}"
+
+
+def random_version_start():
+    """Random starting point for BanditModelVersion counters.
+
+    Starting from a random value (instead of 0) means a re-created row can
+    never collide with a version an in-process cache has already seen —
+    e.g. after a test transaction is rolled back or the table is reset.
+    """
+    return random.getrandbits(40)
+
+
+class BanditModelVersion(models.Model):
+    """
+    Version counters for the in-process arm catalogs, one row per namespace.
+
+    Every worker caches the active arms and their linear-model parameters
+    in memory (see :func:`landing.bandit_utils.get_arm_catalog`) and only
+    reloads them when one of these counters changes.  The shared arms use
+    row ``MODEL_VERSION_PK``; each landing page with arms of its own has a
+    row whose primary key is derived from the page id (see
+    :func:`landing.bandit_utils.model_version_pk`), so a reward on one
+    page never makes another page's catalog reload.
+
+    arms_version
+        Bumped when a :model:`landing.BanditArm` is created, edited or
+        deleted (admin edits, ``seed_bandit_arms``).
+    params_version
+        Bumped on every change to the bandit model — any arm change and
+        every :model:`landing.LinearArmParam` write (``update_stats``).
+
+    Bumps happen automatically via signals (``landing/signals.py``).
+    Bulk ``QuerySet.update()`` calls bypass signals, so code doing those
+    must call :func:`landing.bandit_utils.bump_model_version` itself.
+    """
+
+    arms_version = models.BigIntegerField(
+        default=random_version_start,
+        help_text="Changes whenever the arm catalog (arms / page_configs) changes.",
+    )
+    params_version = models.BigIntegerField(
+        default=random_version_start,
+        help_text="Changes whenever any arm or linear-model parameter changes.",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Bandit Model Version"
+
+    def __str__(self):
+        return f"Bandit model version #{self.pk} arms={self.arms_version} params={self.params_version}"
+
+
+class RewardJob(models.Model):
+    """
+    An ended session waiting for intent scoring and its bandit reward update.
+
+    With ``BANDIT_REWARD_QUEUE`` enabled, ``end_session`` only records the
+    session end and inserts one of these rows; the ``process_reward_queue``
+    worker (see ``landing/reward_queue.py``) drains them in batches and
+    deletes each job once it has been applied.  A job that keeps failing is
+    left in place with ``attempts`` / ``last_error`` for inspection.
+    """
+
+    session = models.OneToOneField(
+        Session,
+        on_delete=models.CASCADE,
+        related_name="reward_job",
+        help_text="The ended session to score and reward (one job per session).",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.IntegerField(
+        default=0,
+        help_text="Failed processing attempts so far.",
+    )
+    last_error = models.TextField(
+        blank=True,
+        default="",
+        help_text="Error from the most recent failed attempt.",
+    )
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Reward Job"
+
+    def __str__(self):
+        return f"Reward job session={self.session_id} attempts={self.attempts}"
+
+
+class ArmPruneLog(models.Model):
+    """
+    One pruning decision: an arm made dormant or re-admitted.
+
+    Written by ``landing/arm_pruning.py`` (the ``prune_bandit_arms``
+    command) for every change to ``BanditArm.dormant_since``, so the
+    history of why an arm stopped being scored — and when it came back —
+    is never lost.  ``details`` holds the evidence: the confidence width
+    used, the worst-case margin over the reference contexts and the arms
+    that beat it.
+    """
+
+    ACTION_PRUNE = "prune"
+    ACTION_READMIT = "readmit"
+    ACTION_CHOICES = [
+        (ACTION_PRUNE, "Pruned (dormant)"),
+        (ACTION_READMIT, "Re-admitted"),
+    ]
+
+    arm = models.ForeignKey(
+        BanditArm,
+        on_delete=models.CASCADE,
+        related_name="prune_logs",
+    )
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    reason = models.CharField(
+        max_length=32,
+        help_text='Why: "dominated", "scheduled" (low-rate re-admission) or "manual".',
+    )
+    n = models.IntegerField(
+        help_text="The arm's LinearArmParam.n at the time (re-pruning waits for fresh pulls).",
+    )
+    details = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Evidence: beta, contexts evaluated, worst margin, arms that dominated it.",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        verbose_name = "Arm Prune Log"
+        indexes = [
+            models.Index(fields=["arm", "-created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.arm.arm_id} ({self.reason}) n={self.n}"
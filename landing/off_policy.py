@@ -0,0 +1,318 @@
+"""
+Off-policy evaluation — estimate how another slate policy would have done
+on logged traffic, without deploying it.
+
+load_logged_decisions – rewarded BanditDecision rows → LoggedDecisions numpy arrays
+fit_reward_model      – per-arm ridge regression on the log (for doubly robust)
+CandidatePolicy       – an ε-greedy slate policy to evaluate (ε, K, weights, UCB bonus, slate solver)
+evaluate_policies     – IPS, SNIPS and doubly-robust estimates for many policies in one pass
+
+How it works (plain English)
+----------------------------
+Every decision logs the slate it showed, the reward it got and the
+probability the live policy had of showing that slate (``propensity``).
+For a candidate policy π we compute, for every logged row, the
+probability π would have shown the *same* slate — vectorised over all
+rows at once.  The importance weight w = π(slate | x) / propensity says
+how much that row counts for π:
+
+    IPS    = mean(w · r)
+    SNIPS  = Σ w·r / Σ w                        (lower variance, slightly biased)
+    DR     = mean(q̂_π(x) + w · (r − q̂(x, slate)))
+
+q̂(x, slate) is a reward model — the mean of the per-arm ridge
+predictions over the slate's arms, clipped to [0, 1] — and q̂_π(x) its
+expected value under π.  DR stays unbiased when either the propensities
+or the reward model are right.
+
+Candidate policies use the same ε-greedy slate rule as decide_slate
+(exploit slate, then with probability ε swap one slot for a random arm
+that fits) and, by default, the same slate search (SLATE_SOLVER), with no
+warmup forcing.  The greedy search runs vectorised over all rows; the
+exact search runs per row, like the live decisions it reproduces.  Rows
+logged without a propensity (Thompson sampling) are skipped.  A
+candidate with a different K never reproduces a logged slate, so its
+support is zero — the ``support`` / ``ess`` columns show how much of the
+log actually informs each estimate.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import bandit_utils
+from .bandit_utils import (
+    EPSILON,
+    FEATURE_DIM,
+    LAMBDA_REG,
+    SLATE_K,
+    _exact_slate,
+    get_arm_catalog,
+)
+from .models import BanditDecision
+
+OPE_CHUNK_SIZE = 100_000   # rows scored at once (bounds memory for large logs)
+
+
+@dataclass
+class LoggedDecisions:
+    """Logged decisions as arrays; row i is one decision."""
+
+    X: np.ndarray            # (N, d) context vectors
+    slates: np.ndarray       # (N, n_arms) bool — arm j was in the logged slate
+    rewards: np.ndarray      # (N,)
+    propensities: np.ndarray  # (N,) logging probability of the slate
+    arm_ids: list            # column j of ``slates`` ↔ arm_ids[j]
+    conflicts: np.ndarray    # (n_arms, n_arms) bool — arms i, j cannot share a slate
+    allowed: np.ndarray      # (n_arms,) bool — arm may appear in a slate
+    conflict_masks: list     # catalog bitsets, for the per-row exact slate search
+    slate_mask: int          # catalog bitset of ``allowed``
+    page_id: int | None = None  # arm namespace the rows were logged in (None = shared)
+
+
+@dataclass
+class CandidatePolicy:
+    """
+    An ε-greedy slate policy to evaluate.
+
+    ``theta`` (n_arms, d) defaults to the live model's weights; with
+    ``alpha`` > 0 each arm also gets the LinUCB bonus α·sqrt(xᵀA⁻¹x)
+    (``A_inv`` defaults to the live model's).  ``solver`` is the slate
+    search, ``"exact"`` or ``"greedy"``; None uses the live SLATE_SOLVER.
+    """
+
+    name: str
+    epsilon: float = EPSILON
+    k: int = SLATE_K
+    theta: np.ndarray | None = None
+    alpha: float = 0.0
+    A_inv: np.ndarray | None = None
+    solver: str | None = None
+
+
+def load_logged_decisions(queryset=None, catalog=None, chunk_size=10_000, page_id=None):
+    """
+    Load rewarded decisions that have a propensity into a LoggedDecisions.
+
+    Only decisions from the catalog's namespace are read: ``page_id``'s
+    arms (a page without arms of its own uses the shared ones, like
+    decide_slate).  Rows whose context vector has the wrong length or
+    whose slate uses an arm not in the current catalog are dropped.
+    """
+    catalog = catalog or get_arm_catalog(page_id)
+    column = {arm.arm_id: j for j, arm in enumerate(catalog.arms)}
+    n_arms = len(catalog.arms)
+    if queryset is None:
+        queryset = BanditDecision.objects.all()
+    rows = (
+        queryset
+        .filter(page_id=catalog.page_id, reward__isnull=False, propensity__gt=0)
+        .order_by("pk")
+        .values_list("context_vector", "chosen_arm_ids", "reward", "propensity")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    vectors, members, rewards, propensities = [], [], [], []
+    for context_vector, chosen_arm_ids, reward, propensity in rows:
+        if len(context_vector or []) != FEATURE_DIM or not chosen_arm_ids:
+            continue
+        cols = [column.get(arm_id) for arm_id in chosen_arm_ids]
+        if None in cols:
+            continue
+        vectors.append(context_vector)
+        members.append(cols)
+        rewards.append(reward)
+        propensities.append(propensity)
+
+    slates = np.zeros((len(members), n_arms), dtype=bool)
+    for i, cols in enumerate(members):
+        slates[i, cols] = True
+
+    conflicts = np.zeros((n_arms, n_arms), dtype=bool)
+    for i, mask in enumerate(catalog.conflict_masks):
+        for j in range(n_arms):
+            conflicts[i, j] = (mask >> j) & 1
+    allowed = np.array([(catalog.slate_mask >> j) & 1 for j in range(n_arms)], dtype=bool)
+
+    return LoggedDecisions(
+        X=np.asarray(vectors, dtype=float).reshape(-1, FEATURE_DIM),
+        slates=slates,
+        rewards=np.asarray(rewards, dtype=float),
+        propensities=np.asarray(propensities, dtype=float),
+        arm_ids=[arm.arm_id for arm in catalog.arms],
+        conflicts=conflicts,
+        allowed=allowed,
+        conflict_masks=list(catalog.conflict_masks),
+        slate_mask=catalog.slate_mask,
+        page_id=catalog.page_id,
+    )
+
+
+def fit_reward_model(data, lam=LAMBDA_REG):
+    """Per-arm ridge weights (n_arms, d) fitted on every logged row that showed the arm."""
+    d = data.X.shape[1]
+    theta = np.zeros((len(data.arm_ids), d))
+    for j in range(len(data.arm_ids)):
+        X = data.X[data.slates[:, j]]
+        theta[j] = np.linalg.solve(lam * np.eye(d) + X.T @ X, X.T @ data.rewards[data.slates[:, j]])
+    return theta
+
+
+# ---------------------------------------------------------------------------
+# Vectorised slate policy (all rows of a chunk at once)
+# ---------------------------------------------------------------------------
+
+def _greedy_slates(scores, conflicts, allowed, k):
+    """
+    Greedy top-K non-conflicting slate for every row → (N, k) arm columns, −1 for empty slots.
+
+    Same rule as bandit_utils._greedy_slate, one step per slot across all rows.
+    """
+    masked = np.where(allowed, scores, -np.inf)
+    slots = np.full((len(scores), k), -1, dtype=np.int64)
+    rows = np.arange(len(scores))
+    for step in range(k):
+        best = masked.argmax(axis=1)
+        ok = masked[rows, best] > -np.inf
+        slots[:, step] = np.where(ok, best, -1)
+        # Rows with nothing left are all −inf already, so blocking is harmless there
+        masked[conflicts[best]] = -np.inf
+    return slots
+
+
+def _exact_slates(scores, conflict_masks, slate_mask, k):
+    """bandit_utils._exact_slate for every row → (N, k) arm columns, −1 for empty slots."""
+    slots = np.full((len(scores), k), -1, dtype=np.int64)
+    for row, row_scores in enumerate(scores):
+        slate = _exact_slate(row_scores, conflict_masks, slate_mask, k)
+        slots[row, :len(slate)] = slate
+    return slots
+
+
+def _policy_terms(scores, slates, conflicts, allowed, k, epsilon, slot_scores, slots=None):
+    """
+    For every row: π(logged slate | x) and E_π[q̂] for an ε-greedy slate policy.
+
+    ``slot_scores`` are the reward model's per-arm predictions (N, n_arms),
+    so q̂(x, S) = mean of slot_scores over S.  ``slots`` (N, k) are the
+    exploit slates; by default the vectorised greedy search picks them.
+
+    Works slot by slot on gathered (N,) / (N, k) arrays: the logged slate
+    is reachable by swapping slot j when it equals the exploit slate (the
+    slot's own arm is redrawn) or differs from it by exactly slot j's arm,
+    replaced by an arm that fits next to the other K − 1.
+    """
+    n = len(scores)
+    rows = np.arange(n)
+    if slots is None:
+        slots = _greedy_slates(scores, conflicts, allowed, k)
+    filled = slots >= 0
+    arm = np.where(filled, slots, 0)            # safe gather index for empty slots
+    k_eff = filled.sum(axis=1)
+    safe_k = np.maximum(k_eff, 1)
+
+    slot_score = np.where(filled, np.take_along_axis(slot_scores, arm, axis=1), 0.0)
+    in_logged = filled & np.take_along_axis(slates, arm, axis=1)
+    exploit_sum = slot_score.sum(axis=1)
+    q_exploit = exploit_sum / safe_k
+
+    size = slates.sum(axis=1)
+    hits = in_logged.sum(axis=1)
+    same = (size == k_eff) & (hits == k_eff)
+    one_swap = (size == k_eff) & (hits == k_eff - 1)
+    # The single logged arm outside the exploit slate (meaningful where one_swap)
+    outside = slates.copy()
+    outside[rows[:, None], arm] &= ~filled
+    extra = outside.argmax(axis=1)
+
+    slot_conflicts = conflicts[arm] & filled[:, :, None]   # (N, k, n_arms)
+    prob = np.where(same, 1.0 - epsilon, 0.0)
+    q_explore = np.zeros(n)
+    for j in range(k):
+        has = filled[:, j]
+        blocked = np.zeros_like(slates)
+        for i in range(k):
+            if i != j:
+                blocked |= slot_conflicts[:, i]
+        candidates = allowed & ~blocked       # always includes slot j's own arm
+        n_candidates = np.maximum(candidates.sum(axis=1), 1)
+        hit = has & (same | (one_swap & ~in_logged[:, j] & candidates[rows, extra]))
+        prob += np.where(hit, epsilon / safe_k / n_candidates, 0.0)
+
+        # Expected q̂ after swapping slot j: the other slots plus the mean candidate
+        mean_candidate = (slot_scores * candidates).sum(axis=1) / n_candidates
+        q_swap = (exploit_sum - slot_score[:, j] + mean_candidate) / safe_k
+        q_explore += np.where(has, q_swap / safe_k, 0.0)
+
+    q_pi = (1.0 - epsilon) * q_exploit + epsilon * q_explore
+    return prob, q_pi
+
+
+def _confidence_widths(X, A_inv):
+    """sqrt(xᵀA⁻¹x) for every row and arm → (N, n_arms), as one BLAS matmul."""
+    n_arms, d, _ = A_inv.shape
+    XA = (X @ A_inv.transpose(1, 0, 2).reshape(d, n_arms * d)).reshape(len(X), n_arms, d)
+    return np.sqrt(np.maximum(np.einsum("naj,nj->na", XA, X), 0.0))
+
+
+def evaluate_policies(data, policies, reward_model=None, chunk_size=OPE_CHUNK_SIZE):
+    """
+    Estimate every candidate policy's average reward on the logged data.
+
+    Returns a list of dicts (one per policy, in order) with ``name``,
+    ``ips``, ``snips``, ``dr``, ``support`` (fraction of rows the policy
+    could have reproduced) and ``ess`` (effective sample size, (Σw)²/Σw²).
+    The logged policy's own average reward is ``data.rewards.mean()``.
+    """
+    catalog = None
+    reward_theta = fit_reward_model(data) if reward_model is None else reward_model
+    resolved = []
+    for policy in policies:
+        theta, A_inv = policy.theta, policy.A_inv
+        if theta is None or (policy.alpha and A_inv is None):
+            catalog = catalog or get_arm_catalog(data.page_id)
+            theta = catalog.theta if theta is None else theta
+            A_inv = catalog.A_inv if A_inv is None else A_inv
+        solver = policy.solver or bandit_utils.SLATE_SOLVER
+        resolved.append((policy, np.asarray(theta, dtype=float), A_inv, solver))
+
+    sums = [dict(wr=0.0, w=0.0, w2=0.0, dr=0.0, support=0) for _ in policies]
+    n_rows = len(data.rewards)
+    for start in range(0, n_rows, chunk_size):
+        stop = start + chunk_size
+        X = data.X[start:stop]
+        slates = data.slates[start:stop]
+        r = data.rewards[start:stop]
+        p = data.propensities[start:stop]
+        slot_scores = np.clip(X @ reward_theta.T, 0.0, 1.0)
+        q_logged = (slot_scores * slates).sum(axis=1) / np.maximum(slates.sum(axis=1), 1)
+
+        for (policy, theta, A_inv, solver), acc in zip(resolved, sums):
+            scores = X @ theta.T
+            if policy.alpha:
+                widths = _confidence_widths(X, A_inv)
+                scores = scores + policy.alpha * widths
+            slots = None
+            if solver == "exact":
+                slots = _exact_slates(scores, data.conflict_masks, data.slate_mask, policy.k)
+            prob, q_pi = _policy_terms(
+                scores, slates, data.conflicts, data.allowed, policy.k, policy.epsilon, slot_scores, slots
+            )
+            w = prob / p
+            acc["wr"] += float(w @ r)
+            acc["w"] += float(w.sum())
+            acc["w2"] += float(w @ w)
+            acc["dr"] += float((q_pi + w * (r - q_logged)).sum())
+            acc["support"] += int((w > 0).sum())
+
+    results = []
+    for policy, acc in zip(policies, sums):
+        results.append({
+            "name": policy.name,
+            "ips": acc["wr"] / n_rows if n_rows else float("nan"),
+            "snips": acc["wr"] / acc["w"] if acc["w"] else float("nan"),
+            "dr": acc["dr"] / n_rows if n_rows else float("nan"),
+            "support": acc["support"] / n_rows if n_rows else 0.0,
+            "ess": acc["w"] ** 2 / acc["w2"] if acc["w2"] else 0.0,
+        })
+    return results
@@ -0,0 +1,333 @@
+"""
+Reward processing for ended sessions — inline or through the RewardJob queue.
+
+score_session       – compute and store a session's intent scores
+reward_session      – apply the bandit reward for one session right now
+enqueue_reward      – record a RewardJob so the worker handles the session later
+drain_reward_queue  – worker step: process one batch of queued jobs
+reward_queue_depth  – number of jobs still waiting
+
+Why a queue
+-----------
+``end_session`` is a sendBeacon request fired as the visitor leaves.
+Scoring events, finding observed sections and writing every arm's
+parameters inside it makes the beacon slow and puts parameter writes on
+the request path.  With ``settings.BANDIT_REWARD_QUEUE = True`` the view
+only marks the session ended and inserts a RewardJob row; the
+``process_reward_queue`` management command drains the table in batches,
+folding all observations for the same arm into one parameter write.
+
+No broker is involved — the queue is an ordinary table, so it works on
+SQLite and Postgres alike.  On Postgres several workers can run at once:
+jobs are claimed with ``SELECT … FOR UPDATE SKIP LOCKED``.
+"""
+
+import logging
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from .bandit_utils import FEATURE_DIM, apply_stats_delta, update_stats_batch
+from .decision_buffer import flush_decision
+from .delta_learner import learn
+from .device import is_bot_user_agent
+from .models import BanditArm, BanditDecision, Event, RewardJob, Session
+from .utils import compute_session_intent_scores
+from .visitor_features import record_session_scores
+
+logger = logging.getLogger(__name__)
+
+REWARD_QUEUE_BATCH_SIZE = 200   # jobs claimed per drain_reward_queue() call
+REWARD_JOB_MAX_ATTEMPTS = 5     # failing jobs are skipped after this many tries
+
+
+def reward_queue_enabled():
+    """True when end_session should enqueue instead of rewarding inline."""
+    return getattr(settings, "BANDIT_REWARD_QUEUE", False)
+
+
+# ---------------------------------------------------------------------------
+# Per-session work (shared by the inline path and the worker)
+# ---------------------------------------------------------------------------
+
+def score_session(session):
+    """
+    Compute intent scores from the session's events and save them on the session.
+
+    The scores are also copied to the visitor's VisitorFeatures row for
+    the next visit's feature vector.
+    """
+    scores = compute_session_intent_scores(session)
+
+    session.max_scroll_pct = scores["max_scroll_pct"]
+    session.engaged_time_ms = scores["engaged_time_ms"]
+    session.cta_clicked = scores["cta_clicked"]
+    session.pricing_cta_clicked = scores["pricing_cta_clicked"]
+    session.price_intent_score = scores["price_intent_score"]
+    session.service_intent_score = scores["service_intent_score"]
+    session.trust_intent_score = scores["trust_intent_score"]
+    session.location_intent_score = scores["location_intent_score"]
+    session.contact_intent_score = scores["contact_intent_score"]
+    session.quick_scan_score = scores["quick_scan_score"]
+    session.primary_intent = scores["primary_intent"]
+
+    session.save()
+    record_session_scores(session)
+    return scores
+
+
+def session_reward(session):
+    """
+    Tiered reward for a scored session.
+
+    1.0 – clicked a pricing-plan CTA (full conversion intent)
+    0.5 – clicked any other CTA (navigated toward pricing)
+    0.0 – no CTA interaction
+    """
+    if session.pricing_cta_clicked:
+        return 1.0
+    if session.cta_clicked:
+        return 0.5
+    return 0.0
+
+
+def _plan_reward(session):
+    """
+    Work out the bandit update for a scored session without applying it.
+
+    Returns ``(decision, reward, arms, credited)`` where ``arms`` are the
+    slate arms whose affected sections the visitor actually observed and
+    ``credited`` maps the pk of each arm the decision was already
+    rewarded for to that earlier reward.  ``None`` when there is nothing
+    (more) to do: first visit, bot, no decision, or nothing better than
+    what is already credited.
+
+    A sticky reload (``Session.sticky_of``) has no decision of its own —
+    it reused the original page-load's slate — so its outcome goes to the
+    original decision.  That decision is rewarded for its whole group:
+    the best reward of the original session and its reloads, for every
+    arm observed in any of them.  A reload that ends after the original
+    was rewarded therefore tops the credit up instead of being lost.
+    """
+    if session.visit_number < 2 or is_bot_user_agent(session.user_agent):
+        return None
+    owner = session.sticky_of if session.sticky_of_id else session
+    flush_decision(owner)     # still in this worker's decision buffer?
+    try:
+        decision = BanditDecision.objects.get(session=owner)
+    except BanditDecision.DoesNotExist:
+        logger.debug("No BanditDecision for session %s — skipping reward.", owner.session_id)
+        return None
+
+    group = list(Session.objects.filter(Q(pk=owner.pk) | Q(sticky_of=owner)))
+    reward = max(session_reward(member) for member in group)
+
+    # Determine which sections the visitor actually saw
+    observed_sections = set(
+        Event.objects.filter(
+            session__in=group,
+            event_type__in=["section_view", "section_dwell"],
+        )
+        .exclude(section="")
+        .values_list("section", flat=True)
+        .distinct()
+    )
+
+    # Keep slate arms whose sections were observed
+    chosen_ids = decision.chosen_arm_ids or []
+    by_id = {
+        arm.arm_id: arm
+        for arm in BanditArm.objects.filter(page_id=decision.page_id, arm_id__in=chosen_ids)
+    }
+    arms = []
+    for arm_id in chosen_ids:
+        arm = by_id.get(arm_id)
+        if arm is None:
+            continue
+        arm_sections = set(arm.affected_sections or [])
+        # Empty affected_sections → always update (arm changes nothing section-specific)
+        if not arm_sections or (arm_sections & observed_sections):
+            arms.append(arm)
+        else:
+            logger.debug(
+                "Skipping unobserved arm=%s (needs %s, saw %s)",
+                arm_id, arm_sections, observed_sections,
+            )
+
+    credited = {}
+    if decision.reward is not None:
+        credited = {
+            arm.pk: decision.reward
+            for arm in arms if arm.arm_id in (decision.updated_arm_ids or [])
+        }
+        reward = max(reward, decision.reward)
+        if reward == decision.reward and len(credited) == len(arms):
+            # Already processed — idempotent guard
+            logger.debug("Bandit decision already rewarded for session %s", owner.session_id)
+            return None
+    return decision, reward, arms, credited
+
+
+def _raise_reward(decision, reward, arms, credited):
+    """Lift already-credited arms from their earlier reward to *reward* (b += Δr·x, n unchanged)."""
+    x = np.asarray(decision.context_vector, dtype=float)
+    for arm in arms:
+        if arm.pk in credited and reward != credited[arm.pk]:
+            apply_stats_delta(arm, np.zeros((FEATURE_DIM, FEATURE_DIM)), (reward - credited[arm.pk]) * x, 0)
+
+
+def _record_reward(decision, reward, arms):
+    decision.reward = reward
+    decision.updated_arm_ids = [arm.arm_id for arm in arms]
+    decision.save(update_fields=["reward", "updated_arm_ids"])
+    logger.info(
+        "Bandit reward: session=%s reward=%.1f updated=%s",
+        decision.session_id, reward, decision.updated_arm_ids,
+    )
+
+
+def reward_session(session):
+    """
+    Apply the bandit reward for an already-scored session immediately.
+
+    With ``settings.BANDIT_DELTA_LEARNER`` the parameter updates are
+    buffered in this process and merged by the next delta flush.
+    """
+    plan = _plan_reward(session)
+    if plan is None:
+        return
+    decision, reward, arms, credited = plan
+    for arm in arms:
+        if arm.pk not in credited:
+            learn(arm, decision.context_vector, reward)
+    _raise_reward(decision, reward, arms, credited)
+    _record_reward(decision, reward, arms)
+
+
+# ---------------------------------------------------------------------------
+# Queue
+# ---------------------------------------------------------------------------
+
+def enqueue_reward(session):
+    """Queue a session for scoring and reward (a no-op if it is already queued)."""
+    RewardJob.objects.get_or_create(session=session)
+
+
+def reward_queue_depth():
+    """Number of jobs waiting to be processed (excluding ones that gave up)."""
+    return RewardJob.objects.filter(attempts__lt=REWARD_JOB_MAX_ATTEMPTS).count()
+
+
+def _apply_plans(plans):
+    """
+    Apply planned rewards: one parameter write per arm, then stamp each decision.
+
+    *plans* is a list of ``(job, decision, reward, arms, credited)``.
+    Every arm write, reward top-up and decision stamp runs in its own
+    savepoint.  When one
+    fails, the jobs that fed it are charged with the error and the whole
+    pass is rolled back and repeated without them — a job that also fed
+    a healthy arm must not have half its reward applied, or its retry
+    would apply that half twice.  Returns ``(arms_updated, failures)``,
+    failures mapping job → exception.
+    """
+    failures = {}
+    while True:
+        live = [plan for plan in plans if plan[0] not in failures]
+        per_arm = OrderedDict()   # arm pk → (arm, [x, ...], [reward, ...], [job, ...])
+        for job, decision, reward, arms, credited in live:
+            for arm in arms:
+                if arm.pk in credited:
+                    continue
+                _, xs, rs, fed = per_arm.setdefault(arm.pk, (arm, [], [], []))
+                xs.append(decision.context_vector)
+                rs.append(reward)
+                fed.append(job)
+        steps = [(fed, partial(update_stats_batch, arm, xs, rs)) for arm, xs, rs, fed in per_arm.values()]
+        for job, decision, reward, arms, credited in live:
+            if credited:
+                steps.append(([job], partial(_raise_reward, decision, reward, arms, credited)))
+        steps += [([job], partial(_record_reward, decision, reward, arms)) for job, decision, reward, arms, _ in live]
+
+        with transaction.atomic():
+            for fed, apply in steps:
+                try:
+                    with transaction.atomic():
+                        apply()
+                except Exception as exc:
+                    logger.exception("Reward apply failed; charging %d job(s).", len(fed))
+                    for job in fed:
+                        failures[job] = exc
+                    transaction.set_rollback(True)
+                    break
+            else:
+                return len(per_arm), failures
+
+
+def drain_reward_queue(batch_size=REWARD_QUEUE_BATCH_SIZE):
+    """
+    Process one batch of queued jobs; return ``(processed, failed)``.
+
+    Each job's session is scored and its reward planned inside its own
+    savepoint, so one bad job only marks itself failed.  Jobs whose
+    plans share a decision (sticky reloads) are applied once.  The planned
+    observations are then grouped by arm and applied with one parameter
+    write per arm (see ``_apply_plans``: an arm whose write fails only
+    fails the jobs that fed it); decisions are stamped and finished jobs
+    deleted in the same transaction, so a crash never applies a reward
+    twice.
+    """
+    with transaction.atomic():
+        jobs = list(
+            RewardJob.objects
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("session", "session__visitor")
+            .filter(attempts__lt=REWARD_JOB_MAX_ATTEMPTS)[:batch_size]
+        )
+        if not jobs:
+            return 0, 0
+
+        planned = []
+        done, failed = [], []
+        for job in jobs:
+            try:
+                with transaction.atomic():
+                    score_session(job.session)
+                    plan = _plan_reward(job.session)
+            except Exception as exc:
+                logger.exception("Reward job failed for session %s.", job.session_id)
+                job.last_error = repr(exc)
+                failed.append(job)
+                continue
+            done.append(job)
+            if plan is not None:
+                planned.append((job, *plan))
+
+        # An original session and its sticky reloads share one decision, and
+        # none of them sees the stamp until the batch is applied: keep only
+        # the last plan per decision — it was made with every session of the
+        # group scored so far, so it covers the earlier ones.
+        planned = list({plan[1].pk: plan for plan in planned}.values())
+
+        arms_updated, failures = _apply_plans(planned)
+        for job, exc in failures.items():
+            job.last_error = repr(exc)
+            failed.append(job)
+        done = [job.pk for job in done if job not in failures]
+
+        RewardJob.objects.filter(pk__in=done).delete()
+        for job in failed:
+            RewardJob.objects.filter(pk=job.pk).update(
+                attempts=F("attempts") + 1,
+                last_error=job.last_error,
+            )
+
+    logger.info(
+        "Reward queue: processed=%d failed=%d arms_updated=%d",
+        len(done), len(failed), arms_updated,
+    )
+    return len(done), len(failed)
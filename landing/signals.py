@@ -0,0 +1,51 @@
+"""
+Signal handlers that keep the in-process arm catalogs fresh.
+
+Any save / delete of a BanditArm or LinearArmParam bumps the
+BanditModelVersion counter of the arm's namespace (its landing page, or
+the shared arms), which makes every worker reload that catalog on the
+next decision (see ``bandit_utils.get_arm_catalog``).  Other pages'
+catalogs are untouched.  This covers admin edits, ``seed_bandit_arms``
+and ``update_stats``.  Parameter writes bump only when their transaction
+commits, so workers never reload a version that is not visible yet.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .bandit_utils import bump_model_version
+from .models import BanditArm, LinearArmParam
+
+
+@receiver(post_save, sender=BanditArm)
+def bandit_arm_changed(sender, instance, created=False, **kwargs):
+    bump_model_version(arms=True, page_id=instance.page_id)
+    if created:
+        return
+    # Moved to another page: its parameters follow, and the old page drops it
+    moved_from = set(
+        LinearArmParam.objects
+        .filter(arm=instance)
+        .exclude(page_id=instance.page_id)
+        .values_list("page_id", flat=True)
+    )
+    if moved_from:
+        LinearArmParam.objects.filter(arm=instance).update(page_id=instance.page_id)
+        for page_id in moved_from:
+            bump_model_version(arms=True, page_id=page_id)
+
+
+@receiver(post_delete, sender=BanditArm)
+def bandit_arm_deleted(sender, instance, **kwargs):
+    bump_model_version(arms=True, page_id=instance.page_id)
+
+
+@receiver([post_save, post_delete], sender=LinearArmParam)
+def linear_param_changed(sender, instance, **kwargs):
+    # After commit: the version row is shared by the whole namespace, and
+    # bumping it inside update_stats' transaction would hold its lock until
+    # commit, serializing updates of unrelated arms.
+    transaction.on_commit(partial(bump_model_version, page_id=instance.page_id))
@@ -16,12 +16,17 @@ from typing import Dict, Iterable, List, Sequence, Tuple
 import numpy as np
 
 from .bandit_utils import (
-    FEATURE_NAMES,
     _conflicts_with_slate,
+    get_arm_catalog,
     make_initial_A,
+    make_initial_A_chol,
+    make_initial_A_inv,
     make_initial_b,
 )
+from .device import DEVICE_DESKTOP, DEVICE_MOBILE, device_is_mobile
+from .features import FEATURES
 from .models import BanditArm, BanditArmStat, LinearArmParam
+from .visitor_features import INTENT_FIELDS
 
 
 # --- Simulator tuning constants ---------------------------------------------
@@ -54,6 +59,9 @@ PERSONA_SPECS = {
 }
 
 
+INTENT_KEYS = ("price", "service", "trust", "location", "contact")   # same order as INTENT_FIELDS
+
+
 PERSONA_KEYWORDS = {
     "price": ("pricing", "price", "plan"),
     "trust": ("testimonials", "faq", "trust", "review"),
@@ -86,15 +94,16 @@ def choose_persona(rng: random.Random, personas: Sequence[str] | None = None) ->
 def build_synthetic_context(persona: str, rng: random.Random, noise_std: float = CONTEXT_NOISE_STD) -> Tuple[Dict[str, float], List[float]]:
     """
     Build synthetic intent + device context and convert it into the same feature
-    vector layout expected by the bandit core (`FEATURE_NAMES`).
+    vector layout expected by the bandit core, through the shared feature
+    pipeline (`landing.features.FEATURES`).
     """
     base = PERSONA_SPECS[persona]
     noisy_scores = {}
     for key, base_value in base.items():
         noisy_scores[key] = clip01(base_value + rng.gauss(0.0, noise_std))
 
-    device = "mobile" if rng.random() < DEVICE_MOBILE_PROB else "desktop"
-    is_mobile = 1.0 if device == "mobile" else 0.0
+    device = DEVICE_MOBILE if rng.random() < DEVICE_MOBILE_PROB else DEVICE_DESKTOP
+    is_mobile = 1.0 if device_is_mobile(device) else 0.0
 
     visit_count = rng.randint(VISIT_COUNT_MIN, VISIT_COUNT_MAX)
     visit_number_norm = min(visit_count, VISIT_COUNT_MAX) / float(VISIT_COUNT_MAX)
@@ -112,17 +121,11 @@ def build_synthetic_context(persona: str, rng: random.Random, noise_std: float =
         "visit_number_norm": visit_number_norm,
     }
 
-    feature_map = {
-        "is_mobile": context["is_mobile"],
-        "price_score": context["price"],
-        "service_score": context["service"],
-        "trust_score": context["trust"],
-        "location_score": context["location"],
-        "contact_score": context["contact"],
-        "visit_number_norm": context["visit_number_norm"],
-        "bias": 1.0,
-    }
-    feature_vector = [float(feature_map.get(name, 0.0)) for name in FEATURE_NAMES]
+    # The simulator keeps its own visit scale, so it supplies that column itself
+    inputs = {field: noisy_scores[key] for key, field in zip(INTENT_KEYS, INTENT_FIELDS)}
+    inputs["device"] = device
+    inputs["visit_number_norm"] = visit_number_norm
+    feature_vector = FEATURES.transform_one(inputs)
     return context, feature_vector
 
 
@@ -206,13 +209,28 @@ def random_non_conflicting_slate(
     shuffled = list(candidates)
     rng.shuffle(shuffled)
 
+    # Reuse production conflict rules so random baseline is still valid.
+    # The compiled bitset graph turns each check into a bit test; arms that
+    # are not in the active catalog fall back to pairwise checks.
+    catalog = get_arm_catalog()
+    if any(arm.pk not in catalog.index for arm in shuffled):
+        chosen = []
+        for arm in shuffled:
+            if len(chosen) >= k:
+                break
+            if not _conflicts_with_slate(arm, chosen):
+                chosen.append(arm)
+        return chosen
+
     chosen = []
+    blocked = 0
     for arm in shuffled:
         if len(chosen) >= k:
             break
-        # Reuse production conflict rules so random baseline is still valid.
-        if not _conflicts_with_slate(arm, chosen):
+        i = catalog.index[arm.pk]
+        if not (blocked >> i) & 1:
             chosen.append(arm)
+            blocked |= catalog.conflict_masks[i]
     return chosen
 
 
@@ -224,19 +242,48 @@ def no_change_slate(arms: Sequence[BanditArm]) -> List[BanditArm]:
 
 
 def reset_bandit_params() -> None:
-    """Reset learned model state in DB so simulation starts from scratch."""
-    LinearArmParam.objects.all().delete()
+    """Reset the shared arms' learned model state so simulation starts from scratch."""
+    LinearArmParam.objects.filter(page__isnull=True).delete()
     BanditArmStat.objects.all().delete()
 
-    for arm in BanditArm.objects.filter(is_active=True):
+    for arm in BanditArm.objects.filter(page__isnull=True, is_active=True):
         LinearArmParam.objects.create(
             arm=arm,
             A_matrix=make_initial_A(),
             b_vector=make_initial_b(),
+            A_inv=make_initial_A_inv(),
+            A_chol=make_initial_A_chol(),
             n=0,
         )
 
 
+def top_arms_by_persona(
+    catalog,
+    rng: random.Random,
+    samples: int = 200,
+    top: int = 3,
+) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Report which arms the learned model favours for each persona.
+
+    Draws ``samples`` synthetic contexts per persona and scores them against
+    every arm in one batch (``catalog.score_batch``), then returns the
+    ``top`` arms by mean predicted reward. The control arm is skipped.
+    """
+    report: Dict[str, List[Tuple[str, float]]] = {}
+    for persona in PERSONA_SPECS:
+        X = [build_synthetic_context(persona, rng)[1] for _ in range(samples)]
+        mean_scores = catalog.score_batch(X).mean(axis=0)
+        mean_scores[catalog.is_control] = -np.inf
+        best = np.argsort(-mean_scores, kind="stable")[:top]
+        report[persona] = [
+            (catalog.arms[i].arm_id, float(mean_scores[i]))
+            for i in best
+            if np.isfinite(mean_scores[i])
+        ]
+    return report
+
+
 def moving_average(values: Sequence[float], window: int = 200) -> np.ndarray:
     arr = np.asarray(values, dtype=float)
     if arr.size == 0:
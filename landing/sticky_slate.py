@@ -0,0 +1,158 @@
+"""
+Sticky slates — reuse a visitor's last slate for a short window (``BANDIT_STICKY_SECONDS``).
+
+cached_slate       – the visitor's slate from the last BANDIT_STICKY_SECONDS, or None
+remember_slate     – store a freshly decided slate for the visitor
+sticky_stats       – this process's hit / miss counts
+check_sticky_cache – system check: warn when the sticky cache is per-process
+
+Why
+---
+A visitor who reloads or opens several tabs used to get a fresh
+``decide_slate`` and a new BanditDecision per page-load, and could see
+the layout flip between slates.  With ``BANDIT_STICKY_SECONDS`` > 0 the
+slate picked for a visitor is kept in Django's cache (the
+``BANDIT_STICKY_CACHE`` alias, ``default`` by default) for that many
+seconds; page-loads inside the window get the same arms with no scoring
+and no decision row.
+
+The cache must be shared by every worker (Redis, Memcached, database).
+With a per-process LocMemCache — Django's fallback when CACHES is not
+configured — a reload served by another worker misses and decides again,
+so stickiness only holds by luck; ``check_sticky_cache`` warns about it
+at startup.
+
+Key and invalidation
+--------------------
+Entries are keyed by visitor, landing page and the page catalog's
+``arms_version``, so adding, removing or editing one of that page's arms
+starts a fresh slate, and each page keeps its own slate per visitor.  Parameter
+updates (``params_version``, bumped by every reward) do not: the slate
+already on screen stays valid while the model keeps learning.  The
+window is fixed from the original decision — hits do not extend it.
+
+Hits and the BanditDecision ↔ Session relation
+----------------------------------------------
+BanditDecision stays one-to-one with the Session it was made for.  A
+hit creates no decision; its Session row instead points at the session
+that owns it (``Session.sticky_of``), set in the same INSERT, so a hit
+costs one cache read and no extra query.  Outcomes of reloads are
+credited to the original decision, which counts once for the whole group
+(see ``reward_queue._plan_reward``), so a reload never counts the same
+slate twice and its clicks are not lost.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from .bandit_utils import get_arm_catalog
+
+logger = logging.getLogger(__name__)
+
+STICKY_CACHE_PREFIX = "bandit:sticky"
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def sticky_seconds():
+    """Length of the sticky window in seconds (0 = disabled)."""
+    return getattr(settings, "BANDIT_STICKY_SECONDS", 0)
+
+
+def sticky_cache_alias():
+    """CACHES alias the sticky slates are kept in."""
+    return getattr(settings, "BANDIT_STICKY_CACHE", "default")
+
+
+def _cache():
+    return caches[sticky_cache_alias()]
+
+
+def _key(visitor_pk, page_id, arms_version):
+    return f"{STICKY_CACHE_PREFIX}:{page_id or 0}:{arms_version}:{visitor_pk}"
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cached_slate(visitor, page_id=None):
+    """
+    The visitor's slate on *page_id* from the current window, or None.
+
+    Returns a dict with ``session_id`` (pk of the session holding the
+    decision), ``arms`` (BanditArm list, in slate order), ``explore`` and
+    ``policy``.  A slate whose arms are no longer all in the catalog is
+    ignored.
+    """
+    if sticky_seconds() <= 0:
+        return None
+    catalog = get_arm_catalog(page_id)
+    entry = _cache().get(_key(visitor.pk, page_id, catalog.version[0]))
+    if entry is not None:
+        idx = [catalog.index.get(pk) for pk in entry["arm_pks"]]
+        if None not in idx:
+            _count("hits")
+            return {
+                "session_id": entry["session_id"],
+                "arms": [catalog.arms[i] for i in idx],
+                "explore": entry["explore"],
+                "policy": entry["policy"],
+            }
+    _count("misses")
+    return None
+
+
+def remember_slate(visitor, session, arms, explored, policy, page_id=None):
+    """Keep *arms* as *visitor*'s slate on *page_id* for the next BANDIT_STICKY_SECONDS."""
+    ttl = sticky_seconds()
+    if ttl <= 0:
+        return
+    catalog = get_arm_catalog(page_id)
+    _cache().set(
+        _key(visitor.pk, page_id, catalog.version[0]),
+        {
+            "session_id": session.pk,
+            "arm_pks": [arm.pk for arm in arms],
+            "explore": explored,
+            "policy": policy,
+        },
+        timeout=ttl,
+    )
+
+
+def sticky_stats():
+    """``{"hits": …, "misses": …}`` since this process started."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def check_sticky_cache(app_configs=None, **kwargs):
+    """System check: sticky slates need a cache every worker shares."""
+    if sticky_seconds() <= 0:
+        return []
+    alias = sticky_cache_alias()
+    try:
+        backend = caches[alias]
+    except InvalidCacheBackendError:
+        return [checks.Error(
+            f"BANDIT_STICKY_CACHE = {alias!r} is not configured in CACHES.",
+            id="landing.E001",
+        )]
+    if isinstance(backend, LocMemCache):
+        return [checks.Warning(
+            f"Sticky slates are kept in the per-process LocMemCache ({alias!r}).",
+            hint=(
+                "Reloads served by another worker will get a new slate. Point "
+                "BANDIT_STICKY_CACHE at a shared backend (Redis, Memcached, database)."
+            ),
+            id="landing.W001",
+        )]
+    return []
@@ -17,7 +17,8 @@ import json
 import uuid
 from datetime import timedelta
 
-from django.test import TestCase, RequestFactory
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 
 from landing.models import (
@@ -25,24 +26,35 @@ from landing.models import (
     BanditDecision,
     Event,
     LinearArmParam,
+    RewardJob,
     Session,
     Visitor,
+    VisitorFeatures,
 )
 from landing.bandit_utils import (
     EPSILON,
     FEATURE_DIM,
+    FEATURE_NAMES,
     MIN_PULLS_PER_ARM,
+    REINVERT_EVERY,
     _has_conflict,
     _predict,
     _conflicts_with_slate,
+    _exact_slate,
+    _greedy_slate,
     build_context,
     choose_arm,
     choose_slate,
+    decide_slate,
+    get_arm_catalog,
     make_initial_A,
     make_initial_b,
     merge_page_configs,
+    slate_page_config,
     update_stats,
+    update_stats_batch,
 )
+from landing.fields import decode_array, encode_array
 from landing.utils import _saturate, _score_intent_group, compute_session_intent_scores
 
 
@@ -930,3 +942,2252 @@ class AcceptCookiesValidationTests(TestCase):
         data = resp.json()
         self.assertTrue(data["is_new"])
         self.assertEqual(data["visit_number"], 1)
+
+
+class ArmCatalogCacheTests(TestCase):
+    """The in-process arm catalog is reused until the model version changes."""
+
+    def setUp(self):
+        _seed_arms()
+
+    def test_warm_catalog_costs_one_version_query(self):
+        # Function under test: get_arm_catalog() via choose_slate()
+        fv = _dummy_feature_vector()
+        choose_slate(fv, k=3, epsilon=0.0)
+        with self.assertNumQueries(1):
+            chosen, _, _ = choose_slate(fv, k=3, epsilon=0.0)
+        self.assertGreater(len(chosen), 0)
+
+    def test_arm_edit_invalidates_catalog(self):
+        # Function under test: get_arm_catalog()
+        self.assertIn("hero_compact", get_arm_catalog().by_arm_id)
+        arm = BanditArm.objects.get(arm_id="hero_compact")
+        arm.is_active = False
+        arm.save()
+        self.assertNotIn("hero_compact", get_arm_catalog().by_arm_id)
+
+    def test_update_stats_reloads_params_only(self):
+        # Function under test: get_arm_catalog() after update_stats()
+        before = get_arm_catalog()
+        arm = BanditArm.objects.get(arm_id="faq_compact")
+        with self.captureOnCommitCallbacks(execute=True):
+            update_stats(arm, _dummy_feature_vector(), 1.0)
+        after = get_arm_catalog()
+        self.assertIsNot(before, after)
+        self.assertIs(before.arms, after.arms)
+        self.assertEqual(after.n[after.index[arm.pk]], 6)
+
+
+class ShermanMorrisonInverseTests(TestCase):
+    """update_stats keeps LinearArmParam.A_inv equal to inv(A_matrix)."""
+
+    def setUp(self):
+        _seed_arms()
+        self.arm = BanditArm.objects.get(arm_id="hero_compact")
+
+    def test_incremental_inverse_matches_full_inversion(self):
+        # Function under test: update_stats() Sherman–Morrison path
+        import numpy as np
+
+        rng = np.random.default_rng(7)
+        for _ in range(25):
+            update_stats(self.arm, rng.random(FEATURE_DIM).tolist(), 1.0)
+
+        param = LinearArmParam.objects.get(arm=self.arm)
+        np.testing.assert_allclose(
+            np.array(param.A_inv), np.linalg.inv(np.array(param.A_matrix)), atol=1e-10,
+        )
+        # _seed_arms() stores no A_inv, so the first update inverts from scratch.
+        self.assertEqual(param.updates_since_inversion, 24)
+
+    def test_periodic_reinversion_resets_counter(self):
+        # Function under test: update_stats() drift control
+        LinearArmParam.objects.filter(arm=self.arm).update(updates_since_inversion=REINVERT_EVERY - 1)
+        update_stats(self.arm, _dummy_feature_vector(), 0.0)
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm).updates_since_inversion, 0)
+
+    def test_catalog_theta_matches_solve(self):
+        # Function under test: ArmCatalog.theta (cached A⁻¹ b)
+        update_stats(self.arm, _dummy_feature_vector(), 1.0)
+        catalog = get_arm_catalog()
+        i = catalog.index[self.arm.pk]
+        x = _dummy_feature_vector()
+        param = LinearArmParam.objects.get(arm=self.arm)
+        self.assertAlmostEqual(
+            float(catalog.theta[i] @ x), _predict(param.A_matrix, param.b_vector, x), places=10,
+        )
+
+
+class VectorizedScoringTests(TestCase):
+    """ArmCatalog scores every arm with one stacked theta matrix."""
+
+    def setUp(self):
+        _seed_arms()
+        update_stats(BanditArm.objects.get(arm_id="faq_compact"), _dummy_feature_vector(), 1.0)
+
+    def test_theta_is_contiguous_matrix(self):
+        # Function under test: ArmCatalog.theta
+        catalog = get_arm_catalog()
+        self.assertEqual(catalog.theta.shape, (len(catalog.arms), FEATURE_DIM))
+        self.assertTrue(catalog.theta.flags["C_CONTIGUOUS"])
+
+    def test_score_batch_matches_single_scores(self):
+        # Function under test: ArmCatalog.score_batch()
+        import numpy as np
+
+        catalog = get_arm_catalog()
+        X = np.random.default_rng(3).random((5, FEATURE_DIM))
+        batch = catalog.score_batch(X)
+        self.assertEqual(batch.shape, (5, len(catalog.arms)))
+        for row, x in zip(batch, X):
+            np.testing.assert_allclose(row, catalog.score(x))
+        i = catalog.index[BanditArm.objects.get(arm_id="faq_compact").pk]
+        param = LinearArmParam.objects.get(arm__arm_id="faq_compact")
+        self.assertAlmostEqual(batch[0, i], _predict(param.A_matrix, param.b_vector, X[0]), places=10)
+
+
+class Float64ArrayFieldTests(TestCase):
+    """LinearArmParam arrays are stored as binary float64 blobs."""
+
+    def test_encode_decode_round_trip_is_zero_copy(self):
+        # Function under test: encode_array() / decode_array()
+        import numpy as np
+
+        A = np.arange(FEATURE_DIM * FEATURE_DIM, dtype=float).reshape(FEATURE_DIM, FEATURE_DIM) / 7.0
+        blob = encode_array(A)
+        self.assertEqual(len(blob), 16 + A.nbytes)  # padded dimension header + raw data
+        decoded = decode_array(blob)
+        np.testing.assert_array_equal(decoded, A)
+        self.assertFalse(decoded.flags["OWNDATA"])
+
+    def test_decode_rejects_truncated_blob(self):
+        # Function under test: decode_array()
+        with self.assertRaises(ValueError):
+            decode_array(encode_array([1.0, 2.0, 3.0])[:-8])
+
+    def test_model_accepts_lists_and_returns_arrays(self):
+        # Function under test: Float64ArrayField on LinearArmParam
+        import numpy as np
+
+        arm = BanditArm.objects.create(arm_id="blob_arm")
+        LinearArmParam.objects.create(arm=arm, A_matrix=make_initial_A(), b_vector=make_initial_b())
+        update_stats(arm, _dummy_feature_vector(), 1.0)
+
+        param = LinearArmParam.objects.get(arm=arm)
+        self.assertIsInstance(param.A_matrix, np.ndarray)
+        self.assertEqual(param.A_matrix.shape, (FEATURE_DIM, FEATURE_DIM))
+        x = np.array(_dummy_feature_vector())
+        np.testing.assert_allclose(param.A_matrix, np.eye(FEATURE_DIM) + np.outer(x, x))
+        np.testing.assert_allclose(param.b_vector, x)
+
+
+class ConflictBitsetTests(TestCase):
+    """The catalog's compiled conflict bitsets agree with _has_conflict()."""
+
+    def setUp(self):
+        _seed_arms()
+
+    def test_bitsets_match_pairwise_rules(self):
+        # Function under test: ArmCatalog.conflict_masks
+        catalog = get_arm_catalog()
+        for i, arm_a in enumerate(catalog.arms):
+            for j, arm_b in enumerate(catalog.arms):
+                self.assertEqual(
+                    bool((catalog.conflict_masks[i] >> j) & 1),
+                    _has_conflict(arm_a, arm_b),
+                    f"{arm_a.arm_id} vs {arm_b.arm_id}",
+                )
+
+    def test_slate_mask_excludes_control(self):
+        # Function under test: ArmCatalog.slate_mask
+        catalog = get_arm_catalog()
+        control = catalog.index[catalog.by_arm_id["no_change"].pk]
+        self.assertFalse((catalog.slate_mask >> control) & 1)
+
+    def test_random_baseline_slate_is_conflict_free(self):
+        # Function under test: simulator.random_non_conflicting_slate()
+        import random
+
+        from landing.simulator import random_non_conflicting_slate
+
+        arms = list(BanditArm.objects.filter(is_active=True))
+        rng = random.Random(5)
+        for _ in range(20):
+            slate = random_non_conflicting_slate(arms, k=3, rng=rng)
+            self.assertNotIn("no_change", [a.arm_id for a in slate])
+            for i in range(len(slate)):
+                for j in range(i + 1, len(slate)):
+                    self.assertFalse(_has_conflict(slate[i], slate[j]))
+
+
+class ExactSlateSolverTests(TestCase):
+    """_exact_slate() finds the best conflict-free slate where greedy does not."""
+
+    @staticmethod
+    def _masks(n, conflicts):
+        masks = [1 << i for i in range(n)]
+        for i, j in conflicts:
+            masks[i] |= 1 << j
+            masks[j] |= 1 << i
+        return masks
+
+    def _brute_force(self, scores, masks, k):
+        import itertools
+
+        best = (0, 0.0)
+        for size in range(k, 0, -1):
+            for combo in itertools.combinations(range(len(scores)), size):
+                if any((masks[a] >> b) & 1 for a, b in itertools.combinations(combo, 2)):
+                    continue
+                best = max(best, (size, sum(scores[i] for i in combo)))
+            if best[0]:
+                break
+        return best
+
+    def test_beats_greedy_when_top_arm_blocks_a_better_pair(self):
+        # Function under test: _exact_slate()
+        # Arm 0 conflicts with both 1 and 2, which are compatible with each other.
+        import numpy as np
+
+        scores = np.array([1.0, 0.9, 0.9, 0.1])
+        masks = self._masks(4, [(0, 1), (0, 2)])
+        slate_mask = 0b1111
+        self.assertEqual(_greedy_slate(scores, masks, slate_mask, 2), [0, 3])
+        self.assertEqual(_exact_slate(scores, masks, slate_mask, 2), [1, 2])
+
+    def test_matches_brute_force_on_random_graphs(self):
+        # Function under test: _exact_slate()
+        import itertools
+        import random
+
+        import numpy as np
+
+        rng = random.Random(11)
+        for _ in range(60):
+            n = rng.randint(3, 12)
+            k = rng.randint(1, 4)
+            pairs = [p for p in itertools.combinations(range(n), 2) if rng.random() < 0.35]
+            masks = self._masks(n, pairs)
+            scores = np.array([rng.uniform(-1, 1) for _ in range(n)])
+            slate = _exact_slate(scores, masks, (1 << n) - 1, k, budget_ms=1000)
+            for a, b in itertools.combinations(slate, 2):
+                self.assertFalse((masks[a] >> b) & 1)
+            size, total = self._brute_force(scores, masks, k)
+            self.assertEqual(len(slate), size)
+            self.assertAlmostEqual(float(scores[slate].sum()), total)
+
+    def test_warmup_arms_are_always_included(self):
+        # Function under test: _exact_slate()
+        import numpy as np
+
+        scores = np.array([np.inf, 5.0, 4.0, 4.0])
+        masks = self._masks(4, [(0, 1), (1, 2)])
+        self.assertIn(0, _exact_slate(scores, masks, 0b1111, 2))
+
+    def test_zero_budget_falls_back_to_greedy(self):
+        # Function under test: _exact_slate()
+        import random
+
+        import numpy as np
+
+        rng = random.Random(3)
+        n = 600
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, min(n, i + 4))]
+        masks = self._masks(n, pairs)
+        scores = np.array([rng.random() for _ in range(n)])
+        greedy = _greedy_slate(scores, masks, (1 << n) - 1, 5)
+        slate = _exact_slate(scores, masks, (1 << n) - 1, 5, budget_ms=0)
+        self.assertEqual(len(slate), 5)
+        self.assertGreaterEqual(scores[slate].sum(), scores[greedy].sum() - 1e-12)
+
+    def test_budget_holds_on_a_pathological_graph(self):
+        # Function under test: _exact_slate()
+        # Four groups of mutually conflicting arms: no slate of K=5 exists, so
+        # the score bound never prunes and the search would enumerate every
+        # 4-arm combination, scanning mostly blocked candidates.
+        import statistics
+        import time
+
+        import numpy as np
+
+        n = 200
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n) if i % 4 == j % 4]
+        masks = self._masks(n, pairs)
+        scores = np.linspace(1.0, 2.0, n)
+        elapsed = []
+        for _ in range(20):
+            start = time.perf_counter()
+            slate = _exact_slate(scores, masks, (1 << n) - 1, 5, budget_ms=1.0)
+            elapsed.append((time.perf_counter() - start) * 1000)
+            self.assertEqual(sorted(i % 4 for i in slate), [0, 1, 2, 3])
+        self.assertLess(statistics.median(elapsed), 2.0)
+
+    def test_excluded_arms_are_never_chosen(self):
+        # Function under test: _exact_slate()
+        import numpy as np
+
+        scores = np.array([9.0, 1.0, 1.0])
+        masks = self._masks(3, [])
+        self.assertEqual(_exact_slate(scores, masks, 0b110, 3), [1, 2])
+
+
+class SlatePageConfigCacheTests(TestCase):
+    """slate_page_config() memoises merged configs per (arms version, slate)."""
+
+    def setUp(self):
+        from landing import bandit_utils
+
+        _seed_arms()
+        bandit_utils._merged_config_cache.clear()
+        self.arms = [
+            BanditArm.objects.get(arm_id="hero_compact"),
+            BanditArm.objects.get(arm_id="pricing_compact"),
+            BanditArm.objects.get(arm_id="testimonials_single"),
+        ]
+
+    def test_matches_merge_and_ignores_slate_order(self):
+        # Function under test: slate_page_config()
+        first = slate_page_config(self.arms)
+        second = slate_page_config(list(reversed(self.arms)))
+        self.assertIs(first, second)
+        self.assertEqual(first, merge_page_configs(self.arms))
+        self.assertEqual(json.loads(first.json), merge_page_configs(self.arms))
+
+    def test_arm_edit_invalidates_entry(self):
+        # Function under test: slate_page_config()
+        before = slate_page_config(self.arms)
+        hero = self.arms[0]
+        hero.page_config = {"compact": ["hero"], "hide": [], "promote": None, "variants": {}}
+        hero.save()
+        get_arm_catalog()
+        after = slate_page_config(self.arms)
+        self.assertIsNot(before, after)
+        self.assertEqual(after["compact"], ["hero", "pricing"])
+
+    def test_decision_stores_pre_encoded_config(self):
+        # Function under test: BanditDecision.merged_page_config with EncodedJSON
+        merged = slate_page_config(self.arms)
+        session = Session.objects.create(visitor=Visitor.objects.create(), visit_number=2)
+        BanditDecision.objects.create(
+            session=session,
+            visitor=session.visitor,
+            context_vector=[0.0] * FEATURE_DIM,
+            chosen_arm_ids=[a.arm_id for a in self.arms],
+            merged_page_config=merged,
+            explore=False,
+            epsilon=EPSILON,
+        )
+        stored = BanditDecision.objects.get(session=session).merged_page_config
+        self.assertEqual(stored, merge_page_configs(self.arms))
+
+    def test_encoder_writes_nested_cached_text(self):
+        # Function under test: PreEncodedJSONEncoder with EncodedJSON nested in a payload
+        from landing.fields import EncodedJSON, PreEncodedJSONEncoder
+
+        config = EncodedJSON({"hide": ["faq"], "note": 'a "quoted" value'})
+        config.json = '{"hide":["faq"],"note":"a \\"quoted\\" value"}'   # compact: proves it is not re-encoded
+        text = json.dumps({"status": "ok", "page_config": config, "slates": [config]}, cls=PreEncodedJSONEncoder)
+        self.assertEqual(text.count(config.json), 2)
+        data = json.loads(text)
+        self.assertEqual(data["page_config"], dict(config))
+        self.assertEqual(data["slates"], [dict(config)])
+
+    def test_accept_cookies_returns_cached_config(self):
+        # Function under test: accept_cookies() endpoint
+        visitor = Visitor.objects.create()
+        Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        data = self.client.post("/accept-cookies/", content_type="application/json").json()
+        decision = BanditDecision.objects.get()
+        arms = [BanditArm.objects.get(arm_id=a) for a in data["chosen_arms"]]
+        self.assertEqual(data["page_config"], merge_page_configs(arms))
+        self.assertEqual(decision.merged_page_config, data["page_config"])
+
+
+class ConcurrentUpdateStatsTests(TransactionTestCase):
+    """Parallel update_stats() calls must not lose updates, on one arm or many."""
+
+    WORKERS = 8
+    UPDATES_PER_WORKER = 25
+
+    def setUp(self):
+        _seed_arms()
+
+    def test_parallel_updates_sum_exactly(self):
+        # Function under test: update_stats() under concurrency
+        import random
+        import threading
+
+        import numpy as np
+        from django.db import connection
+
+        arm = BanditArm.objects.get(arm_id="hero_compact")
+        n_before = LinearArmParam.objects.get(arm=arm).n
+        rng = random.Random(8)
+        # Multiples of 1/4 keep every sum exact in float64, whatever the order
+        batches = [
+            [([rng.randint(0, 4) / 4 for _ in range(FEATURE_DIM)], float(rng.random() < 0.5))
+             for _ in range(self.UPDATES_PER_WORKER)]
+            for _ in range(self.WORKERS)
+        ]
+        start = threading.Barrier(self.WORKERS)
+        errors = []
+
+        def worker(batch):
+            try:
+                start.wait()
+                for x, reward in batch:
+                    update_stats(arm, x, reward)
+            except Exception as exc:  # surfaced below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(batch,)) for batch in batches]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+        expected_A = np.eye(FEATURE_DIM)
+        expected_b = np.zeros(FEATURE_DIM)
+        for batch in batches:
+            for x, reward in batch:
+                expected_A += np.outer(x, x)
+                expected_b += reward * np.array(x)
+
+        param = LinearArmParam.objects.get(arm=arm)
+        self.assertEqual(param.n, n_before + self.WORKERS * self.UPDATES_PER_WORKER)
+        np.testing.assert_array_equal(param.A_matrix, expected_A)
+        np.testing.assert_array_equal(param.b_vector, expected_b)
+
+    def test_parallel_updates_of_different_arms(self):
+        # Function under test: update_stats() on distinct arms + deferred version bump
+        import random
+        import threading
+
+        import numpy as np
+        from django.db import connection
+
+        from landing.bandit_utils import current_model_version
+
+        arms = list(BanditArm.objects.exclude(arm_id="no_change").order_by("pk")[:self.WORKERS])
+        n_before = {arm.pk: arm.linear_param.n for arm in arms}
+        _, params_before = current_model_version()
+        rng = random.Random(9)
+        batches = [
+            [([rng.randint(0, 4) / 4 for _ in range(FEATURE_DIM)], float(rng.random() < 0.5))
+             for _ in range(self.UPDATES_PER_WORKER)]
+            for _ in arms
+        ]
+        start = threading.Barrier(len(arms))
+        errors = []
+
+        def worker(arm, batch):
+            try:
+                start.wait()
+                for x, reward in batch:
+                    update_stats(arm, x, reward)
+            except Exception as exc:  # surfaced below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=pair) for pair in zip(arms, batches)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+        for arm, batch in zip(arms, batches):
+            expected_A = np.eye(FEATURE_DIM)
+            expected_b = np.zeros(FEATURE_DIM)
+            for x, reward in batch:
+                expected_A += np.outer(x, x)
+                expected_b += reward * np.array(x)
+            param = LinearArmParam.objects.get(arm=arm)
+            self.assertEqual(param.n, n_before[arm.pk] + self.UPDATES_PER_WORKER)
+            np.testing.assert_array_equal(param.A_matrix, expected_A)
+            np.testing.assert_array_equal(param.b_vector, expected_b)
+        # One bump per committed update, each after its own transaction
+        _, params_after = current_model_version()
+        self.assertEqual(params_after, params_before + len(arms) * self.UPDATES_PER_WORKER)
+
+
+@override_settings(BANDIT_REWARD_QUEUE=True)
+class RewardQueueTests(TestCase):
+    """With BANDIT_REWARD_QUEUE, end_session only enqueues; the worker rewards."""
+
+    def setUp(self):
+        _seed_arms()
+        self.arm = BanditArm.objects.get(arm_id="hero_compact")
+        self.sessions = []
+        for clicked in (True, False):
+            visitor, session = _make_visitor_session(visit_number=2)
+            BanditDecision.objects.create(
+                session=session,
+                visitor=visitor,
+                context_vector=_dummy_feature_vector(),
+                chosen_arm_ids=["hero_compact", "faq_compact"],
+                explore=False,
+                epsilon=0.1,
+            )
+            now = timezone.now()
+            Event.objects.create(session=session, event_type="section_view", section="hero", timestamp=now)
+            if clicked:
+                Event.objects.create(session=session, event_type="click", section="hero", is_cta=True, timestamp=now)
+            self.sessions.append(session)
+
+    def _end(self, session):
+        self.client.cookies["visitor_id"] = str(session.visitor.cookie_id)
+        return self.client.post(
+            "/end-session/",
+            data=json.dumps({"session_id": str(session.session_id)}),
+            content_type="application/json",
+        )
+
+    def test_end_session_only_enqueues(self):
+        # Function under test: end_session() endpoint (queue mode)
+        n_before = LinearArmParam.objects.get(arm=self.arm).n
+        for session in self.sessions:
+            self.assertEqual(self._end(session).status_code, 200)
+        self._end(self.sessions[0])  # repeated beacon → still one job
+
+        self.assertEqual(RewardJob.objects.count(), 2)
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm).n, n_before)
+        session = Session.objects.get(pk=self.sessions[0].pk)
+        self.assertFalse(session.is_active)
+        self.assertIsNotNone(session.ended_at)
+        self.assertFalse(session.cta_clicked)   # scoring deferred too
+
+    def test_worker_applies_rewards_in_one_write_per_arm(self):
+        # Function under test: drain_reward_queue()
+        import numpy as np
+
+        from landing.reward_queue import drain_reward_queue, reward_queue_depth
+
+        for session in self.sessions:
+            self._end(session)
+        param = LinearArmParam.objects.get(arm=self.arm)
+        self.assertEqual(reward_queue_depth(), 2)
+
+        self.assertEqual(drain_reward_queue(), (2, 0))
+        self.assertEqual(reward_queue_depth(), 0)
+
+        x = np.array(_dummy_feature_vector())
+        updated = LinearArmParam.objects.get(arm=self.arm)
+        self.assertEqual(updated.n, param.n + 2)
+        np.testing.assert_allclose(updated.A_matrix, np.asarray(param.A_matrix) + 2 * np.outer(x, x))
+        np.testing.assert_allclose(updated.b_vector, np.asarray(param.b_vector) + 0.5 * x)
+        np.testing.assert_allclose(updated.A_inv, np.linalg.inv(updated.A_matrix))
+
+        first = BanditDecision.objects.get(session=self.sessions[0])
+        self.assertEqual(first.reward, 0.5)
+        self.assertEqual(first.updated_arm_ids, ["hero_compact"])   # faq never observed
+        self.assertTrue(Session.objects.get(pk=self.sessions[0].pk).cta_clicked)
+
+    def test_failing_arm_only_fails_the_jobs_that_fed_it(self):
+        # Function under test: drain_reward_queue() → _apply_plans()
+        from unittest import mock
+
+        from landing import reward_queue
+
+        visitor, poison = _make_visitor_session(visit_number=2)
+        BanditDecision.objects.create(
+            session=poison, visitor=visitor, context_vector=_dummy_feature_vector(),
+            chosen_arm_ids=["hero_compact", "faq_compact"], explore=False, epsilon=0.1,
+        )
+        now = timezone.now()
+        for section in ("hero", "faq"):
+            Event.objects.create(session=poison, event_type="section_view", section=section, timestamp=now)
+        for session in [*self.sessions, poison]:
+            self._end(session)
+        n_before = LinearArmParam.objects.get(arm=self.arm).n
+        real_update = reward_queue.update_stats_batch
+
+        def update_stats_batch(arm, xs, rs):
+            if arm.arm_id == "faq_compact":
+                raise RuntimeError("bad faq row")
+            real_update(arm, xs, rs)
+
+        with mock.patch.object(reward_queue, "update_stats_batch", side_effect=update_stats_batch):
+            self.assertEqual(reward_queue.drain_reward_queue(), (2, 1))
+
+        # The poison job fed hero too, but none of its reward was applied
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm).n, n_before + 2)
+        job = RewardJob.objects.get()
+        self.assertEqual(job.session_id, poison.pk)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("bad faq row", job.last_error)
+        self.assertIsNone(BanditDecision.objects.get(session=poison).reward)
+        self.assertEqual(BanditDecision.objects.get(session=self.sessions[0]).reward, 0.5)
+
+    def test_already_rewarded_session_is_not_applied_twice(self):
+        # Function under test: drain_reward_queue() idempotency
+        from landing.reward_queue import drain_reward_queue
+
+        self._end(self.sessions[0])
+        drain_reward_queue()
+        n_after = LinearArmParam.objects.get(arm=self.arm).n
+        self._end(self.sessions[0])
+        self.assertEqual(drain_reward_queue(), (1, 0))
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm).n, n_after)
+
+    def test_command_drains_queue(self):
+        # Function under test: process_reward_queue management command
+        import io
+
+        for session in self.sessions:
+            self._end(session)
+        out = io.StringIO()
+        call_command("process_reward_queue", stdout=out)
+        self.assertIn("processed=2", out.getvalue())
+        self.assertEqual(RewardJob.objects.count(), 0)
+
+
+class UpdateStatsBatchTests(TestCase):
+    """update_stats_batch() matches one update_stats() call per row."""
+
+    def setUp(self):
+        _seed_arms()
+        self.arm_a = BanditArm.objects.get(arm_id="hero_compact")
+        self.arm_b = BanditArm.objects.get(arm_id="faq_compact")
+
+    def _assert_same_params(self, m):
+        import random
+
+        import numpy as np
+
+        rng = random.Random(m)
+        X = [[rng.random() for _ in range(FEATURE_DIM)] for _ in range(m)]
+        r = [rng.choice([0.0, 0.5, 1.0]) for _ in range(m)]
+        for x, reward in zip(X, r):
+            update_stats(self.arm_a, x, reward)
+        update_stats_batch(self.arm_b, X, r)
+
+        a = LinearArmParam.objects.get(arm=self.arm_a)
+        b = LinearArmParam.objects.get(arm=self.arm_b)
+        self.assertEqual(a.n, b.n)
+        np.testing.assert_allclose(b.A_matrix, a.A_matrix, rtol=1e-12)
+        np.testing.assert_allclose(b.b_vector, a.b_vector, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(b.A_inv, np.linalg.inv(b.A_matrix), rtol=1e-9, atol=1e-12)
+
+    def test_small_batch_uses_woodbury(self):
+        # Function under test: update_stats_batch() with m < d
+        update_stats_batch(self.arm_b, [[0.0] * FEATURE_DIM], [0.0])   # stores A_inv
+        update_stats(self.arm_a, [0.0] * FEATURE_DIM, 0.0)
+        self._assert_same_params(3)
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm_b).updates_since_inversion, 3)
+
+    def test_large_batch_reinverts(self):
+        # Function under test: update_stats_batch() with m >= d
+        self._assert_same_params(40)
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm_b).updates_since_inversion, 0)
+
+    def test_length_mismatch_raises(self):
+        # Function under test: update_stats_batch()
+        with self.assertRaises(ValueError):
+            update_stats_batch(self.arm_a, [[0.0] * FEATURE_DIM] * 2, [1.0])
+
+    def test_empty_batch_is_a_no_op(self):
+        # Function under test: update_stats_batch()
+        n_before = LinearArmParam.objects.get(arm=self.arm_a).n
+        update_stats_batch(self.arm_a, [], [])
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm_a).n, n_before)
+
+
+class ThompsonSamplingTests(TestCase):
+    """Thompson-sampling policy and the cached Cholesky factors behind it."""
+
+    def setUp(self):
+        _seed_arms()
+
+    def test_cholesky_rank_one_update(self):
+        # Function under test: _cholesky_update()
+        import numpy as np
+
+        from landing.bandit_utils import _cholesky_update
+
+        rng = np.random.default_rng(0)
+        A = np.eye(FEATURE_DIM)
+        L = np.linalg.cholesky(A)
+        for _ in range(50):
+            x = rng.random(FEATURE_DIM)
+            A += np.outer(x, x)
+            L = _cholesky_update(L, x)
+        np.testing.assert_allclose(L, np.linalg.cholesky(A), rtol=1e-9, atol=1e-12)
+
+    def test_update_stats_keeps_factor_in_step(self):
+        # Function under test: update_stats() / update_stats_batch() → A_chol
+        import numpy as np
+
+        arm = BanditArm.objects.get(arm_id="hero_compact")
+        update_stats(arm, _dummy_feature_vector(), 1.0)   # first update factorises
+        update_stats(arm, [0.5] * FEATURE_DIM, 0.0)
+        update_stats_batch(arm, [[0.25] * FEATURE_DIM, _dummy_feature_vector()], [1.0, 0.0])
+        param = LinearArmParam.objects.get(arm=arm)
+        self.assertGreater(param.updates_since_inversion, 0)
+        np.testing.assert_allclose(param.A_chol, np.linalg.cholesky(param.A_matrix), atol=1e-12)
+
+    def test_samples_follow_posterior_covariance(self):
+        # Function under test: ArmCatalog.sample_scores()
+        import numpy as np
+
+        from landing.bandit_utils import THOMPSON_SIGMA
+
+        arm = BanditArm.objects.get(arm_id="hero_compact")
+        for i in range(20):
+            update_stats(arm, [i % 2, 0.5, 0.3, 0.2, 0.1, 0.0, 0.2, 1.0], float(i % 3 == 0))
+        catalog = get_arm_catalog()
+        i = catalog.index[arm.pk]
+        x = np.array(_dummy_feature_vector())
+        rng = np.random.default_rng(1)
+        draws = np.array([catalog.sample_scores(x, rng)[i] for _ in range(4000)])
+        expected_var = THOMPSON_SIGMA ** 2 * x @ catalog.A_inv[i] @ x
+        self.assertAlmostEqual(draws.mean(), catalog.score(x)[i], delta=4 * np.sqrt(expected_var / 4000))
+        self.assertAlmostEqual(draws.var() / expected_var, 1.0, delta=0.1)
+
+    def test_thompson_slate_is_valid(self):
+        # Function under test: decide_slate(policy="thompson")
+        fv = _dummy_feature_vector()
+        for _ in range(20):
+            decision = decide_slate(fv, k=3, policy="thompson")
+            self.assertEqual(decision.policy, "thompson")
+            self.assertEqual(decision.epsilon, 0.0)
+            ids = [a.arm_id for a in decision.arms]
+            self.assertEqual(len(ids), 3)
+            self.assertNotIn("no_change", ids)
+            for a in range(len(decision.arms)):
+                for b in range(a + 1, len(decision.arms)):
+                    self.assertFalse(_has_conflict(decision.arms[a], decision.arms[b]))
+
+    def test_unknown_policy_raises(self):
+        # Function under test: decide_slate()
+        with self.assertRaises(ValueError):
+            decide_slate(_dummy_feature_vector(), policy="softmax")
+
+    @override_settings(BANDIT_POLICY="thompson")
+    def test_decision_records_policy(self):
+        # Function under test: accept_cookies() endpoint
+        visitor, _ = _make_visitor_session(visit_number=1)
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        self.client.post("/accept-cookies/", content_type="application/json")
+        decision = BanditDecision.objects.get()
+        self.assertEqual(decision.policy, "thompson")
+        self.assertEqual(decision.epsilon, 0.0)
+
+
+class LinUCBTests(TestCase):
+    """LinUCB scoring: vectorised confidence widths and slate selection."""
+
+    def setUp(self):
+        _seed_arms()
+        arm = BanditArm.objects.get(arm_id="hero_compact")
+        for i in range(10):
+            update_stats(arm, [i % 2, 0.5, 0.3, 0.2, 0.1, 0.0, 0.2, 1.0], float(i % 2))
+
+    def test_widths_match_per_arm_loop(self):
+        # Function under test: ArmCatalog.confidence_widths() / ucb_scores()
+        import numpy as np
+
+        from landing.bandit_utils import LINUCB_ALPHA
+
+        catalog = get_arm_catalog()
+        x = np.array(_dummy_feature_vector())
+        expected = np.array([
+            np.sqrt(x @ np.linalg.inv(np.asarray(p.A_matrix)) @ x) for p in catalog.params
+        ])
+        np.testing.assert_allclose(catalog.confidence_widths(x), expected, rtol=1e-9)
+        np.testing.assert_allclose(
+            catalog.ucb_scores(x), catalog.score(x) + LINUCB_ALPHA * expected, rtol=1e-9
+        )
+
+    def test_more_data_means_narrower_width(self):
+        # Function under test: ArmCatalog.confidence_widths()
+        catalog = get_arm_catalog()
+        x = _dummy_feature_vector()
+        widths = catalog.confidence_widths(x)
+        trained = catalog.index[catalog.by_arm_id["hero_compact"].pk]
+        fresh = catalog.index[catalog.by_arm_id["faq_compact"].pk]
+        self.assertLess(widths[trained], widths[fresh])
+
+    def test_linucb_slate_is_deterministic_and_valid(self):
+        # Function under test: decide_slate(policy="linucb")
+        fv = _dummy_feature_vector()
+        first = decide_slate(fv, k=3, policy="linucb")
+        self.assertEqual(first.policy, "linucb")
+        self.assertEqual(first.epsilon, 0.0)
+        self.assertEqual(len(first.arms), 3)
+        self.assertNotIn("no_change", [a.arm_id for a in first.arms])
+        for _ in range(5):
+            again = decide_slate(fv, k=3, policy="linucb")
+            self.assertEqual([a.arm_id for a in again.arms], [a.arm_id for a in first.arms])
+
+
+class ModelSnapshotTests(TestCase):
+    """Workers read the published memory-mapped snapshot instead of the DB."""
+
+    def setUp(self):
+        import tempfile
+
+        from landing import bandit_utils
+
+        _seed_arms()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = f"{self.tmp.name}/bandit_model.snap"
+        bandit_utils.reset_arm_catalogs()
+        self.addCleanup(bandit_utils.reset_arm_catalogs)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_snapshot_round_trip(self):
+        # Function under test: write_snapshot() / read_snapshot()
+        import numpy as np
+
+        from landing.model_snapshot import read_snapshot, write_snapshot
+
+        A = np.arange(2 * 3 * 3, dtype=float).reshape(2, 3, 3)
+        n = np.array([4, 7])
+        write_snapshot(self.path, (3, 9), [{"arm_id": "a"}, {"arm_id": "b"}], {"A": A, "n": n})
+        snap = read_snapshot(self.path)
+        self.assertEqual(snap.version, (3, 9))
+        self.assertEqual([a["arm_id"] for a in snap.arms], ["a", "b"])
+        np.testing.assert_array_equal(snap.arrays["A"], A)
+        np.testing.assert_array_equal(snap.arrays["n"], n)
+        self.assertFalse(snap.arrays["A"].flags.writeable)
+
+    def test_published_snapshot_serves_decisions_without_queries(self):
+        # Function under test: get_arm_catalog() with BANDIT_MODEL_SNAPSHOT
+        import numpy as np
+
+        from landing.bandit_utils import ArmCatalog, current_model_version, publish_model_snapshot
+
+        with override_settings(BANDIT_MODEL_SNAPSHOT=self.path):
+            publish_model_snapshot()
+            with self.assertNumQueries(0):
+                catalog = get_arm_catalog()
+                slate = decide_slate(_dummy_feature_vector(), k=3, epsilon=0.0)
+        self.assertEqual(len(slate.arms), 3)
+        self.assertFalse(catalog.theta.flags.writeable)
+
+        db_catalog = ArmCatalog.load(current_model_version())
+        self.assertEqual([a.arm_id for a in catalog.arms], [a.arm_id for a in db_catalog.arms])
+        self.assertEqual(catalog.conflict_masks, db_catalog.conflict_masks)
+        np.testing.assert_allclose(catalog.theta, db_catalog.theta)
+        np.testing.assert_allclose(catalog.chol_inv_T, db_catalog.chol_inv_T)
+
+    def test_republish_swaps_catalog(self):
+        # Function under test: get_arm_catalog() after publish_model_snapshot()
+        from landing.bandit_utils import publish_model_snapshot
+
+        with override_settings(BANDIT_MODEL_SNAPSHOT=self.path):
+            publish_model_snapshot()
+            before = get_arm_catalog()
+            arm = BanditArm.objects.get(arm_id="faq_compact")
+            with self.captureOnCommitCallbacks(execute=True):
+                update_stats(arm, _dummy_feature_vector(), 1.0)
+            self.assertIs(get_arm_catalog(), before)   # not republished yet
+
+            publish_model_snapshot()
+            after = get_arm_catalog()
+        self.assertIsNot(after, before)
+        self.assertIs(after.arms, before.arms)
+        i = after.index[arm.pk]
+        self.assertEqual(after.n[i], before.n[i] + 1)
+        self.assertNotEqual(after.theta[i].tolist(), before.theta[i].tolist())
+
+    def test_stale_snapshot_falls_back_to_db(self):
+        # Function under test: get_arm_catalog() with a snapshot older than BANDIT_SNAPSHOT_MAX_AGE
+        import os
+        import time
+
+        from landing.bandit_utils import publish_model_snapshot
+
+        with override_settings(BANDIT_MODEL_SNAPSHOT=self.path, BANDIT_SNAPSHOT_MAX_AGE=60):
+            publish_model_snapshot()
+            arm = BanditArm.objects.get(arm_id="faq_compact")
+            with self.captureOnCommitCallbacks(execute=True):
+                update_stats(arm, _dummy_feature_vector(), 1.0)
+            frozen = get_arm_catalog()   # fresh snapshot: the update is not published yet
+            i = frozen.index[arm.pk]
+
+            long_ago = time.time() - 120   # the publisher stopped two minutes ago
+            os.utime(self.path, (long_ago, long_ago))
+            with self.assertLogs("landing.bandit_utils", "WARNING"):
+                live = get_arm_catalog()
+            self.assertEqual(live.n[live.index[arm.pk]], frozen.n[i] + 1)
+
+            with override_settings(BANDIT_SNAPSHOT_MAX_AGE=None):
+                self.assertEqual(get_arm_catalog().version, frozen.version)
+
+    def test_missing_snapshot_falls_back_to_db(self):
+        # Function under test: get_arm_catalog() with no published snapshot
+        with override_settings(BANDIT_MODEL_SNAPSHOT=self.path):
+            catalog = get_arm_catalog()
+        self.assertIsNotNone(catalog.params)
+        self.assertIn("hero_compact", catalog.by_arm_id)
+
+
+class DeltaLearnerTests(TestCase):
+    """In-memory ΔA/Δb accumulation merges into the same parameters as update_stats."""
+
+    def setUp(self):
+        _seed_arms()
+        self.arm_a = BanditArm.objects.get(arm_id="hero_compact")
+        self.arm_b = BanditArm.objects.get(arm_id="faq_compact")
+
+    def _observations(self, m):
+        import random
+
+        rng = random.Random(m)
+        return [
+            ([rng.random() for _ in range(FEATURE_DIM)], rng.choice([0.0, 0.5, 1.0]))
+            for _ in range(m)
+        ]
+
+    def test_flush_matches_sequential_updates(self):
+        # Function under test: DeltaAccumulator.add() / flush() → apply_stats_delta()
+        import numpy as np
+
+        from landing.delta_learner import DeltaAccumulator
+
+        acc = DeltaAccumulator(flush_seconds=0, flush_observations=1000)
+        for x, reward in self._observations(12):
+            update_stats(self.arm_a, x, reward)
+            acc.add(self.arm_b, x, reward)
+        self.assertEqual(acc.pending(), 12)
+        self.assertEqual(acc.flush(), 1)
+        self.assertEqual(acc.pending(), 0)
+
+        a = LinearArmParam.objects.get(arm=self.arm_a)
+        b = LinearArmParam.objects.get(arm=self.arm_b)
+        self.assertEqual(a.n, b.n)
+        np.testing.assert_allclose(b.A_matrix, a.A_matrix, rtol=1e-12)
+        np.testing.assert_allclose(b.b_vector, a.b_vector, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(b.A_inv, np.linalg.inv(b.A_matrix), rtol=1e-9, atol=1e-12)
+
+    def test_flushes_after_observation_threshold(self):
+        # Function under test: DeltaAccumulator.add()
+        from landing.delta_learner import DeltaAccumulator
+
+        acc = DeltaAccumulator(flush_seconds=0, flush_observations=3)
+        n_before = LinearArmParam.objects.get(arm=self.arm_a).n
+        for x, reward in self._observations(2):
+            acc.add(self.arm_a, x, reward)
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm_a).n, n_before)
+
+        acc.add(self.arm_a, _dummy_feature_vector(), 1.0)
+        self.assertEqual(acc.pending(), 0)
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm_a).n, n_before + 3)
+
+    def test_failed_flush_keeps_deltas(self):
+        # Function under test: DeltaAccumulator.flush()
+        from unittest import mock
+
+        from landing.delta_learner import DeltaAccumulator
+
+        acc = DeltaAccumulator(flush_seconds=0, flush_observations=1000)
+        acc.add(self.arm_a, _dummy_feature_vector(), 1.0)
+        acc.add(self.arm_b, _dummy_feature_vector(), 0.0)
+        n_before = LinearArmParam.objects.get(arm=self.arm_a).n
+        with mock.patch("landing.delta_learner.apply_stats_delta", side_effect=RuntimeError("db down")):
+            self.assertEqual(acc.flush(), 0)
+        self.assertEqual(acc.pending(), 2)
+
+        acc.add(self.arm_a, _dummy_feature_vector(), 1.0)
+        self.assertEqual(acc.flush(), 2)
+        self.assertEqual(LinearArmParam.objects.get(arm=self.arm_a).n, n_before + 2)
+
+    @override_settings(BANDIT_DELTA_LEARNER=True)
+    def test_learn_buffers_when_enabled(self):
+        # Function under test: learn()
+        from unittest import mock
+
+        from landing import delta_learner
+
+        acc = delta_learner.DeltaAccumulator(flush_seconds=0)
+        with mock.patch.object(delta_learner, "_accumulator", acc):
+            n_before = LinearArmParam.objects.get(arm=self.arm_a).n
+            delta_learner.learn(self.arm_a, _dummy_feature_vector(), 1.0)
+            self.assertEqual(acc.pending(), 1)
+            self.assertEqual(LinearArmParam.objects.get(arm=self.arm_a).n, n_before)
+
+
+class RebuildBanditParamsTests(TestCase):
+    """rebuild_bandit_params replays decision history into the same parameters as update_stats."""
+
+    def setUp(self):
+        import random
+
+        _seed_arms()
+        rng = random.Random(7)
+        self.history = []
+        arm_ids = ["hero_compact", "faq_compact", "pricing_compact"]
+        for i in range(30):
+            _, session = _make_visitor_session()
+            fv = [rng.random() for _ in range(FEATURE_DIM)]
+            updated = rng.sample(arm_ids, rng.randint(1, 2))
+            reward = rng.choice([0.0, 0.5, 1.0])
+            BanditDecision.objects.create(
+                session=session,
+                visitor=session.visitor,
+                context_vector=fv,
+                chosen_arm_ids=updated,
+                updated_arm_ids=updated,
+                merged_page_config={},
+                explore=False,
+                epsilon=0.1,
+                reward=reward,
+            )
+            self.history.append((fv, updated, reward))
+        # Unrewarded and wrong-length decisions are ignored
+        _, session = _make_visitor_session()
+        BanditDecision.objects.create(
+            session=session, visitor=session.visitor, context_vector=[1.0] * FEATURE_DIM,
+            updated_arm_ids=["hero_compact"], merged_page_config={}, explore=False, epsilon=0.1,
+        )
+        _, session = _make_visitor_session()
+        BanditDecision.objects.create(
+            session=session, visitor=session.visitor, context_vector=[1.0] * 3,
+            updated_arm_ids=["hero_compact"], merged_page_config={}, explore=False, epsilon=0.1,
+            reward=1.0,
+        )
+
+    def test_rebuild_matches_replayed_updates(self):
+        # Function under test: rebuild_bandit_params command
+        import io
+
+        import numpy as np
+
+        # Expected: fresh parameters + one update_stats per (decision, arm)
+        LinearArmParam.objects.all().delete()
+        for fv, updated, reward in self.history:
+            for arm_id in updated:
+                update_stats(BanditArm.objects.get(arm_id=arm_id), fv, reward)
+        expected = {
+            p.arm.arm_id: p for p in LinearArmParam.objects.select_related("arm")
+        }
+        LinearArmParam.objects.all().delete()
+
+        out = io.StringIO()
+        call_command("rebuild_bandit_params", "--chunk-size", "7", stdout=out)
+        self.assertIn("Replayed 30 decisions", out.getvalue())
+        self.assertIn("1 wrong length", out.getvalue())
+
+        rebuilt = {p.arm.arm_id: p for p in LinearArmParam.objects.select_related("arm")}
+        self.assertEqual(len(rebuilt), BanditArm.objects.count())
+        for arm_id, exp in expected.items():
+            got = rebuilt[arm_id]
+            self.assertEqual(got.n, exp.n)
+            np.testing.assert_allclose(got.A_matrix, exp.A_matrix, rtol=1e-12)
+            np.testing.assert_allclose(got.b_vector, exp.b_vector, rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(got.A_inv, np.linalg.inv(got.A_matrix), rtol=1e-9, atol=1e-12)
+        self.assertEqual(rebuilt["no_change"].n, 0)
+        np.testing.assert_array_equal(rebuilt["no_change"].A_matrix, make_initial_A())
+
+    def test_dry_run_writes_nothing(self):
+        # Function under test: rebuild_bandit_params --dry-run
+        import io
+
+        before = dict(LinearArmParam.objects.values_list("arm__arm_id", "n"))
+        call_command("rebuild_bandit_params", "--dry-run", stdout=io.StringIO())
+        self.assertEqual(dict(LinearArmParam.objects.values_list("arm__arm_id", "n")), before)
+
+
+class OffPolicyEvaluationTests(TestCase):
+    """Logged propensities and the vectorised IPS / SNIPS / DR evaluator."""
+
+    def setUp(self):
+        import random
+
+        _seed_arms()
+        rng = random.Random(3)
+        for arm in BanditArm.objects.exclude(arm_id="no_change"):
+            for _ in range(4):
+                x = [rng.random() for _ in range(FEATURE_DIM)]
+                update_stats(arm, x, rng.choice([0.0, 1.0]))
+
+    def _all_outcomes(self, catalog, exploit_idx):
+        """Every slate ε-greedy can return from *exploit_idx* (as frozensets)."""
+        from landing.bandit_utils import _bit_indices
+
+        outcomes = {frozenset(exploit_idx)}
+        for slot in range(len(exploit_idx)):
+            rest = exploit_idx[:slot] + exploit_idx[slot + 1:]
+            for c in _bit_indices(catalog.slate_mask & ~catalog.blocked_by(rest)):
+                outcomes.add(frozenset(rest + [c]))
+        return outcomes
+
+    def test_epsilon_greedy_propensities_sum_to_one(self):
+        # Function under test: _epsilon_greedy_propensity()
+        from landing.bandit_utils import _best_slate, _epsilon_greedy_propensity
+
+        catalog = get_arm_catalog()
+        exploit_idx = _best_slate(catalog, catalog.score(_dummy_feature_vector()), 3)
+        total = sum(
+            _epsilon_greedy_propensity(catalog, exploit_idx, sorted(s), 0.3)
+            for s in self._all_outcomes(catalog, exploit_idx)
+        )
+        self.assertAlmostEqual(total, 1.0)
+
+    def test_decisions_carry_propensity(self):
+        # Function under test: decide_slate() propensity per policy
+        fv = _dummy_feature_vector()
+        self.assertAlmostEqual(decide_slate(fv, epsilon=0.0, policy="epsilon_greedy").propensity, 1.0)
+        self.assertGreater(decide_slate(fv, epsilon=1.0, policy="epsilon_greedy").propensity, 0.0)
+        self.assertEqual(decide_slate(fv, policy="linucb").propensity, 1.0)
+        self.assertIsNone(decide_slate(fv, policy="thompson").propensity)
+
+    def test_vectorised_policy_matches_scalar_propensity(self):
+        # Function under test: off_policy._policy_terms()
+        import random
+
+        import numpy as np
+
+        from landing.bandit_utils import _epsilon_greedy_propensity, _greedy_slate
+        from landing.off_policy import _policy_terms, load_logged_decisions
+
+        catalog = get_arm_catalog()
+        data = load_logged_decisions(catalog=catalog)   # empty log, but conflicts/allowed filled
+        rng = random.Random(11)
+        X = np.array([[rng.random() for _ in range(FEATURE_DIM)] for _ in range(40)])
+        slates = np.zeros((len(X), len(catalog.arms)), dtype=bool)
+        expected = []
+        for i, x in enumerate(X):
+            exploit_idx = _greedy_slate(catalog.score(x), catalog.conflict_masks, catalog.slate_mask, 3)
+            outcome = sorted(rng.choice(sorted(self._all_outcomes(catalog, exploit_idx), key=sorted)))
+            slates[i, outcome] = True
+            expected.append(_epsilon_greedy_propensity(catalog, exploit_idx, outcome, 0.25))
+
+        prob, _ = _policy_terms(
+            X @ catalog.theta.T, slates, data.conflicts, data.allowed, 3, 0.25,
+            np.zeros_like(slates, dtype=float),
+        )
+        np.testing.assert_allclose(prob, expected, rtol=1e-12)
+
+    def test_logging_policy_evaluates_to_its_own_reward(self):
+        # Function under test: evaluate_policies() on the policy that logged the data
+        import random
+
+        import numpy as np
+
+        from landing.off_policy import CandidatePolicy, evaluate_policies, load_logged_decisions
+
+        rng = random.Random(5)
+        for _ in range(60):
+            _, session = _make_visitor_session()
+            fv = [rng.random() for _ in range(FEATURE_DIM)]
+            slate = decide_slate(fv, k=3, epsilon=0.2, policy="epsilon_greedy")
+            BanditDecision.objects.create(
+                session=session, visitor=session.visitor, context_vector=fv,
+                chosen_arm_ids=[a.arm_id for a in slate.arms], merged_page_config={},
+                explore=slate.explored, epsilon=0.2, propensity=slate.propensity,
+                reward=rng.choice([0.0, 0.5, 1.0]),
+            )
+
+        data = load_logged_decisions()
+        self.assertEqual(len(data.rewards), 60)
+        logged, other_k = evaluate_policies(
+            data,
+            [CandidatePolicy("logged", epsilon=0.2, k=3), CandidatePolicy("k2", epsilon=0.2, k=2)],
+            chunk_size=16,
+        )
+        mean = data.rewards.mean()
+        self.assertAlmostEqual(logged["ips"], mean)
+        self.assertAlmostEqual(logged["snips"], mean)
+        self.assertAlmostEqual(logged["support"], 1.0)
+        self.assertEqual(other_k["support"], 0.0)
+        self.assertEqual(other_k["ips"], 0.0)
+
+        # With a zero reward model the DR correction term is exactly IPS
+        (dr_only,) = evaluate_policies(
+            data, [CandidatePolicy("logged", epsilon=0.2, k=3)],
+            reward_model=np.zeros((len(data.arm_ids), FEATURE_DIM)),
+        )
+        self.assertAlmostEqual(dr_only["dr"], dr_only["ips"])
+
+
+    def test_candidates_reproduce_the_exact_slate_search(self):
+        # Function under test: evaluate_policies() slate solver (CandidatePolicy.solver)
+        import random
+
+        import numpy as np
+
+        from landing.bandit_utils import _exact_slate
+        from landing.off_policy import CandidatePolicy, evaluate_policies, load_logged_decisions
+
+        # hide_pricing blocks pricing_compact, highlight_plan_2 and promote_pricing,
+        # which fit together: greedy takes the top arm, the exact search the trio.
+        arm = BanditArm.objects.create(
+            arm_id="hide_pricing", name="hide_pricing", affected_sections=["pricing"],
+            page_config={"compact": [], "hide": ["pricing"], "promote": None, "variants": {}},
+        )
+        LinearArmParam.objects.create(arm=arm, A_matrix=make_initial_A(), b_vector=make_initial_b(), n=5)
+        catalog = get_arm_catalog()
+        theta = np.zeros((len(catalog.arms), FEATURE_DIM))
+        for arm_id, score in [("hide_pricing", 1.0), ("pricing_compact", 0.9),
+                              ("highlight_plan_2", 0.9), ("promote_pricing", 0.8)]:
+            theta[catalog.index[catalog.by_arm_id[arm_id].pk], -1] = score
+        fv = _dummy_feature_vector()
+        exact = _exact_slate(np.asarray(fv) @ theta.T, catalog.conflict_masks, catalog.slate_mask, 3)
+        rng = random.Random(2)
+        for _ in range(10):
+            _, session = _make_visitor_session()
+            BanditDecision.objects.create(
+                session=session, visitor=session.visitor, context_vector=fv,
+                chosen_arm_ids=[catalog.arms[i].arm_id for i in exact], merged_page_config={},
+                explore=False, epsilon=0.0, propensity=1.0, reward=rng.choice([0.0, 1.0]),
+            )
+
+        data = load_logged_decisions()
+        live, greedy = evaluate_policies(data, [
+            CandidatePolicy("live", epsilon=0.0, k=3, theta=theta),
+            CandidatePolicy("greedy", epsilon=0.0, k=3, theta=theta, solver="greedy"),
+        ])
+        self.assertEqual(live["support"], 1.0)
+        self.assertAlmostEqual(live["ips"], data.rewards.mean())
+        self.assertEqual(greedy["support"], 0.0)
+
+
+class VisitorFeaturesTests(TestCase):
+    """build_context reads the denormalised VisitorFeatures row instead of the session history."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_build_context_with_features_needs_no_queries(self):
+        # Function under test: build_context(features=...)
+        from landing.visitor_features import load_visitor_features
+
+        visitor = Visitor.objects.create()
+        features = load_visitor_features(visitor)
+        features.price_intent_score = 0.7
+        request = self.factory.get("/", HTTP_USER_AGENT="Mozilla/5.0")
+        with self.assertNumQueries(0):
+            context, fv = build_context(visitor, request, features=features)
+        self.assertEqual(fv[1], 0.7)
+        with self.assertNumQueries(1):
+            build_context(visitor, request)
+
+    def test_accept_cookies_counts_visits_on_the_row(self):
+        # Function under test: accept_cookies() → record_visit()
+        _seed_arms()
+        visitor = Visitor.objects.create()
+        Session.objects.create(visitor=visitor, visit_number=1, is_active=False)   # before the row existed
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        first = self.client.post("/accept-cookies/", content_type="application/json").json()
+        second = self.client.post("/accept-cookies/", content_type="application/json").json()
+        self.assertEqual(first["visit_number"], 2)
+        self.assertEqual(second["visit_number"], 3)
+        features = VisitorFeatures.objects.get(pk=visitor.pk)
+        self.assertEqual(features.session_count, 3)
+        self.assertIsNotNone(features.last_seen)
+
+    def test_landing_page_and_accept_cookies_share_the_count(self):
+        # Function under test: landing_page() / accept_cookies() → record_visit()
+        from unittest import mock
+
+        from landing.models import LandingPage
+
+        _seed_arms()
+        LandingPage.objects.create(name="Home")
+        visitor = Visitor.objects.create()
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        with mock.patch("landing.views.generate_recommendations", return_value={}):
+            self.client.post("/accept-cookies/", content_type="application/json")
+            self.client.get("/")
+            self.client.post("/accept-cookies/", content_type="application/json")
+            self.client.get("/")
+        self.assertEqual(VisitorFeatures.objects.get(pk=visitor.pk).session_count, visitor.sessions.count())
+        self.assertEqual(
+            list(visitor.sessions.order_by("visit_number").values_list("visit_number", flat=True)),
+            [1, 2, 3, 4],
+        )
+
+    def test_racing_first_visits_get_distinct_numbers(self):
+        # Function under test: record_visit() when another request backfills the row first
+        from unittest import mock
+
+        from landing import visitor_features
+
+        visitor = Visitor.objects.create()
+        Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+        real_backfill = visitor_features._backfill
+        racer = []
+
+        def backfill(v):
+            if not racer:   # the other request slips in between our UPDATE and our INSERT
+                racer.append(None)
+                racer[0] = visitor_features.record_visit(v)
+            return real_backfill(v)
+
+        with mock.patch.object(visitor_features, "_backfill", side_effect=backfill):
+            ours = visitor_features.record_visit(visitor)
+        self.assertEqual(racer[0].session_count, 2)
+        self.assertEqual(ours.session_count, 3)
+        self.assertEqual(VisitorFeatures.objects.get(pk=visitor.pk).session_count, 3)
+
+    def test_scored_session_updates_row_only_forwards(self):
+        # Function under test: record_session_scores() via score_session()
+        from landing.reward_queue import score_session
+
+        visitor = Visitor.objects.create()
+        now = timezone.now()
+        newer = Session.objects.create(visitor=visitor, visit_number=2, ended_at=now)
+        older = Session.objects.create(visitor=visitor, visit_number=1, ended_at=now - timedelta(hours=1))
+        Event.objects.create(
+            session=newer, event_type="section_dwell", section="pricing",
+            duration_ms=20000, timestamp=now,
+        )
+
+        score_session(newer)
+        features = VisitorFeatures.objects.get(pk=visitor.pk)
+        self.assertEqual(features.last_ended_at, now)
+        self.assertGreater(features.price_intent_score, 0.0)
+
+        score_session(older)   # a late, older session must not overwrite the newer scores
+        features.refresh_from_db()
+        self.assertEqual(features.last_ended_at, now)
+        self.assertAlmostEqual(features.price_intent_score, newer.price_intent_score)
+
+
+class DeviceClassifierTests(TestCase):
+    """Cached user-agent classification and bot exclusion from the bandit."""
+
+    UAS = {
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148": "mobile",
+        "Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 Chrome/120 Mobile Safari/537.36": "mobile",
+        "Mozilla/5.0 (iPad; CPU OS 16_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148": "tablet",
+        "Mozilla/5.0 (Linux; Android 13; SM-X700) AppleWebKit/537.36 Chrome/120 Safari/537.36": "tablet",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120 Safari/537.36": "desktop",
+        "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)": "bot",
+        "Mozilla/5.0 (Linux; Android 6.0.1; Nexus 5X) Mobile Safari/537.36 (compatible; bingbot/2.0)": "bot",
+        "python-requests/2.31.0": "bot",
+        "": "desktop",
+    }
+
+    def test_categories(self):
+        # Function under test: classify_user_agent()
+        from landing.device import classify_user_agent
+
+        for ua, expected in self.UAS.items():
+            with self.subTest(ua=ua):
+                info = classify_user_agent(ua)
+                self.assertEqual(info.category, expected)
+                self.assertEqual(info.is_mobile, expected in ("mobile", "tablet"))
+                self.assertEqual(info.is_bot, expected == "bot")
+
+    def test_repeat_lookups_hit_the_cache(self):
+        # Function under test: classify_user_agent() LRU cache
+        from landing.device import _classify, classify_user_agent
+
+        ua = "Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0 cache-test"
+        classify_user_agent(ua)
+        hits = _classify.cache_info().hits
+        self.assertIs(classify_user_agent(ua), classify_user_agent(ua))
+        self.assertEqual(_classify.cache_info().hits, hits + 2)
+
+    def test_bot_gets_control_page_and_no_decision(self):
+        # Function under test: accept_cookies() with a crawler user agent
+        _seed_arms()
+        visitor = Visitor.objects.create()
+        Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        resp = self.client.post(
+            "/accept-cookies/", content_type="application/json",
+            HTTP_USER_AGENT="Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+        )
+        data = resp.json()
+        self.assertEqual(data["visit_number"], 2)
+        self.assertEqual(data["chosen_arms"], [])
+        self.assertEqual(data["page_config"], {})
+        self.assertEqual(BanditDecision.objects.count(), 0)
+
+    def test_bot_session_is_not_rewarded(self):
+        # Function under test: reward_queue._plan_reward() for a bot session
+        from landing.reward_queue import _plan_reward
+
+        _seed_arms()
+        _, session = _make_visitor_session()
+        session.user_agent = "curl/8.4.0"
+        BanditDecision.objects.create(
+            session=session, visitor=session.visitor, context_vector=_dummy_feature_vector(),
+            chosen_arm_ids=["faq_compact"], merged_page_config={}, explore=False, epsilon=0.1,
+        )
+        self.assertIsNone(_plan_reward(session))
+
+
+class FeaturePipelineTests(TestCase):
+    """Declarative feature pipeline: one definition for live, simulated and replayed vectors."""
+
+    def test_batch_matches_single_rows(self):
+        # Function under test: FeaturePipeline.transform() / transform_one()
+        import numpy as np
+
+        from landing.features import FEATURES
+
+        self.assertEqual(FEATURES.names, FEATURE_NAMES)
+        columns = {
+            "device": ["mobile", "desktop", "tablet", "bot"],
+            "price_intent_score": [0.1, 0.2, 0.3, 0.4],
+            "service_intent_score": [0.5, 0.0, 0.0, 0.0],
+            "trust_intent_score": [0.0, 0.6, 0.0, 0.0],
+            "location_intent_score": [0.0, 0.0, 0.7, 0.0],
+            "contact_intent_score": [0.0, 0.0, 0.0, 0.8],
+            "visit_count": [1, 4, 10, 25],
+        }
+        X = FEATURES.transform(columns)
+        self.assertEqual(X.dtype, np.float32)
+        self.assertEqual(X.shape, (4, FEATURE_DIM))
+        for i in range(4):
+            row = FEATURES.transform_one({name: values[i] for name, values in columns.items()})
+            np.testing.assert_allclose(X[i], row, rtol=1e-6)
+        np.testing.assert_array_equal(X[:, 0], [1.0, 0.0, 1.0, 0.0])
+        np.testing.assert_allclose(X[:, FEATURE_NAMES.index("visit_number_norm")], [0.1, 0.4, 1.0, 1.0])
+        np.testing.assert_array_equal(X[:, -1], 1.0)
+
+    def test_dependencies_and_supplied_columns(self):
+        # Function under test: FeaturePipeline.register() / transform()
+        from landing.features import FeaturePipeline
+
+        pipeline = FeaturePipeline()
+        calls = []
+
+        @pipeline.register("double", inputs=["x"], output=False)
+        def _double(x):
+            calls.append("double")
+            return 2 * x
+
+        @pipeline.register("plus_one", inputs=["double"])
+        def _plus_one(double):
+            return double + 1
+
+        self.assertEqual(pipeline.names, ["plus_one"])
+        self.assertEqual(pipeline.raw_inputs, ["x"])
+        self.assertEqual(pipeline.transform_one({"x": 3.0}), [7.0])
+        # A supplied column replaces the feature and skips its function
+        calls.clear()
+        self.assertEqual(pipeline.transform_one({"double": 10.0}), [11.0])
+        self.assertEqual(calls, [])
+        with self.assertRaises(ValueError):
+            pipeline.transform_one({})
+        with self.assertRaises(ValueError):
+            pipeline.register("x")(lambda: 0.0)
+
+    def test_featurize_contexts_reproduces_build_context(self):
+        # Function under test: featurize_contexts()
+        import numpy as np
+
+        from landing.features import featurize_contexts
+
+        factory = RequestFactory()
+        visitor = Visitor.objects.create()
+        session = Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+        session.ended_at = timezone.now()
+        session.price_intent_score = 0.7
+        session.trust_intent_score = 0.2
+        session.save()
+        contexts, vectors = [], []
+        for ua in ["Mozilla/5.0 (iPad; CPU OS 16_0 like Mac OS X) Mobile/15E148", "Mozilla/5.0"]:
+            context, fv = build_context(visitor, factory.get("/", HTTP_USER_AGENT=ua))
+            contexts.append(context)
+            vectors.append(fv)
+        # Contexts logged before the device category fall back to is_mobile
+        legacy = dict(contexts[0])
+        del legacy["device"]
+        X = featurize_contexts(contexts + [legacy], dtype=float)
+        np.testing.assert_array_equal(X, vectors + [vectors[0]])
+
+    def test_rebuild_refeaturize_uses_logged_contexts(self):
+        # Function under test: rebuild_bandit_params --refeaturize
+        import io
+
+        import numpy as np
+
+        from landing.features import featurize_contexts
+
+        _seed_arms()
+        context = {
+            "device": "mobile", "price_score": 0.4, "service_score": 0.1, "trust_score": 0.0,
+            "location_score": 0.3, "contact_score": 0.2, "visit_count": 3,
+        }
+        _, session = _make_visitor_session()
+        BanditDecision.objects.create(
+            session=session, visitor=session.visitor, context_json=context,
+            context_vector=[1.0] * 3,     # stale layout, ignored by --refeaturize
+            chosen_arm_ids=["faq_compact"], updated_arm_ids=["faq_compact"],
+            merged_page_config={}, explore=False, epsilon=0.1, reward=1.0,
+        )
+        out = io.StringIO()
+        call_command("rebuild_bandit_params", "--refeaturize", stdout=out)
+        self.assertIn("Replayed 1 decisions", out.getvalue())
+
+        x = featurize_contexts([context], dtype=float)[0]
+        param = LinearArmParam.objects.get(arm__arm_id="faq_compact")
+        self.assertEqual(param.n, 1)
+        np.testing.assert_allclose(param.A_matrix, np.asarray(make_initial_A()) + np.outer(x, x))
+        np.testing.assert_allclose(param.b_vector, x)
+
+
+class BanditTimingTests(TestCase):
+    """Per-stage latency histograms for accept_cookies / decide_slate."""
+
+    def setUp(self):
+        from landing.bandit_timing import reset_timings
+
+        reset_timings()
+        self.addCleanup(reset_timings)
+
+    def _returning_visit(self):
+        visitor = Visitor.objects.create()
+        Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        return self.client.post("/accept-cookies/", content_type="application/json")
+
+    def test_histogram_percentiles(self):
+        # Function under test: StageHistogram.percentile()
+        from landing.bandit_timing import StageHistogram
+
+        histogram = StageHistogram()
+        for ms in range(1, 101):          # 1 ms … 100 ms
+            histogram.add(ms / 1000.0)
+        self.assertEqual(histogram.count, 100)
+        # Bucket upper bounds are at most 2^(1/4) ≈ 19% above the true value
+        for q in (50, 95, 99):
+            self.assertGreaterEqual(histogram.percentile(q), q / 1000.0)
+            self.assertLessEqual(histogram.percentile(q), q / 1000.0 * 1.19)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertEqual(StageHistogram().percentile(50), 0.0)
+
+    def test_disabled_records_nothing(self):
+        # Function under test: stage_clock() / bandit_timings view with BANDIT_TIMING off
+        from landing.bandit_timing import stage_clock, timing_snapshot
+
+        _seed_arms()
+        self.assertIs(stage_clock(), stage_clock())     # shared no-op clock
+        self._returning_visit()
+        self.assertEqual(timing_snapshot(), {})
+        self.assertEqual(self.client.get("/bandit/timings/").status_code, 404)
+
+    @override_settings(BANDIT_TIMING=True)
+    def test_accept_cookies_records_every_stage(self):
+        # Function under test: accept_cookies() + decide_slate() stage laps
+        _seed_arms()
+        for _ in range(3):
+            self.assertEqual(self._returning_visit().status_code, 200)
+
+        data = self.client.get("/bandit/timings/").json()
+        stages = data["stages"]
+        for stage in ("visitor", "context", "decide", "catalog", "score", "slate", "merge", "insert", "total"):
+            with self.subTest(stage=stage):
+                self.assertEqual(stages[stage]["count"], 3)
+                row = stages[stage]
+                self.assertLessEqual(row["p50_ms"], row["p99_ms"])
+                self.assertLessEqual(row["p99_ms"], row["max_ms"])
+        self.assertGreaterEqual(stages["total"]["max_ms"], stages["decide"]["max_ms"])
+
+
+class DecisionBufferTests(TestCase):
+    """Buffered BanditDecision logging with bulk_create and flush-on-demand for rewards."""
+
+    def setUp(self):
+        _seed_arms()
+
+    def _decision(self):
+        from landing.models import BanditDecision as Decision
+
+        _, session = _make_visitor_session()
+        return Decision(
+            session=session, visitor=session.visitor, context_vector=_dummy_feature_vector(),
+            chosen_arm_ids=["faq_compact"], merged_page_config={}, explore=False, epsilon=0.1,
+        )
+
+    def test_flush_writes_pending_rows(self):
+        # Function under test: DecisionBuffer.add() / flush()
+        from landing.decision_buffer import DecisionBuffer
+
+        buf = DecisionBuffer(flush_seconds=0, flush_rows=3)
+        buf.add(self._decision())
+        buf.add(self._decision())
+        self.assertEqual(buf.pending(), 2)
+        self.assertEqual(BanditDecision.objects.count(), 0)
+        buf.add(self._decision())            # threshold reached, no flusher thread → flush now
+        self.assertEqual(buf.pending(), 0)
+        self.assertEqual(BanditDecision.objects.count(), 3)
+        self.assertEqual(buf.flush(), 0)
+
+    def test_failed_flush_keeps_rows_up_to_capacity(self):
+        # Function under test: DecisionBuffer.flush()
+        from unittest import mock
+
+        from landing.decision_buffer import DecisionBuffer
+
+        buf = DecisionBuffer(flush_seconds=0, flush_rows=100, capacity=3)
+        first = self._decision()
+        buf.add(first)
+        buf.add(self._decision())
+        with mock.patch.object(BanditDecision.objects, "bulk_create", side_effect=RuntimeError("db down")):
+            self.assertEqual(buf.flush(), 0)
+            self.assertEqual(buf.pending(), 2)
+            buf.add(self._decision())
+            buf.add(self._decision())        # over capacity while down → oldest dropped
+        self.assertEqual(buf.pending(), 3)
+        self.assertFalse(buf.holds(first.session_id))
+        self.assertEqual(buf.flush(), 3)
+        self.assertEqual(BanditDecision.objects.count(), 3)
+
+    def test_constraint_violation_drops_only_bad_rows(self):
+        # Function under test: DecisionBuffer.flush() → _insert_one_by_one()
+        from landing.decision_buffer import DecisionBuffer
+
+        existing = self._decision()
+        existing.save()
+        duplicate = self._decision()
+        duplicate.session = existing.session     # one decision per session
+        buf = DecisionBuffer(flush_seconds=0)
+        buf.add(self._decision())
+        buf.add(duplicate)
+        self.assertEqual(buf.flush(), 1)
+        self.assertEqual(BanditDecision.objects.count(), 2)
+
+    def test_flush_decision_waits_for_in_flight_flush(self):
+        # Function under test: flush_decision() while another thread is flushing
+        import threading
+        from unittest import mock
+
+        from django.db import connection
+
+        from landing import decision_buffer
+
+        buf = decision_buffer.DecisionBuffer(flush_seconds=0)
+        decision = self._decision()
+        buf.add(decision)
+        entered, release = threading.Event(), threading.Event()
+        real_bulk_create = BanditDecision.objects.bulk_create
+        calls = []
+
+        def bulk_create(objs, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:   # the background flush stalls, then the DB fails
+                entered.set()
+                release.wait(5)
+                raise RuntimeError("db down")
+            return real_bulk_create(objs, **kwargs)
+
+        def background_flush():
+            try:
+                buf.flush()
+            finally:
+                connection.close()
+
+        with mock.patch.object(BanditDecision.objects, "bulk_create", side_effect=bulk_create), \
+                mock.patch.object(decision_buffer, "_buffer", buf):
+            flusher = threading.Thread(target=background_flush)
+            flusher.start()
+            self.assertTrue(entered.wait(5))
+            self.assertFalse(buf.holds(decision.session_id))   # swapped out, not yet written
+            threading.Timer(0.1, release.set).start()
+            decision_buffer.flush_decision(decision.session)
+            flusher.join()
+        # The failed rows went back and the on-demand flush wrote them
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(buf.pending(), 0)
+        self.assertTrue(BanditDecision.objects.filter(session=decision.session).exists())
+
+    @override_settings(BANDIT_DECISION_BUFFER=True)
+    def test_end_session_finds_buffered_decision(self):
+        # Function under test: accept_cookies() + end_session() with BANDIT_DECISION_BUFFER
+        from unittest import mock
+
+        from landing import decision_buffer
+
+        buf = decision_buffer.DecisionBuffer(flush_seconds=0)
+        with mock.patch.object(decision_buffer, "_buffer", buf):
+            visitor = Visitor.objects.create()
+            Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+            self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+            data = self.client.post("/accept-cookies/", content_type="application/json").json()
+            self.assertTrue(data["chosen_arms"])
+            self.assertEqual(buf.pending(), 1)
+            self.assertEqual(BanditDecision.objects.count(), 0)
+
+            resp = self.client.post(
+                "/end-session/", data=json.dumps({"session_id": data["session_id"]}),
+                content_type="application/json",
+            )
+            self.assertEqual(resp.status_code, 200)
+        self.assertEqual(buf.pending(), 0)
+        decision = BanditDecision.objects.get(session__session_id=data["session_id"])
+        self.assertEqual(decision.chosen_arm_ids, data["chosen_arms"])
+        self.assertIsNotNone(decision.reward)
+
+
+class StickySlateTests(TestCase):
+    """Sticky per-visitor slates keep BanditDecision one-to-one with the deciding Session."""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        _seed_arms()
+        cache.clear()
+        self.visitor = Visitor.objects.create()
+        Session.objects.create(visitor=self.visitor, visit_number=1, is_active=False)
+        self.client.cookies["visitor_id"] = str(self.visitor.cookie_id)
+
+    def _visit(self):
+        return self.client.post("/accept-cookies/", content_type="application/json").json()
+
+    @override_settings(BANDIT_STICKY_SECONDS=60)
+    def test_reload_reuses_slate_without_a_new_decision(self):
+        # Function under test: accept_cookies() with cached_slate() / remember_slate()
+        from landing.sticky_slate import sticky_stats
+
+        hits = sticky_stats()["hits"]
+        first = self._visit()
+        second = self._visit()
+        third = self._visit()
+        self.assertTrue(first["chosen_arms"])
+        self.assertEqual(second["chosen_arms"], first["chosen_arms"])
+        self.assertEqual(second["page_config"], first["page_config"])
+        self.assertEqual(third["chosen_arms"], first["chosen_arms"])
+        self.assertEqual(sticky_stats()["hits"], hits + 2)
+
+        # One decision, owned by the session that made it; reloads point at it
+        decision = BanditDecision.objects.get()
+        origin = Session.objects.get(session_id=first["session_id"])
+        self.assertEqual(decision.session, origin)
+        reloads = Session.objects.filter(session_id__in=[second["session_id"], third["session_id"]])
+        self.assertEqual({s.sticky_of_id for s in reloads}, {origin.pk})
+        self.assertFalse(BanditDecision.objects.filter(session__in=reloads).exists())
+
+        # Ending a reload session credits the original decision
+        resp = self._end(third["session_id"])
+        self.assertEqual(resp.status_code, 200)
+        decision.refresh_from_db()
+        self.assertEqual(decision.reward, 0.0)
+
+    def _end(self, session_id):
+        return self.client.post(
+            "/end-session/", data=json.dumps({"session_id": session_id}),
+            content_type="application/json",
+        )
+
+    @override_settings(BANDIT_STICKY_SECONDS=60)
+    def test_reload_outcome_tops_up_the_original_reward(self):
+        # Function under test: end_session() → _plan_reward() for a sticky reload
+        import numpy as np
+
+        first = self._visit()
+        second = self._visit()
+        origin = Session.objects.get(session_id=first["session_id"])
+        reload = Session.objects.get(session_id=second["session_id"])
+        decision = BanditDecision.objects.get()
+        x = np.array(decision.context_vector)
+        slate = [BanditArm.objects.get(arm_id=arm_id) for arm_id in first["chosen_arms"]]
+        seen_first = slate[0]
+        seen_later = next(a for a in slate[1:] if not set(a.affected_sections) & set(seen_first.affected_sections))
+        params = {arm.pk: LinearArmParam.objects.get(arm=arm) for arm in (seen_first, seen_later)}
+        now = timezone.now()
+
+        # The original page-load ends first: one arm observed, no click
+        Event.objects.create(session=origin, event_type="section_view", section=seen_first.affected_sections[0], timestamp=now)
+        self._end(first["session_id"])
+        decision.refresh_from_db()
+        self.assertEqual((decision.reward, decision.updated_arm_ids), (0.0, [seen_first.arm_id]))
+
+        # The reload sees another arm's section and clicks a CTA
+        Event.objects.create(session=reload, event_type="section_view", section=seen_later.affected_sections[0], timestamp=now)
+        Event.objects.create(session=reload, event_type="click", section="hero", is_cta=True, timestamp=now)
+        self._end(second["session_id"])
+        decision.refresh_from_db()
+        self.assertEqual(decision.reward, 0.5)
+        self.assertEqual(set(decision.updated_arm_ids), {seen_first.arm_id, seen_later.arm_id})
+
+        # Already-credited arm: reward raised, not counted twice; new arm: one full observation
+        before, after = params[seen_first.pk], LinearArmParam.objects.get(arm=seen_first)
+        self.assertEqual(after.n, before.n + 1)
+        np.testing.assert_allclose(after.A_matrix, np.asarray(before.A_matrix) + np.outer(x, x))
+        np.testing.assert_allclose(after.b_vector, np.asarray(before.b_vector) + 0.5 * x)
+        before, after = params[seen_later.pk], LinearArmParam.objects.get(arm=seen_later)
+        self.assertEqual(after.n, before.n + 1)
+        np.testing.assert_allclose(after.b_vector, np.asarray(before.b_vector) + 0.5 * x)
+
+        # A repeated beacon changes nothing
+        self._end(second["session_id"])
+        repeated = LinearArmParam.objects.get(arm=seen_later)
+        self.assertEqual(repeated.n, after.n)
+        np.testing.assert_array_equal(repeated.b_vector, after.b_vector)
+
+    @override_settings(
+        BANDIT_STICKY_SECONDS=60,
+        BANDIT_STICKY_CACHE="shared",
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "shared": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+        },
+    )
+    def test_sticky_cache_alias_and_startup_check(self):
+        # Function under test: sticky_slate._cache() / check_sticky_cache()
+        from django.core.checks import run_checks
+
+        from landing.sticky_slate import check_sticky_cache
+
+        first = self._visit()
+        self._visit()   # DummyCache stores nothing, so the reload decides again
+        self.assertTrue(first["chosen_arms"])
+        self.assertEqual(BanditDecision.objects.count(), 2)
+        self.assertEqual(check_sticky_cache(), [])
+
+        with override_settings(BANDIT_STICKY_CACHE="default"):
+            self.assertEqual([m.id for m in check_sticky_cache()], ["landing.W001"])
+            self.assertIn("landing.W001", [m.id for m in run_checks()])
+        with override_settings(BANDIT_STICKY_CACHE="missing"):
+            self.assertEqual([m.id for m in check_sticky_cache()], ["landing.E001"])
+        with override_settings(BANDIT_STICKY_SECONDS=0, BANDIT_STICKY_CACHE="default"):
+            self.assertEqual(check_sticky_cache(), [])
+
+    @override_settings(BANDIT_STICKY_SECONDS=60, BANDIT_REWARD_QUEUE=True)
+    def test_queued_original_and_reload_are_rewarded_once(self):
+        # Function under test: drain_reward_queue() with a sticky group in one batch
+        import numpy as np
+
+        from landing.reward_queue import drain_reward_queue
+
+        first = self._visit()
+        second = self._visit()
+        origin = Session.objects.get(session_id=first["session_id"])
+        reload = Session.objects.get(session_id=second["session_id"])
+        decision = BanditDecision.objects.get()
+        x = np.array(decision.context_vector)
+        slate = [BanditArm.objects.get(arm_id=arm_id) for arm_id in first["chosen_arms"]]
+        before = {arm.pk: LinearArmParam.objects.get(arm=arm) for arm in slate}
+        now = timezone.now()
+        for arm in slate:
+            for section in arm.affected_sections:
+                Event.objects.create(session=origin, event_type="section_view", section=section, timestamp=now)
+        Event.objects.create(session=reload, event_type="click", section="hero", is_cta=True, timestamp=now)
+        self._end(first["session_id"])
+        self._end(second["session_id"])
+
+        self.assertEqual(drain_reward_queue(), (2, 0))
+        decision.refresh_from_db()
+        self.assertEqual(decision.reward, 0.5)
+        for arm in slate:
+            param = LinearArmParam.objects.get(arm=arm)
+            self.assertEqual(param.n, before[arm.pk].n + 1)
+            np.testing.assert_allclose(param.b_vector, np.asarray(before[arm.pk].b_vector) + 0.5 * x)
+
+    @override_settings(BANDIT_STICKY_SECONDS=60)
+    def test_arm_change_starts_a_new_slate(self):
+        # Function under test: cached_slate() keyed by arms_version
+        from landing.bandit_utils import bump_model_version
+
+        self._visit()
+        bump_model_version()                 # parameters only → still sticky
+        self._visit()
+        self.assertEqual(BanditDecision.objects.count(), 1)
+        bump_model_version(arms=True)        # arm catalog changed → decide again
+        self._visit()
+        self.assertEqual(BanditDecision.objects.count(), 2)
+
+    def test_disabled_decides_every_page_load(self):
+        # Function under test: accept_cookies() with BANDIT_STICKY_SECONDS = 0
+        self._visit()
+        second = self._visit()
+        self.assertEqual(BanditDecision.objects.count(), 2)
+        self.assertIsNone(Session.objects.get(session_id=second["session_id"]).sticky_of_id)
+
+
+class ExploitCacheTests(TestCase):
+    """Quantized-context cache of ε-greedy exploit slates."""
+
+    def setUp(self):
+        import random
+
+        from landing.bandit_utils import reset_exploit_cache
+
+        _seed_arms()
+        rng = random.Random(5)
+        for param in LinearArmParam.objects.all():
+            param.n = MIN_PULLS_PER_ARM
+            param.b_vector = [rng.random() for _ in range(FEATURE_DIM)]
+            param.save()
+        reset_exploit_cache()
+        self.addCleanup(reset_exploit_cache)
+
+    def _stats(self):
+        from landing.bandit_utils import exploit_cache_stats
+
+        return exploit_cache_stats()
+
+    @override_settings(BANDIT_EXPLOIT_CACHE=True)
+    def test_same_cell_hits_and_matches_uncached_slate(self):
+        # Function under test: decide_slate() → _cached_exploit_slate()
+        x = [1.0, 0.62, 0.1, 0.3, 0.0, 0.2, 0.3, 1.0]
+        near = [1.0, 0.64, 0.1, 0.3, 0.01, 0.2, 0.3, 1.0]   # rounds to the same grid cell
+        first = decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        second = decide_slate(near, epsilon=0.0, policy="epsilon_greedy")
+        self.assertEqual([a.arm_id for a in second.arms], [a.arm_id for a in first.arms])
+        stats = self._stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stale"]), (1, 1, 0))
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+        with override_settings(BANDIT_EXPLOIT_CACHE=False):
+            uncached = decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        self.assertEqual([a.arm_id for a in uncached.arms], [a.arm_id for a in first.arms])
+
+    @override_settings(BANDIT_EXPLOIT_CACHE=True, BANDIT_EXPLOIT_CACHE_MAX_LAG=0)
+    def test_model_updates_make_entries_stale(self):
+        # Function under test: _cached_exploit_slate() staleness (BANDIT_EXPLOIT_CACHE_MAX_LAG)
+        from landing import bandit_utils
+
+        x = _dummy_feature_vector()
+        decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        bandit_utils.bump_model_version()
+        decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        self.assertEqual(self._stats()["stale"], 1)
+
+        bandit_utils.bump_model_version()
+        with override_settings(BANDIT_EXPLOIT_CACHE_MAX_LAG=5):
+            decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        stats = self._stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["mean_hit_lag"], 1.0)
+
+    @override_settings(BANDIT_EXPLOIT_CACHE=True)
+    def test_entries_within_the_default_lag_are_served(self):
+        # Function under test: _cached_exploit_slate() with the default EXPLOIT_CACHE_MAX_LAG
+        from django.conf import settings
+
+        from landing import bandit_utils
+
+        del settings.BANDIT_EXPLOIT_CACHE_MAX_LAG   # fall back to the module default
+        x = _dummy_feature_vector()
+        first = decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        rewarded = BanditArm.objects.get(arm_id=first.arms[0].arm_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_stats(rewarded, x, 1.0)   # a reward: one version bump
+        for _ in range(bandit_utils.EXPLOIT_CACHE_MAX_LAG - 1):
+            bandit_utils.bump_model_version()
+        again = decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        self.assertEqual([a.arm_id for a in again.arms], [a.arm_id for a in first.arms])
+        stats = self._stats()
+        self.assertEqual((stats["hits"], stats["stale"]), (1, 0))
+        self.assertEqual(stats["mean_hit_lag"], float(bandit_utils.EXPLOIT_CACHE_MAX_LAG))
+
+        bandit_utils.bump_model_version()
+        decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        self.assertEqual(self._stats()["stale"], 1)
+
+    @override_settings(BANDIT_EXPLOIT_CACHE=True)
+    def test_exploration_and_warmup_are_not_cached(self):
+        # Function under test: decide_slate() exploration / warmup with the exploit cache
+        x = _dummy_feature_vector()
+        exploit = [a.arm_id for a in decide_slate(x, epsilon=0.0, policy="epsilon_greedy").arms]
+        for _ in range(5):
+            decision = decide_slate(x, epsilon=1.0, policy="epsilon_greedy")
+            self.assertTrue(decision.explored)
+        # The entry still holds the exploit slate
+        self.assertEqual([a.arm_id for a in decide_slate(x, epsilon=0.0, policy="epsilon_greedy").arms], exploit)
+
+        param = LinearArmParam.objects.get(arm__arm_id="faq_compact")
+        param.n = 0
+        with self.captureOnCommitCallbacks(execute=True):
+            param.save()
+        decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        self.assertEqual(self._stats()["bypassed"], 1)
+
+    @override_settings(BANDIT_EXPLOIT_CACHE=True)
+    def test_cold_control_arm_does_not_bypass(self):
+        # Function under test: _cached_exploit_slate() warm check ignores the control arm
+        from landing.bandit_utils import get_arm_catalog
+
+        param = LinearArmParam.objects.get(arm__arm_id="no_change")
+        param.n = 0
+        with self.captureOnCommitCallbacks(execute=True):
+            param.save()
+        catalog = get_arm_catalog()
+        self.assertFalse(catalog.warm[catalog.is_control].any())
+        x = _dummy_feature_vector()
+        first = decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        second = decide_slate(x, epsilon=0.0, policy="epsilon_greedy")
+        self.assertEqual([a.arm_id for a in second.arms], [a.arm_id for a in first.arms])
+        stats = self._stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["bypassed"]), (1, 1, 0))
+
+    def test_cache_stats_endpoint(self):
+        # Function under test: bandit_cache_stats view
+        self.assertEqual(self.client.get("/bandit/cache-stats/").status_code, 404)
+        with override_settings(BANDIT_CACHE_STATS=True):
+            data = self.client.get("/bandit/cache-stats/").json()
+        self.assertFalse(data["exploit"]["enabled"])
+        self.assertIn("hit_rate", data["exploit"])
+        self.assertIn("hits", data["sticky"])
+
+
+class BanditPageNamespaceTests(TestCase):
+    """Per-page arm catalogs: a decision only ever sees its own page's arms."""
+
+    def setUp(self):
+        from landing.models import LandingPage
+
+        _seed_arms()   # shared arms
+        self.page_a = LandingPage.objects.create(name="A")
+        self.page_b = LandingPage.objects.create(name="B")
+        for page, arm_ids in [
+            (self.page_a, ["no_change", "hero_compact", "faq_compact"]),
+            (self.page_b, ["no_change", "hero_compact", "pricing_compact", "promote_services"]),
+        ]:
+            for arm_id in arm_ids:
+                shared = BanditArm.objects.get(page__isnull=True, arm_id=arm_id)
+                arm = BanditArm.objects.create(
+                    page=page,
+                    arm_id=arm_id,
+                    page_config=shared.page_config,
+                    affected_sections=shared.affected_sections,
+                )
+                LinearArmParam.objects.create(
+                    arm=arm, page=page, A_matrix=make_initial_A(), b_vector=make_initial_b(), n=5,
+                )
+
+    def test_catalog_holds_only_the_pages_arms(self):
+        # Function under test: get_arm_catalog(page_id)
+        catalog = get_arm_catalog(self.page_a.pk)
+        self.assertEqual(catalog.page_id, self.page_a.pk)
+        self.assertEqual(sorted(catalog.by_arm_id), ["faq_compact", "hero_compact", "no_change"])
+        self.assertEqual(catalog.theta.shape[0], 3)
+        self.assertTrue(all(arm.page_id == self.page_a.pk for arm in catalog.arms))
+        self.assertEqual(len(get_arm_catalog().arms), 11)
+
+    def test_decision_uses_only_its_page(self):
+        # Function under test: decide_slate(page_id=...)
+        fv = _dummy_feature_vector()
+        for _ in range(20):
+            decision = decide_slate(fv, k=3, epsilon=1.0, page_id=self.page_a.pk)
+            self.assertEqual(decision.page_id, self.page_a.pk)
+            self.assertTrue(all(arm.page_id == self.page_a.pk for arm in decision.arms))
+            self.assertLessEqual({a.arm_id for a in decision.arms}, {"hero_compact", "faq_compact"})
+
+    def test_page_without_arms_uses_shared_catalog(self):
+        # Function under test: get_arm_catalog() fallback to the shared arms
+        from landing.models import LandingPage
+
+        bare = LandingPage.objects.create(name="no arms")
+        self.assertIs(get_arm_catalog(bare.pk), get_arm_catalog())
+        self.assertIsNone(decide_slate(_dummy_feature_vector(), k=3, page_id=bare.pk).page_id)
+
+    def test_reward_on_one_page_leaves_other_catalogs_alone(self):
+        # Function under test: signals → bump_model_version(page_id=...)
+        from landing.bandit_utils import current_model_version
+
+        shared, page_b = current_model_version(), current_model_version(self.page_b.pk)
+        before_a = get_arm_catalog(self.page_a.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_stats(BanditArm.objects.get(page=self.page_a, arm_id="faq_compact"), _dummy_feature_vector(), 1.0)
+        self.assertEqual(current_model_version(), shared)
+        self.assertEqual(current_model_version(self.page_b.pk), page_b)
+        self.assertIsNot(get_arm_catalog(self.page_a.pk), before_a)
+
+    def test_off_policy_evaluation_reads_one_namespace(self):
+        # Function under test: load_logged_decisions(page_id=...) / evaluate_policies --page
+        from io import StringIO
+
+        from landing.off_policy import CandidatePolicy, evaluate_policies, load_logged_decisions
+
+        fv = _dummy_feature_vector()
+        for page, arm_ids in [(self.page_a, ["faq_compact"]), (self.page_a, ["hero_compact"]), (None, ["pricing_compact"])]:
+            _, session = _make_visitor_session()
+            BanditDecision.objects.create(
+                session=session, visitor=session.visitor, page=page, context_vector=fv,
+                chosen_arm_ids=arm_ids, merged_page_config={}, explore=True, epsilon=0.5,
+                propensity=0.5, reward=1.0,
+            )
+
+        data = load_logged_decisions(page_id=self.page_a.pk)
+        self.assertEqual(len(data.rewards), 2)
+        self.assertEqual(data.page_id, self.page_a.pk)
+        self.assertEqual(sorted(data.arm_ids), ["faq_compact", "hero_compact", "no_change"])
+        (result,) = evaluate_policies(data, [CandidatePolicy("k1", epsilon=0.5, k=1)])
+        self.assertGreater(result["support"], 0.0)
+        self.assertEqual(len(load_logged_decisions().rewards), 1)
+
+        out = StringIO()
+        call_command("evaluate_policies", "--page", str(self.page_a.pk), "--k", "1", stdout=out)
+        self.assertIn("2 logged decisions", out.getvalue())
+
+    def test_arm_ids_are_unique_per_page(self):
+        # Function under test: BanditArm unique_page_arm_id / unique_shared_arm_id
+        from django.db import IntegrityError, transaction
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BanditArm.objects.create(page=self.page_a, arm_id="hero_compact")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BanditArm.objects.create(arm_id="hero_compact")
+
+    def test_accept_cookies_decides_and_rewards_within_the_page(self):
+        # Function under test: accept_cookies(?page=) → _plan_reward()
+        visitor = Visitor.objects.create()
+        Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        data = self.client.post(f"/accept-cookies/?page={self.page_a.pk}").json()
+        self.assertTrue(data["chosen_arms"])
+
+        decision = BanditDecision.objects.get()
+        self.assertEqual(decision.page_id, self.page_a.pk)
+        session = Session.objects.get(session_id=data["session_id"])
+        now = timezone.now()
+        Event.objects.bulk_create([
+            Event(session=session, event_type="click", is_cta=True, timestamp=now),
+            Event(session=session, event_type="section_view", section="hero", timestamp=now),
+            Event(session=session, event_type="section_view", section="faq", timestamp=now),
+        ])
+        self.client.post(
+            "/end-session/", data=json.dumps({"session_id": data["session_id"]}),
+            content_type="application/json",
+        )
+        # Only page A's copies of the chosen arms learned; the shared ones did not
+        for arm_id in data["chosen_arms"]:
+            self.assertGreater(LinearArmParam.objects.get(arm__page=self.page_a, arm__arm_id=arm_id).n, 5)
+            self.assertEqual(LinearArmParam.objects.get(arm__page__isnull=True, arm__arm_id=arm_id).n, 5)
+
+    def test_unknown_page_falls_back_to_shared_arms(self):
+        # Function under test: accept_cookies() with an id that is not a LandingPage
+        visitor = Visitor.objects.create()
+        Session.objects.create(visitor=visitor, visit_number=1, is_active=False)
+        self.client.cookies["visitor_id"] = str(visitor.cookie_id)
+        self.client.post("/accept-cookies/?page=999999")
+        self.assertIsNone(BanditDecision.objects.get().page_id)
+
+
+class ArmPruningTests(TestCase):
+    """Successive elimination: dominated arms go dormant, reversibly and with a log."""
+
+    BAD_ARMS = ("faq_compact", "services_compact")
+
+    def setUp(self):
+        import numpy as np
+
+        _seed_arms()
+        rng = np.random.default_rng(3)
+        X = rng.random((150, FEATURE_DIM))
+        X[:, -1] = 1.0
+        self.X = X
+        # Far lower rewards for the two bad arms
+        self._train(lambda arm: 0.05 if arm.arm_id in self.BAD_ARMS else 0.5 + 0.02 * (arm.pk % 5))
+        visitor = Visitor.objects.create()
+        sessions = Session.objects.bulk_create([Session(visitor=visitor, visit_number=2) for _ in X])
+        BanditDecision.objects.bulk_create([
+            BanditDecision(session=s, visitor=visitor, context_vector=x.tolist(), explore=False, epsilon=0.0)
+            for s, x in zip(sessions, X)
+        ])
+
+    def _train(self, level_of):
+        """Every arm has seen all contexts many times: tight intervals around level_of(arm)."""
+        import numpy as np
+
+        X = self.X
+        for param in LinearArmParam.objects.select_related("arm"):
+            A = np.asarray(make_initial_A()) + 100 * X.T @ X
+            param.A_matrix = A
+            param.b_vector = 100 * X.T @ np.full(len(X), level_of(param.arm))
+            param.A_inv = np.linalg.inv(A)
+            param.A_chol = np.linalg.cholesky(A)
+            param.n = 100 * len(X)
+            param.save()
+
+    def test_conflicting_betters_count_once(self):
+        # Function under test: dominated_arms() with slate conflicts
+        from landing.arm_pruning import dominated_arms
+
+        arm = BanditArm.objects.create(
+            arm_id="promote_faq", name="promote_faq",
+            page_config={"compact": [], "hide": [], "promote": "faq", "variants": {}}, affected_sections=["faq"],
+        )
+        LinearArmParam.objects.create(arm=arm, A_matrix=make_initial_A(), b_vector=make_initial_b(), n=5)
+        promoters = ("promote_pricing", "promote_services", "promote_faq")   # one promote per slate
+        self._train(lambda arm: 0.9 if arm.arm_id in promoters else 0.5 if arm.arm_id == "hero_compact" else 0.05)
+        catalog = get_arm_catalog()
+        cols = [catalog.index[catalog.by_arm_id[arm_id].pk] for arm_id in promoters]
+        for i in cols[1:]:
+            self.assertTrue(catalog.conflict_masks[cols[0]] >> i & 1)
+        # Three arms beat hero_compact everywhere, but only one of them fits in a slate
+        found = {catalog.arms[i].arm_id for i in dominated_arms(catalog, self.X)}
+        self.assertNotIn("hero_compact", found)
+
+    def test_dominated_arms_are_the_bad_ones(self):
+        # Function under test: dominated_arms()
+        from landing.arm_pruning import dominated_arms
+
+        catalog = get_arm_catalog()
+        found = dominated_arms(catalog, self.X)
+        self.assertEqual({catalog.arms[i].arm_id for i in found}, set(self.BAD_ARMS))
+        for details in found.values():
+            self.assertLess(details["margin"], 0)
+            self.assertGreaterEqual(len(details["beaten_by"]), 3)
+            self.assertNotIn("no_change", details["beaten_by"])
+
+    def test_too_few_pulls_are_never_pruned(self):
+        # Function under test: dominated_arms(min_pulls=...)
+        from landing.arm_pruning import dominated_arms
+
+        self.assertEqual(dominated_arms(get_arm_catalog(), self.X, min_pulls=10**9), {})
+
+    def test_prune_drops_arm_from_catalog_and_logs_it(self):
+        # Function under test: prune_arms()
+        from landing.arm_pruning import prune_arms
+        from landing.models import ArmPruneLog
+
+        pruned = prune_arms()
+        self.assertEqual({arm.arm_id for arm, _ in pruned}, set(self.BAD_ARMS))
+        self.assertEqual(
+            set(BanditArm.objects.filter(dormant_since__isnull=False).values_list("arm_id", flat=True)),
+            set(self.BAD_ARMS),
+        )
+        self.assertEqual(ArmPruneLog.objects.filter(action="prune", reason="dominated").count(), 2)
+        catalog = get_arm_catalog()
+        self.assertEqual(len(catalog.arms), 9)
+        self.assertFalse(set(self.BAD_ARMS) & set(catalog.by_arm_id))
+        for _ in range(20):
+            decision = decide_slate(self.X[0].tolist(), k=3, epsilon=1.0)
+            self.assertFalse(set(self.BAD_ARMS) & {a.arm_id for a in decision.arms})
+
+    def test_wake_reverses_pruning_with_grace_period(self):
+        # Function under test: wake_arms() / prune_arms() grace period
+        from landing.arm_pruning import prune_arms, wake_arms
+        from landing.models import ArmPruneLog
+
+        prune_arms()
+        woken = wake_arms(list(BanditArm.objects.filter(arm_id="faq_compact")))
+        self.assertEqual([a.arm_id for a in woken], ["faq_compact"])
+        self.assertIn("faq_compact", get_arm_catalog().by_arm_id)
+        self.assertTrue(ArmPruneLog.objects.filter(arm__arm_id="faq_compact", action="readmit", reason="manual").exists())
+        # Still dominated, but it needs fresh pulls before it can be pruned again
+        self.assertEqual(prune_arms(), [])
+
+    def test_readmission_is_rate_limited(self):
+        # Function under test: readmit_arms()
+        from landing.arm_pruning import PRUNE_READMIT_AFTER, prune_arms, readmit_arms
+
+        prune_arms()
+        long_ago = timezone.now() - PRUNE_READMIT_AFTER - timedelta(hours=1)
+        BanditArm.objects.filter(arm_id="services_compact").update(dormant_since=long_ago - timedelta(hours=1))
+        BanditArm.objects.filter(arm_id="faq_compact").update(dormant_since=long_ago)
+        self.assertEqual([a.arm_id for a in readmit_arms(limit=1)], ["services_compact"])
+        self.assertEqual(
+            list(BanditArm.objects.filter(dormant_since__isnull=False).values_list("arm_id", flat=True)),
+            ["faq_compact"],
+        )
+
+    def test_command_dry_run_changes_nothing(self):
+        # Function under test: prune_bandit_arms --dry-run
+        from io import StringIO
+
+        from landing.models import ArmPruneLog
+
+        out = StringIO()
+        call_command("prune_bandit_arms", "--dry-run", stdout=out)
+        self.assertIn("would prune faq_compact", out.getvalue())
+        self.assertFalse(BanditArm.objects.filter(dormant_since__isnull=False).exists())
+        self.assertFalse(ArmPruneLog.objects.exists())
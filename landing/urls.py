@@ -17,6 +17,8 @@ urlpatterns = [
     path('track-interactions/', views.track_interactions, name='track_interactions'),
     path('end-session/', views.end_session, name='end_session'),
     path('accept-cookies/', views.accept_cookies, name='accept_cookies'),
+    path('bandit/timings/', views.bandit_timings, name='bandit_timings'),
+    path('bandit/cache-stats/', views.bandit_cache_stats, name='bandit_cache_stats'),
 
     # Demo landing page (hard-coded, no DB needed)
     path('demo/', views.demo_landing_page, name='demo_landing'),
@@ -7,6 +7,11 @@ accept_cookies      – POST /accept-cookies/    → create / resume visitor, st
 track_interactions  – POST /track-interactions/ → store batched frontend events
 end_session         – POST /end-session/        → mark session ended, compute intent scores
 
+Metrics
+-------
+bandit_timings      – GET /bandit/timings/      → per-stage latency percentiles (BANDIT_TIMING)
+bandit_cache_stats  – GET /bandit/cache-stats/  → exploit-cache and sticky-slate counters
+
 Page-serving views
 ------------------
 demo_landing_page   – static landing page (no DB, no bandit)
@@ -20,6 +25,7 @@ from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 import json
 import logging
+import os
 
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -34,12 +40,26 @@ from .models import (
     Session,
     Event,
 )
-from .utils import get_user_section_scores, combine_scores, compute_session_intent_scores
+from .utils import get_user_section_scores, combine_scores
 from .ai_llm import generate_llm_recommendations
 from django.core.exceptions import ValidationError
 
-from .models import BanditArm, BanditDecision
-from .bandit_utils import build_context, choose_arm, choose_slate, merge_page_configs, update_stats
+from .decision_buffer import log_decision
+from .fields import PreEncodedJSONEncoder
+from .sticky_slate import cached_slate, remember_slate, sticky_seconds, sticky_stats
+from .bandit_utils import (
+    build_context,
+    cache_stats_enabled,
+    choose_arm,
+    decide_slate,
+    exploit_cache_enabled,
+    exploit_cache_stats,
+    slate_page_config,
+)
+from .reward_queue import enqueue_reward, reward_queue_enabled, reward_session, score_session
+from .device import is_bot_user_agent
+from .visitor_features import record_visit
+from .bandit_timing import stage_clock, timing_enabled, timing_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -145,7 +165,13 @@ def landing_page(request):
     # - If cookie exists: create session, close old sessions, run recommendations and render page
     cookie_id = request.COOKIES.get("visitor_id")
 
-    page = LandingPage.objects.first()
+    # ?page=<id> picks the landing page (and with it the bandit's arm namespace)
+    page = None
+    requested = request.GET.get("page", "")
+    if requested.isdigit():
+        page = LandingPage.objects.filter(pk=int(requested)).first()
+    if page is None:
+        page = LandingPage.objects.first()
     if not page:
         return render(request, "landing/index_static.html", {})
     sections = page.sections.order_by("order")
@@ -168,6 +194,7 @@ def landing_page(request):
             "combined_css": combined_css,
             "recommendations_json": json.dumps({}), 
             "show_cookie_popup": True,
+            "page_id": page.pk,
         })
 
     
@@ -176,11 +203,13 @@ def landing_page(request):
     # Close any old active sessions
     Session.objects.filter(visitor=visitor, is_active=True).update(is_active=False, ended_at=timezone.now())
 
-    # Create a new session
+    # Create a new session — counted on VisitorFeatures like accept_cookies does
+    features = record_visit(visitor)
     session = Session.objects.create(
         visitor=visitor,
         user_agent=request.META.get("HTTP_USER_AGENT", ""),
-        referrer=request.META.get("HTTP_REFERER", "")
+        referrer=request.META.get("HTTP_REFERER", ""),
+        visit_number=features.session_count,
     )
 
     # Only call the AI recommendations when an existing cookie was present
@@ -194,6 +223,7 @@ def landing_page(request):
             "builder_sections": json.dumps(section_data),
             "combined_css": combined_css,
             "recommendations_json": json.dumps(recommendations),
+            "page_id": page.pk,
         }
     )
 
@@ -304,6 +334,10 @@ def end_session(request):
     Marks the session as ended and computes intent-feature scores from the
     Event rows recorded during the session.
 
+    With ``settings.BANDIT_REWARD_QUEUE`` enabled the scoring and bandit
+    reward are deferred: the session is only marked ended and a RewardJob
+    is queued for the ``process_reward_queue`` worker.
+
     Payload::
 
         { "session_id": "<uuid>" }
@@ -346,86 +380,21 @@ def end_session(request):
         session.ended_at = timezone.now()
     session.is_active = False
 
+    # --- queued: scoring + reward happen in process_reward_queue -----------
+    if reward_queue_enabled():
+        session.save(update_fields=["ended_at", "is_active"])
+        enqueue_reward(session)
+        logger.info("end_session: session=%s  queued for reward", session.session_id)
+        return JsonResponse({"ok": True})
+
     # --- compute intent scores from events ---------------------------------
-    scores = compute_session_intent_scores(session)
-
-    session.max_scroll_pct = scores["max_scroll_pct"]
-    session.engaged_time_ms = scores["engaged_time_ms"]
-    session.cta_clicked = scores["cta_clicked"]
-    session.pricing_cta_clicked = scores["pricing_cta_clicked"]
-    session.price_intent_score = scores["price_intent_score"]
-    session.service_intent_score = scores["service_intent_score"]
-    session.trust_intent_score = scores["trust_intent_score"]
-    session.location_intent_score = scores["location_intent_score"]
-    session.contact_intent_score = scores["contact_intent_score"]
-    session.quick_scan_score = scores["quick_scan_score"]
-    session.primary_intent = scores["primary_intent"]
-
-    session.save()
+    scores = score_session(session)
 
     # --- bandit reward update (only for visit_number >= 2) -----------------
-    if session.visit_number >= 2:
-        try:
-            decision = BanditDecision.objects.get(session=session)
-
-            if decision.reward is not None:
-                # Already processed — idempotent guard
-                logger.debug(
-                    "Bandit decision already rewarded for session %s",
-                    session.session_id,
-                )
-            else:
-                # Tiered reward:
-                #   1.0 – clicked a pricing-plan CTA (full conversion intent)
-                #   0.5 – clicked any other CTA (navigated toward pricing)
-                #   0.0 – no CTA interaction
-                if session.pricing_cta_clicked:
-                    reward = 1.0
-                elif session.cta_clicked:
-                    reward = 0.5
-                else:
-                    reward = 0.0
-
-                # Determine which sections the visitor actually saw
-                observed_sections = set(
-                    Event.objects.filter(
-                        session=session,
-                        event_type__in=["section_view", "section_dwell"],
-                    )
-                    .exclude(section="")
-                    .values_list("section", flat=True)
-                    .distinct()
-                )
-
-                # Update each arm in the slate IF its sections were observed
-                updated_ids = []
-                for arm_id in (decision.chosen_arm_ids or []):
-                    try:
-                        arm = BanditArm.objects.get(arm_id=arm_id)
-                    except BanditArm.DoesNotExist:
-                        continue
-                    arm_sections = set(arm.affected_sections or [])
-                    # Empty affected_sections → always update (arm changes nothing section-specific)
-                    if not arm_sections or (arm_sections & observed_sections):
-                        update_stats(arm, decision.context_vector, reward)
-                        updated_ids.append(arm_id)
-                    else:
-                        logger.debug(
-                            "Skipping unobserved arm=%s (needs %s, saw %s)",
-                            arm_id, arm_sections, observed_sections,
-                        )
-
-                decision.reward = reward
-                decision.updated_arm_ids = updated_ids
-                decision.save(update_fields=["reward", "updated_arm_ids"])
-                logger.info(
-                    "Bandit reward: session=%s reward=%.1f updated=%s",
-                    session.session_id, reward, updated_ids,
-                )
-        except BanditDecision.DoesNotExist:
-            logger.debug("No BanditDecision for session %s — skipping reward.", session.session_id)
-        except Exception:
-            logger.exception("Bandit reward update failed for session %s.", session.session_id)
+    try:
+        reward_session(session)
+    except Exception:
+        logger.exception("Bandit reward update failed for session %s.", session.session_id)
 
     logger.info(
         "end_session: session=%s  primary_intent=%s  "
@@ -446,10 +415,24 @@ def end_session(request):
 # Cookie acceptance & session creation
 # ---------------------------------------------------------------------------
 
+def _bandit_page_id(request):
+    """
+    Landing page whose bandit arms this request uses (``?page=<id>``).
+
+    ``None`` — the shared arms — when no page is given or the id is not
+    an existing LandingPage, so arbitrary ids never create catalogs.
+    """
+    requested = request.GET.get("page", "")
+    if not requested.isdigit():
+        return None
+    page_id = int(requested)
+    return page_id if LandingPage.objects.filter(pk=page_id).exists() else None
+
+
 @csrf_exempt
 def accept_cookies(request):
     """
-    POST /accept-cookies/
+    POST /accept-cookies/[?page=<landing page id>]
 
     Called by the frontend in two situations:
 
@@ -461,6 +444,9 @@ def accept_cookies(request):
        Finds the existing Visitor (from ``visitor_id`` cookie), closes any
        stale active sessions, and creates a fresh Session for this page-load.
 
+    With ``?page=`` the slate comes from that landing page's own arms
+    (the shared arms when it has none).
+
     Returns JSON::
 
         {
@@ -473,6 +459,7 @@ def accept_cookies(request):
     if request.method != "POST":
         return JsonResponse({"error": "Only POST is allowed."}, status=405)
 
+    clock = stage_clock()   # no-op unless BANDIT_TIMING is on
     cookie_id = request.COOKIES.get("visitor_id")
     is_new = False
 
@@ -494,8 +481,22 @@ def accept_cookies(request):
         visitor=visitor, is_active=True,
     ).update(is_active=False, ended_at=timezone.now())
 
-    # --- compute visit_number ----------------------------------------------
-    visit_number = Session.objects.filter(visitor=visitor).count() + 1
+    # --- compute visit_number (also the feature snapshot build_context reads)
+    features = record_visit(visitor)
+    visit_number = features.session_count
+
+    # Crawlers always get the control page and never reach the bandit
+    is_bot = is_bot_user_agent(request.META.get("HTTP_USER_AGENT", ""))
+    use_bandit = visit_number >= 2 and not is_bot
+    page_id = _bandit_page_id(request) if use_bandit else None
+
+    # --- sticky slate: reuse this visitor's slate from the last few seconds
+    sticky = None
+    if use_bandit:
+        try:
+            sticky = cached_slate(visitor, page_id)
+        except Exception:
+            logger.exception("Sticky slate lookup failed — deciding afresh.")
 
     # --- create a fresh session for this page-load -------------------------
     session = Session.objects.create(
@@ -503,7 +504,9 @@ def accept_cookies(request):
         user_agent=request.META.get("HTTP_USER_AGENT", ""),
         referrer=request.META.get("HTTP_REFERER", ""),
         visit_number=visit_number,
+        sticky_of_id=sticky["session_id"] if sticky else None,
     )
+    clock.lap("visitor")
 
     logger.info(
         "accept_cookies: visitor=%s  session=%s  is_new=%s  visit_number=%d",
@@ -515,44 +518,62 @@ def accept_cookies(request):
     chosen_arm_ids = []
     explored = False
 
-    if visit_number >= 2:
+    if sticky:
+        # Same arms as the original page-load; its decision stays the only one
+        chosen_arm_ids = [a.arm_id for a in sticky["arms"]]
+        page_config = slate_page_config(sticky["arms"])
+        explored = sticky["explore"]
+        logger.info("Bandit slate (sticky from session pk=%s): arms=%s", sticky["session_id"], chosen_arm_ids)
+    elif use_bandit:
         try:
-            context_dict, feature_vector = build_context(visitor, request)
-            chosen_arms, explored, predicted_scores = choose_slate(feature_vector)
+            context_dict, feature_vector = build_context(visitor, request, features=features)
+            clock.lap("context")
+            slate = decide_slate(feature_vector, page_id=page_id)
+            explored = slate.explored
+            clock.lap("decide")
 
-            chosen_arm_ids = [a.arm_id for a in chosen_arms]
-            page_config = merge_page_configs(chosen_arms)
+            chosen_arm_ids = [a.arm_id for a in slate.arms]
+            page_config = slate_page_config(slate.arms)
+            clock.lap("merge")
 
-            from .bandit_utils import EPSILON as _eps
-            BanditDecision.objects.create(
+            log_decision(     # buffered when BANDIT_DECISION_BUFFER is on
                 session=session,
                 visitor=visitor,
+                page_id=slate.page_id,
                 context_json=context_dict,
                 context_vector=feature_vector,
                 chosen_arm_ids=chosen_arm_ids,
                 merged_page_config=page_config,
                 explore=explored,
-                epsilon=_eps,
+                epsilon=slate.epsilon,
+                policy=slate.policy,
+                propensity=slate.propensity,
             )
+            clock.lap("insert")
+            remember_slate(visitor, session, slate.arms, explored, slate.policy, page_id)
 
             logger.info(
-                "Bandit slate: arms=%s (explore=%s)",
-                chosen_arm_ids, explored,
+                "Bandit slate: arms=%s (policy=%s explore=%s)",
+                chosen_arm_ids, slate.policy, explored,
             )
         except Exception:
             logger.exception("Bandit decision failed — falling back to control.")
 
     # --- build response with cookie ----------------------------------------
-    response = JsonResponse({
-        "status": "accepted",
-        "session_id": str(session.session_id),
-        "visitor_id": str(visitor.cookie_id),
-        "is_new": is_new,
-        "visit_number": visit_number,
-        "chosen_arms": chosen_arm_ids,
-        "page_config": page_config,
-        "explore": explored,
-    })
+    # page_config is written from its cached JSON text (see slate_page_config)
+    response = JsonResponse(
+        {
+            "status": "accepted",
+            "session_id": str(session.session_id),
+            "visitor_id": str(visitor.cookie_id),
+            "is_new": is_new,
+            "visit_number": visit_number,
+            "chosen_arms": chosen_arm_ids,
+            "explore": explored,
+            "page_config": page_config,
+        },
+        encoder=PreEncodedJSONEncoder,
+    )
 
     # Persist visitor_id cookie for 1 year
     response.set_cookie(
@@ -564,9 +585,55 @@ def accept_cookies(request):
         path="/",
     )
 
+    clock.total("total")
     return response
 
 
+def bandit_timings(request):
+    """
+    GET /bandit/timings/
+
+    This worker's bandit stage latencies (see ``landing/bandit_timing.py``)::
+
+        {
+            "pid": 1234,
+            "stages": {"context": {"count": 10, "mean_ms": …, "p50_ms": …,
+                                   "p95_ms": …, "p99_ms": …, "max_ms": …}, …}
+        }
+
+    404 unless ``settings.BANDIT_TIMING`` is on.
+    """
+    if not timing_enabled():
+        return JsonResponse({"error": "Bandit timing is disabled (BANDIT_TIMING)."}, status=404)
+    return JsonResponse({"pid": os.getpid(), "stages": timing_snapshot()})
+
+
+def bandit_cache_stats(request):
+    """
+    GET /bandit/cache-stats/
+
+    This worker's bandit cache counters, for tuning EXPLOIT_CACHE_GRID /
+    BANDIT_EXPLOIT_CACHE_MAX_LAG and the sticky window::
+
+        {
+            "pid": 1234,
+            "exploit": {"enabled": true, "hits": …, "misses": …, "stale": …,
+                        "bypassed": …, "size": …, "hit_rate": …,
+                        "stale_rate": …, "mean_hit_lag": …},
+            "sticky": {"enabled": false, "hits": …, "misses": …}
+        }
+
+    404 unless ``settings.BANDIT_CACHE_STATS`` is on.
+    """
+    if not cache_stats_enabled():
+        return JsonResponse({"error": "Bandit cache stats are disabled (BANDIT_CACHE_STATS)."}, status=404)
+    return JsonResponse({
+        "pid": os.getpid(),
+        "exploit": {"enabled": exploit_cache_enabled(), **exploit_cache_stats()},
+        "sticky": {"enabled": sticky_seconds() > 0, **sticky_stats()},
+    })
+
+
 def builder_index(request):
     # Builder UI: list landing pages
     pages = LandingPage.objects.all()
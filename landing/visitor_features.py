@@ -0,0 +1,101 @@
+"""
+Per-visitor feature snapshot (VisitorFeatures) kept in step with sessions.
+
+load_visitor_features – the visitor's row: one primary-key read (backfilled if missing)
+record_visit          – count a new page-load session; returns the updated row
+record_session_scores – copy a scored session's intent scores onto the row
+
+Why
+---
+build_context used to look up the visitor's latest ended session and
+count all of their sessions on every returning visit, right after
+accept_cookies had counted them too.  The row holds exactly what the
+feature vector needs — the last intent scores, the session count and
+last_seen — and is updated with single conditional UPDATEs, so the
+decision path reads it once (or not at all, when the view passes it in).
+"""
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Session, VisitorFeatures
+
+INTENT_FIELDS = [
+    "price_intent_score",
+    "service_intent_score",
+    "trust_intent_score",
+    "location_intent_score",
+    "contact_intent_score",
+]
+
+
+def _backfill(visitor):
+    """Create the row from the visitor's session history (safe if another request races us)."""
+    last = (
+        Session.objects
+        .filter(visitor=visitor, ended_at__isnull=False)
+        .order_by("-ended_at")
+        .first()
+    )
+    features = VisitorFeatures(visitor=visitor, session_count=visitor.sessions.count())
+    if last is not None:
+        features.last_ended_at = last.ended_at
+        for name in INTENT_FIELDS:
+            setattr(features, name, getattr(last, name) or 0.0)
+    VisitorFeatures.objects.bulk_create([features], ignore_conflicts=True)
+    return VisitorFeatures.objects.get(pk=visitor.pk)
+
+
+def load_visitor_features(visitor):
+    """Return the visitor's VisitorFeatures row, building it from history the first time."""
+    try:
+        return VisitorFeatures.objects.get(pk=visitor.pk)
+    except VisitorFeatures.DoesNotExist:
+        return _backfill(visitor)
+
+
+def record_visit(visitor):
+    """
+    Count a page-load for *visitor* before its Session row is created.
+
+    ``session_count`` of the returned row is the new session's
+    visit_number.  The increment is a single ``UPDATE … SET
+    session_count = session_count + 1``, so concurrent page-loads of the
+    same visitor each get their own number.  A visitor without a row
+    gets one built from history first and is then counted by the same
+    UPDATE — two first page-loads racing on the backfill still get
+    different numbers.
+    """
+    with transaction.atomic():
+        if not _count_visit(visitor):
+            _backfill(visitor)
+            _count_visit(visitor)
+        return VisitorFeatures.objects.get(pk=visitor.pk)
+
+
+def _count_visit(visitor):
+    return VisitorFeatures.objects.filter(pk=visitor.pk).update(
+        session_count=F("session_count") + 1,
+        last_seen=timezone.now(),
+    )
+
+
+def record_session_scores(session):
+    """
+    Store a freshly scored session's intent scores on its visitor's row.
+
+    Only moves forward: a session that ended before the one already
+    recorded (e.g. a late queued job) leaves the row alone.
+    """
+    if session.ended_at is None:
+        return
+    values = {name: getattr(session, name) or 0.0 for name in INTENT_FIELDS}
+    updated = (
+        VisitorFeatures.objects
+        .filter(pk=session.visitor_id)
+        .filter(Q(last_ended_at__isnull=True) | Q(last_ended_at__lte=session.ended_at))
+        .update(last_ended_at=session.ended_at, **values)
+    )
+    if not updated and not VisitorFeatures.objects.filter(pk=session.visitor_id).exists():
+        _backfill(session.visitor)
@@ -52,7 +52,10 @@ document.addEventListener("DOMContentLoaded", () => {
     // Accept: POST to server, update session id if returned
     acceptBtn?.addEventListener("click", async () => {
         try {
-            const res = await fetch("/accept-cookies/", {
+            // The page's bandit namespace (empty → shared arms)
+            const pageId = document.body.dataset.pageId;
+            const url = pageId ? `/accept-cookies/?page=${encodeURIComponent(pageId)}` : "/accept-cookies/";
+            const res = await fetch(url, {
                 method: "POST",
                 credentials: "same-origin",
             });
@@ -405,7 +405,10 @@
     try {
       console.log('Checking cookie consent with backend...');
       const csrfToken = (document.cookie.match(/(^| )csrftoken=([^;]+)/) || [])[2] || '';
-      const res = await fetch('/accept-cookies/', {
+      // Pages with their own bandit arms pass their id (data-page-id)
+      const pageId = document.body.dataset.pageId;
+      const url = pageId ? '/accept-cookies/?page=' + encodeURIComponent(pageId) : '/accept-cookies/';
+      const res = await fetch(url, {
         method: 'POST',
         credentials: 'same-origin',
         headers: csrfToken ? { 'X-CSRFToken': csrfToken } : {},